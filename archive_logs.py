@@ -0,0 +1,33 @@
+#!/usr/bin/python3
+import sys
+import argparse
+from classes.bm_database import BM_Database
+from classes.bm_migrations import BM_Migrations
+from classes.bm_archiver import BM_Archiver
+
+
+if __name__ == "__main__":
+    # parse command line arguments
+    parser = argparse.ArgumentParser(description="Move old log entries into the archive.")
+    parser.add_argument("--days", type=int, default=365, help="archive entries older than this many days")
+    parser.add_argument("--database", default="library.db")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    database = BM_Database(args.database)
+
+    # the archive is created by the schema migrations
+    BM_Migrations(database).migrate()
+
+    archiver = BM_Archiver(database, args.days, args.batch_size)
+
+    # report progress on stderr
+    def progress(moved):
+        sys.stderr.write("\r%i log entries archived" % moved)
+
+    moved = archiver.archive(progress)
+
+    sys.stderr.write("\n")
+    print("Archived %i log entries." % moved)
+
+    database.close()
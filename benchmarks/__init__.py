@@ -0,0 +1,3 @@
+"""
+    This package contains the Book Management benchmarks
+"""
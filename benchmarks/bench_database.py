@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+    This file compares the cs50 SQL wrapper against BM_Database for fetch, insert and search
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.bm_database import BM_Database
+
+
+def populate(path, books):
+    # copy the empty schema of library.db and fill it with synthetic books
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    shutil.copy(os.path.join(root, "library.db"), path)
+
+    connection = sqlite3.connect(path)
+    connection.execute("DELETE FROM books")
+    connection.executemany("INSERT INTO books (title, stock) VALUES (?, ?)",
+                           (("Synthetic title %i" % i, i % 50) for i in range(books)))
+    connection.commit()
+    connection.close()
+
+
+def measure(database, inserts, searches):
+    # time a full fetch, single inserts and substring searches
+    results = {}
+
+    start = time.perf_counter()
+    rows = database.execute("SELECT * FROM books")
+    results["fetch"] = time.perf_counter() - start
+    results["rows"] = len(rows)
+
+    start = time.perf_counter()
+    for i in range(inserts):
+        database.execute("INSERT INTO books (title, stock) VALUES (:title, :stock)", title="Inserted %i" % i, stock=1)
+    results["insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(searches):
+        database.execute("SELECT * FROM books WHERE instr(lower(title), :query) > 0 LIMIT 100", query="title %i" % i)
+    results["search"] = time.perf_counter() - start
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the cs50 SQL wrapper with BM_Database.")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--inserts", type=int, default=500)
+    parser.add_argument("--searches", type=int, default=50)
+    args = parser.parse_args()
+
+    backends = [("BM_Database", lambda path: BM_Database(path))]
+
+    # cs50 is optional (it is no longer a dependency of the application)
+    try:
+        from cs50 import SQL
+        import logging
+
+        logging.getLogger("cs50").disabled = True
+        backends.insert(0, ("cs50", lambda path: SQL("sqlite:///" + path)))
+    except ImportError:
+        print("cs50 is not installed, only measuring BM_Database")
+
+    directory = tempfile.mkdtemp()
+
+    try:
+        print("%-12s %10s %12s %12s %12s" % ("backend", "rows", "fetch (s)", "insert (ms)", "search (ms)"))
+
+        for name, connect in backends:
+            path = os.path.join(directory, name + ".db")
+            populate(path, args.books)
+
+            results = measure(connect(path), args.inserts, args.searches)
+
+            print("%-12s %10i %12.3f %12.3f %12.3f" % (name, results["rows"], results["fetch"],
+                                                      1000 * results["insert"] / args.inserts,
+                                                      1000 * results["search"] / args.searches))
+    finally:
+        shutil.rmtree(directory)
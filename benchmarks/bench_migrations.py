@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""
+    This file times the application's hot queries before and after the schema migrations
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.bm_database import BM_Database
+from classes.bm_migrations import BM_Migrations
+from benchmarks.synthetic import schema
+
+# the logs view's first page and a page in the middle of the keyset
+LOGS = "SELECT * FROM logs JOIN books ON logs.bid=books.bid JOIN clients ON logs.cid=clients.cid "
+ORDER = "ORDER BY ldate DESC, lid DESC LIMIT 256"
+
+
+def populate(path, books, clients, logs):
+    # create the schema of library.db before any migration and fill it with synthetic rows
+    schema(path)
+
+    random.seed(0)
+
+    connection = sqlite3.connect(path)
+
+    # the "before" timings are only meaningful without the migrations' indexes
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == 0
+
+    connection.executemany("INSERT INTO books (title, stock) VALUES (?, ?)",
+                           (("Synthetic title %i" % i, i % 50) for i in range(books)))
+    connection.executemany("INSERT INTO clients (fname, lname) VALUES (?, ?)",
+                           (("First %i" % i, "Last %i" % i) for i in range(clients)))
+    connection.executemany("INSERT INTO logs (bid, cid, ltype, ldate) VALUES (?, ?, ?, datetime(?, 'unixepoch'))",
+                           ((random.randint(1, books), random.randint(1, clients),
+                             random.choice(["Borrowing", "Returning"]), 1500000000 + i * 60) for i in range(logs)))
+    connection.commit()
+    connection.close()
+
+
+def measure(database, books, clients, logs, repeat):
+    # average milliseconds per query
+    middle = database.execute("SELECT ldate, lid FROM logs ORDER BY lid LIMIT 1 OFFSET :offset", offset=logs // 2)[0]
+
+    queries = {
+        "logs page": lambda i: database.execute(LOGS + ORDER),
+        "logs keyset": lambda i: database.execute(
+            LOGS + "WHERE ldate < :ldate OR (ldate = :ldate AND lid < :lid) " + ORDER,
+            ldate=middle["ldate"], lid=middle["lid"]),
+        "book delete": lambda i: database.execute("DELETE FROM logs WHERE bid=:bid", bid=i % books + 1),
+        "client delete": lambda i: database.execute("DELETE FROM logs WHERE cid=:cid", cid=i % clients + 1),
+        "client name": lambda i: database.execute("SELECT cid FROM clients WHERE fname=:fname AND lname=:lname",
+                                                  fname="First %i" % i, lname="Last %i" % i),
+        "book title": lambda i: database.execute("SELECT * FROM books WHERE title=:title",
+                                                 title="Synthetic title %i" % i)
+    }
+
+    results = {}
+
+    for name, query in queries.items():
+        # deletes are rolled back so every run sees the same data
+        database.execute("BEGIN")
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            query(i)
+        results[name] = 1000 * (time.perf_counter() - start) / repeat
+
+        database.execute("ROLLBACK")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the hot queries before and after the schema migrations.")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--logs", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+
+    try:
+        path = os.path.join(directory, "library.db")
+        populate(path, args.books, args.clients, args.logs)
+
+        database = BM_Database(path)
+        before = measure(database, args.books, args.clients, args.logs, args.repeat)
+
+        start = time.perf_counter()
+        BM_Migrations(database).migrate()
+        migration = time.perf_counter() - start
+
+        after = measure(database, args.books, args.clients, args.logs, args.repeat)
+
+        # running the migrations again does nothing
+        assert BM_Migrations(database).migrate() == 0
+
+        print("%i books, %i clients, %i log entries (migrated in %.2f s)" %
+              (args.books, args.clients, args.logs, migration))
+        print("%-14s %12s %12s %10s" % ("query", "before (ms)", "after (ms)", "speedup"))
+
+        for name in before:
+            print("%-14s %12.3f %12.3f %9.0fx" % (name, before[name], after[name],
+                                                  before[name] / max(after[name], 1e-6)))
+
+        database.close()
+    finally:
+        shutil.rmtree(directory)
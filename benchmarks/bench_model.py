@@ -0,0 +1,276 @@
+#!/usr/bin/python3
+"""
+    This file drives BM_Table_Model through its public operations on a synthetic library and reports JSON
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the model never needs a screen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt, QEventLoop, QModelIndex, QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+from benchmarks.synthetic import SCALES, library
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples):
+    # summary of latencies (in seconds) in milliseconds, "ops_per_s" is the throughput of the timed operations
+    ordered = sorted(samples)
+
+    def _at(q):
+        return 1000 * ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": 1000 * sum(ordered) / len(ordered),
+        "p50_ms": _at(0.50),
+        "p90_ms": _at(0.90),
+        "p99_ms": _at(0.99),
+        "max_ms": 1000 * ordered[-1],
+        "ops_per_s": len(ordered) / max(sum(ordered), 1e-9)
+    }
+
+
+def peak_rss():
+    # peak resident set size of this process in MiB (Linux reports KiB, macOS bytes)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+
+
+def commit():
+    # the version we measure (None outside a git checkout)
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Runner:
+    # this class times model operations, waiting for the background work they start
+    def __init__(self, app, repeat, seed):
+        self.app = app
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.model = None
+        self.results = {}
+
+    def wait(self):
+        # deliver every result the executor owes us
+        model = self.model
+
+        while model.executor.pending() or model.fetching or model.refilling:
+            self.app.processEvents(QEventLoop.WaitForMoreEvents)
+
+        self.app.processEvents()
+
+    def time(self, name, operation, repeat=None):
+        # run "operation(i)" "repeat" times, each followed by the background work it started
+        samples = []
+
+        for i in range(repeat or self.repeat):
+            start = time.perf_counter()
+            operation(i)
+            self.wait()
+            samples.append(time.perf_counter() - start)
+
+        self.results[name] = percentiles(samples)
+
+        return samples
+
+    def record(self, name, samples):
+        self.results[name] = percentiles(samples)
+
+
+def predicates(database, rng, count):
+    # search predicates taken from stored titles and names (single words and ";" pairs)
+    titles = [row[0] for row in database.execute("SELECT title FROM books ORDER BY random() LIMIT 200")]
+    names = [row[0] for row in database.execute("SELECT lname FROM clients ORDER BY random() LIMIT 200")]
+
+    words = [w.lower() for t in titles for w in t.split() if len(w) > 3 and w.isalpha()]
+    single = [rng.choice(words)[:5] for _ in range(count)]
+    multi = ["%s;%s" % (rng.choice(words)[:5], rng.choice(words)[:5]) for _ in range(count)]
+    people = [rng.choice(names).lower()[:4] for _ in range(count)]
+
+    return single, multi, people
+
+
+def run(directory, repeat, fetch_rows, cells, seed):
+    # every operation runs against "library.db" in "directory" (the model opens it by name)
+    os.chdir(directory)
+
+    from classes.bm_table_model import BM_Table_Model, Model_Mode
+
+    app = QApplication.instance() or QApplication([])
+    runner = Runner(app, repeat, seed)
+    rng = runner.rng
+
+    # start up (migrations are already applied) and show the first page of books
+    start = time.perf_counter()
+    runner.model = model = BM_Table_Model()
+    model.paginate(Model_Mode.Book)
+    runner.wait()
+    runner.record("startup", [time.perf_counter() - start])
+
+    # the first page of every mode (cached rows are dropped first), then pages further down
+    for mode in Model_Mode:
+        name = mode.name.lower()
+
+        def _paginate(i, mode=mode):
+            model.invalidate(mode)
+            model.paginate(mode)
+
+        runner.time("paginate.%s" % name, _paginate)
+        runner.time("fetch_more.%s" % name, lambda i: model.fetchMore(QModelIndex()) if
+                    model.canFetchMore(QModelIndex()) else None)
+
+        # arbitrary queries (the first rows of the mode's own listing)
+        command = model._queries[0].replace(":limit", str(fetch_rows))
+        runner.time("fetch.%s" % name, lambda i, command=command: model.fetch(command))
+
+    # cell access over the resident rows of the books list (timed in batches of "cells" calls)
+    model.paginate(Model_Mode.Book)
+    runner.wait()
+
+    while len(model.items) < min(4096, fetch_rows) and model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+        runner.wait()
+
+    rows = len(model.items)
+    columns = model.columnCount(QModelIndex())
+    samples = []
+
+    for _ in range(repeat):
+        indexes = [model.index(rng.randrange(rows), rng.randrange(columns)) for _ in range(cells)]
+
+        start = time.perf_counter()
+        for index in indexes:
+            model.data(index, Qt.DisplayRole)
+        samples.append((time.perf_counter() - start) / cells)
+
+    runner.record("data", samples)
+
+    # in-memory searches (the first one builds the search index), then FTS searches
+    single, multi, people = predicates(model.database, rng, repeat)
+
+    for mode, words in ((Model_Mode.Book, single), (Model_Mode.Client, people)):
+        name = mode.name.lower()
+
+        model.paginate(mode)
+        runner.wait()
+
+        runner.time("search.%s.first" % name, lambda i: model.search(words[0]), 1)
+        runner.time("search.%s.single" % name, lambda i: model.search(words[i]))
+
+        if mode == Model_Mode.Book:
+            runner.time("search.%s.multi" % name, lambda i: model.search(multi[i]))
+
+        model.search("")
+
+    model.enable_fts(True)
+    runner.wait()
+
+    if model.fts is not None:
+        model.paginate(Model_Mode.Book)
+        runner.wait()
+
+        runner.time("search_fts.book.single", lambda i: model.search(single[i]))
+        runner.time("search_fts.book.multi", lambda i: model.search(multi[i]))
+
+        model.search("")
+        model.enable_fts(False)
+
+    # writes (each waits for its database transaction and the model update)
+    model.paginate(Model_Mode.Book)
+    runner.wait()
+
+    book = model.items[0]
+    client = model.database.execute("SELECT * FROM clients ORDER BY cid LIMIT 1")[0]
+
+    runner.time("book_mod.add", lambda i: model.book_mod("add", "Benchmark title %i" % i, 5))
+    runner.time("book_mod.edit", lambda i: model.book_mod("edit", "%s %i" % (book["title"], i), book["stock"] + 1,
+                                                          book["bid"], 0))
+    runner.time("client_mod.add", lambda i: model.client_mod("add", "Bench", "Client %i" % i))
+    runner.time("client_mod.edit", lambda i: model.client_mod("edit", client["fname"], "%s %i" % (client["lname"], i),
+                                                              client["cid"], 0))
+
+    # borrow and return the same book so its stock never runs out
+    runner.time("transaction_mod.add", lambda i: model.transaction_mod(
+        "add", book["bid"], client["cid"], "Borrowing" if i % 2 == 0 else "Returning"))
+
+    model.executor.stop()
+
+    # the statements which took the most time over the whole run
+    runner.results["queries"] = model.tracer.snapshot()["statements"][:20]
+
+    return runner.results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BM_Table_Model on a synthetic library (JSON output).")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", default=os.path.join(tempfile.gettempdir(), "bm-benchmarks"),
+                        help="directory keeping generated libraries between runs")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--fetch-rows", type=int, default=10000, help="rows read by each fetch")
+    parser.add_argument("--cells", type=int, default=1000, help="data() calls per timed batch")
+    parser.add_argument("--label", default=None, help="free-form tag stored with the results")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file (stdout by default)")
+    args = parser.parse_args()
+
+    source = library(args.cache, args.scale, args.seed,
+                     progress=lambda message: sys.stderr.write("\rgenerating %-60s" % message))
+
+    # the benchmark writes to the library, so it runs on a copy
+    directory = tempfile.mkdtemp()
+
+    try:
+        shutil.copy(source, os.path.join(directory, "library.db"))
+
+        started = time.time()
+        results = run(directory, args.repeat, args.fetch_rows, args.cells, args.seed)
+        books, clients, logs = SCALES[args.scale]
+
+        report = {
+            "benchmark": "bench_model",
+            "label": args.label,
+            "commit": commit(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+            "duration_s": time.time() - started,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "qt": QT_VERSION_STR,
+            "scale": args.scale,
+            "seed": args.seed,
+            "dataset": {"books": books, "clients": clients, "logs": logs},
+            "repeat": args.repeat,
+            "results": results,
+            "peak_rss_mb": peak_rss()
+        }
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(directory)
+
+    text = json.dumps(report, indent=2)
+
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+    This file measures the build time, size and query latency of BM_Search_Index over synthetic books
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.bm_search_index import BM_Search_Index
+from benchmarks.synthetic import vocabulary
+
+SCHEMA = [("bid", "int"), ("title", "text"), ("stock", "int")]
+
+
+def books(count, seed=0):
+    # book rows like the synthetic libraries' (titles repeat with a volume number)
+    titles, _, _ = vocabulary()
+    rng = random.Random(seed)
+
+    for i in range(count):
+        yield {"bid": i + 1, "title": "%s (vol. %i)" % (titles[i % len(titles)], i // len(titles) + 1),
+               "stock": rng.randint(0, 30)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the search index over synthetic books.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # the size of the index is the growth of the peak resident set size while building it (Linux reports KiB)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    index = BM_Search_Index("bid", SCHEMA, fields=("title",)).build(books(args.rows, args.seed))
+    build = time.perf_counter() - start
+
+    size = 1024.0 * (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+
+    print("%i rows: built in %.2f s, %.1f MiB (%.0f bytes per row), %i n-grams" %
+          (args.rows, build, size / 1048576.0, size / args.rows, len(index.postings)))
+
+    # predicates shorter than the n-grams scan every document, longer ones intersect posting lists
+    rng = random.Random(args.seed)
+    words = [w.lower() for w in " ".join(vocabulary()[0]).split() if len(w) > 5 and w.isalpha()]
+
+    for name, length in (("2 characters", 2), ("3 characters", 3), ("5 characters", 5)):
+        samples = []
+
+        for _ in range(args.repeat):
+            word = rng.choice(words)
+            offset = rng.randrange(len(word) - length + 1)
+
+            # (no recent results to refine)
+            index.recent.clear()
+
+            start = time.perf_counter()
+            matches = index.search([word[offset:offset + length]])
+            samples.append(time.perf_counter() - start)
+
+        samples.sort()
+        print("%-13s p50 %8.2f ms  max %8.2f ms  (last: %i matches)" %
+              (name, 1000 * samples[len(samples) // 2], 1000 * samples[-1], len(matches)))
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+    This file generates deterministic synthetic libraries for the benchmarks
+"""
+import os
+import csv
+import sys
+import time
+import random
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.bm_database import BM_Database
+from classes.bm_migrations import BM_Migrations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# library sizes (books, clients, log entries)
+SCALES = {
+    "10k": (10000, 10000, 100000),
+    "100k": (100000, 100000, 1000000),
+    "1m": (1000000, 1000000, 10000000)
+}
+
+# log entries span this many days, ending at a fixed point in time (2025-01-01) so every run writes the same rows
+HISTORY_DAYS = 3 * 365
+HISTORY_END = 1735689600
+
+
+def vocabulary():
+    # titles and names of the mock data (the same words every time)
+    with open(os.path.join(ROOT, "mock-data", "books.csv"), encoding="utf-8", newline="") as books:
+        titles = [row[1] for row in csv.reader(books)]
+
+    with open(os.path.join(ROOT, "mock-data", "clients.csv"), encoding="utf-8", newline="") as clients:
+        rows = list(csv.reader(clients))
+
+    return titles, [row[1] for row in rows], [row[2] for row in rows]
+
+
+def schema(path):
+    # create an empty library at "path" with the tables of library.db before any migration (user_version 0)
+    # (library.db itself is migrated on the application's first launch and holds the user's rows)
+    source = sqlite3.connect("file:%s?mode=ro" % os.path.join(ROOT, "library.db"), uri=True)
+    tables = [row[0] for row in source.execute("SELECT sql FROM sqlite_master WHERE type='table' AND "
+                                               "name IN ('books', 'clients', 'logs') ORDER BY rootpage")]
+    source.close()
+
+    connection = sqlite3.connect(path)
+
+    for statement in tables:
+        connection.execute(statement)
+
+    connection.commit()
+    connection.close()
+
+    return path
+
+
+def generate(path, books, clients, logs, seed=0, batch=100000, progress=None):
+    # write a library with the schema of library.db (migrated to the latest version) to "path"
+    # the same arguments always produce the same rows, "progress" is called with a message per step
+    titles, fnames, lnames = vocabulary()
+    rng = random.Random(seed)
+
+    # (a stale write-ahead log would be replayed into the new file)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # the migrations below build the loans, counters and indexes from the generated history
+    schema(path)
+
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+
+    def _insert(statement, count, row):
+        for start in range(0, count, batch):
+            connection.executemany(statement, (row(i) for i in range(start, min(start + batch, count))))
+            connection.commit()
+
+            if progress is not None:
+                progress("%s: %i of %i" % (statement.split()[2], min(start + batch, count), count))
+
+    # titles repeat with a volume number, names are random first and last name pairs
+    _insert("INSERT INTO books (title, stock) VALUES (?, ?)", books,
+            lambda i: ("%s (vol. %i)" % (titles[i % len(titles)], i // len(titles) + 1), rng.randint(0, 30)))
+    _insert("INSERT INTO clients (fname, lname) VALUES (?, ?)", clients,
+            lambda i: (rng.choice(fnames), rng.choice(lnames)))
+
+    # log entries in chronological order (a little more borrowing than returning)
+    start = HISTORY_END - HISTORY_DAYS * 86400
+    step = (HISTORY_END - start) / max(logs, 1)
+
+    _insert("INSERT INTO logs (bid, cid, ltype, ldate) VALUES (?, ?, ?, datetime(?, 'unixepoch'))", logs,
+            lambda i: (rng.randint(1, books), rng.randint(1, clients),
+                       "Borrowing" if rng.random() < 0.55 else "Returning", int(start + i * step)))
+
+    connection.close()
+
+    # the indexes, loans and counters of the latest schema
+    if progress is not None:
+        progress("migrating")
+
+    database = BM_Database(path)
+    BM_Migrations(database).migrate()
+    database.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    database.close()
+
+    return path
+
+
+def library(directory, scale, seed=0, progress=None):
+    # the path of a generated library in "directory" (generated on first use, reused afterwards)
+    books, clients, logs = SCALES[scale]
+    path = os.path.join(directory, "library-%s-%i.db" % (scale, seed))
+
+    if not os.path.exists(path):
+        # a partially written library is never reused
+        generate(path + ".tmp", books, clients, logs, seed, progress=progress)
+
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + ".tmp" + suffix):
+                os.remove(path + ".tmp" + suffix)
+
+        os.rename(path + ".tmp", path)
+
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic library.")
+    parser.add_argument("path")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    generate(args.path, *SCALES[args.scale], seed=args.seed, progress=lambda message: sys.stderr.write(
+        "\r%-60s" % message))
+
+    sys.stderr.write("\n")
+    print("Generated %s (%s) in %.1f s" % (args.path, args.scale, time.perf_counter() - begin))
@@ -1,15 +1,35 @@
 #!/usr/bin/python3
 import sys
+import time
+
+# startup is measured from here (see "--startup-time")
+STARTED = time.perf_counter()
+
 from PyQt5.QtWidgets import QApplication
 from classes.bm_main_window import BM_Main_Window
+from classes.bm_startup_timer import BM_Startup_Timer
 
 
 if __name__ == "__main__":
+    # "--startup-time" reports the time to the first paint and to an interactive window, then quits
+    measure = "--startup-time" in sys.argv
+
+    if measure:
+        sys.argv.remove("--startup-time")
+
     # initialise this Qt application
     app = QApplication(sys.argv)
 
-    # initialise the main window
+    # initialise the main window (its dialogs are built on first use, the books are read in the background)
     window = BM_Main_Window()
+
+    if measure:
+        timer = BM_Startup_Timer(STARTED)
+        timer.finished.connect(lambda painted, interactive: (
+            print("time-to-first-paint: %.1f ms\ntime-to-interactive: %.1f ms" % (painted * 1000, interactive * 1000)),
+            app.quit()))
+        timer.watch(window)
+
     window.show()
 
     # enter the main loop
@@ -0,0 +1,74 @@
+"""
+    This file contains the definition for the Book Management Archiver class
+"""
+
+# log entries of one partition (aliased to "logs"), newest first, "%(where)s" filters them
+# CROSS JOIN keeps the partition's (ldate, lid) index as the outer loop, whatever its statistics say
+ENTRIES = ("SELECT * FROM (SELECT * FROM %(table)s AS logs CROSS JOIN books ON logs.bid=books.bid "
+           "CROSS JOIN clients ON logs.cid=clients.cid %(where)s ORDER BY ldate DESC, lid DESC LIMIT :limit)")
+
+# log entries of both partitions, newest first (each partition reads at most one page, so the history is never
+# sorted as a whole)
+HISTORY = ("SELECT * FROM (%s UNION ALL %s) ORDER BY ldate DESC, lid DESC LIMIT :limit" %
+           tuple(ENTRIES % {"table": table, "where": "%(where)s"} for table in ("logs", "logs_archive")))
+
+
+class BM_Archiver:
+    # this class moves old log entries from the hot "logs" table into "logs_archive" (see the "history" view)
+    def __init__(self, database, days=365, chunk=5000):
+        # database connection
+        self.database = database
+
+        # entries older than this many days are archived
+        self.days = days
+
+        # number of entries moved per transaction (short transactions keep the write lock available)
+        self.chunk = chunk
+
+    def pending(self):
+        # number of hot entries older than the horizon
+        return self.database.execute("SELECT COUNT(*) FROM logs WHERE ldate < DATETIME('now', :horizon)",
+                                     horizon="-%i days" % self.days)[0][0]
+
+    def archive_batch(self):
+        # move the oldest "chunk" entries past the horizon in a single transaction, returns the number moved
+        self.database.execute("BEGIN IMMEDIATE")
+
+        try:
+            # the ids we move (read in index order)
+            self.database.execute("CREATE TEMP TABLE IF NOT EXISTS archiving (lid integer primary key)")
+            self.database.execute("DELETE FROM temp.archiving")
+
+            self.database.execute(
+                "INSERT INTO temp.archiving SELECT lid FROM logs WHERE ldate < DATETIME('now', :horizon) "
+                "ORDER BY ldate, lid LIMIT :chunk", horizon="-%i days" % self.days, chunk=self.chunk)
+
+            self.database.execute("INSERT INTO logs_archive (lid, bid, cid, ltype, ldate) "
+                                  "SELECT lid, bid, cid, ltype, ldate FROM logs WHERE lid IN temp.archiving")
+            self.database.execute("DELETE FROM logs WHERE lid IN temp.archiving")
+
+            moved = self.database.execute("SELECT COUNT(*) FROM temp.archiving")[0][0]
+
+            self.database.execute("COMMIT")
+        except Exception as e:
+            print("Debug: archiving failed (%s)" % e)
+            self.database.rollback()
+            raise
+
+        return moved
+
+    def archive(self, progress=None):
+        # move every entry past the horizon (one batch at a time), returns the number of moved entries
+        # "progress" is called with the number of entries moved so far after every batch
+        total = 0
+
+        while True:
+            moved = self.archive_batch()
+
+            if moved == 0:
+                return total
+
+            total += moved
+
+            if progress is not None:
+                progress(total)
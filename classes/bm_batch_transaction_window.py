@@ -0,0 +1,146 @@
+"""
+    This file contains the definition for the Book Management Batch Transaction class
+"""
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QMessageBox, \
+    QListWidget
+from classes.bm_picker import BM_Picker
+
+
+class BM_Batch_Transaction_Dialog(QWidget):
+    # define transaction signal
+    transaction_finished = pyqtSignal(dict)
+
+    def __init__(self, executor):
+        super().__init__()
+
+        # initialise UI and layout (books and clients are looked up as the user types)
+        self.book = BM_Picker(executor, "books")
+        self.client = BM_Picker(executor, "clients")
+        self.ttype = QComboBox()
+        self.basket = QListWidget()
+
+        # books added to this batch (one entry per copy)
+        self.bids = []
+
+        # transaction types
+        self.ttypes = ["Borrowing", "Returning"]
+
+        for t in self.ttypes:
+            self.ttype.addItem(t)
+
+        self.setWindowTitle("Record Batch Transaction")
+
+        # set window properties
+        self.setMinimumSize(400, 420)
+        self.setMaximumSize(1024, 1024)
+
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # add a row with label
+        def _add_row(label, widget):
+            row = QWidget()
+
+            # initialise layout
+            rlayout = QHBoxLayout()
+            rlayout.addWidget(QLabel(label))
+            rlayout.addWidget(widget)
+
+            row.setLayout(rlayout)
+            layout.addWidget(row)
+
+        # insert rows to our layout
+        _add_row("Client", self.client)
+        _add_row("Transaction Type", self.ttype)
+        _add_row("Book", self.book)
+
+        # basket buttons
+        btn_add_book = QPushButton("Add Book")
+        btn_add_book.setShortcut("Ctrl+Return")
+        btn_add_book.clicked.connect(self._add_book)
+
+        btn_remove_book = QPushButton("Remove Book")
+        btn_remove_book.setShortcut("Delete")
+        btn_remove_book.clicked.connect(self._remove_book)
+
+        buttons = QWidget()
+        blayout = QHBoxLayout()
+        blayout.addWidget(btn_add_book)
+        blayout.addWidget(btn_remove_book)
+        buttons.setLayout(blayout)
+
+        layout.addWidget(buttons)
+        layout.addWidget(self.basket)
+
+        # interaction buttons
+        btn_cancel = QPushButton("Cancel")
+        btn_cancel.setShortcut("Esc")
+        btn_cancel.clicked.connect(self._cancel)
+
+        self.btn_add = QPushButton("Record Transactions")
+        self.btn_add.setShortcut("Return")
+        self.btn_add.clicked.connect(self._done)
+
+        # insert buttons to layout
+        layout.addWidget(self.btn_add)
+        layout.addWidget(btn_cancel)
+
+        self.setLayout(layout)
+
+    def _add_book(self):
+        # add the picked book to the basket
+        book = self.book.current
+
+        if book is not None:
+            self.bids.append(book["bid"])
+            self.basket.addItem(book["title"])
+
+            # offer it first next time and get ready for the next book
+            self.book.remember()
+            self.book.reset()
+
+    def _remove_book(self):
+        # remove the selected book from the basket
+        row = self.basket.currentRow()
+
+        if row >= 0:
+            del self.bids[row]
+            self.basket.takeItem(row)
+
+    def _cancel(self):
+        # close this widget window
+        self.hide()
+
+    def _done(self):
+        if len(self.bids) == 0:
+            QMessageBox.warning(self, "No books!", "Add at least one book to record a batch transaction.")
+            return
+
+        if self.client.current is None:
+            QMessageBox.warning(self, "No client!", "Pick a client to record a batch transaction.")
+            return
+
+        self.client.remember()
+
+        # send the "transaction_finished" signal
+        self.transaction_finished.emit({
+            "bids": list(self.bids),
+            "cid": self.client.current["cid"],
+            "type": self.ttypes[self.ttype.currentIndex()]
+        })
+
+        # close the window
+        self.hide()
+
+    def activate(self, psc=None):
+        # clear our inputs and use the pre-selected client row (if it is available)
+        self.book.reset()
+        self.client.reset(psc)
+        self.basket.clear()
+        self.bids = []
+
+        # show this window
+        self.show()
@@ -0,0 +1,130 @@
+"""
+    This file contains the definition for the Book Management Column Store class
+"""
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+# dates are stored as seconds since this point in time
+EPOCH = datetime(1970, 1, 1)
+
+
+def pack_date(value):
+    # convert an SQLite date string into seconds since the epoch
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+
+    return int((value - EPOCH).total_seconds())
+
+
+def unpack_date(value):
+    # convert seconds since the epoch back into an SQLite date string
+    return (EPOCH + timedelta(seconds=value)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class BM_Column_Store:
+    # this class stores rows column by column ("int" and "date" columns in typed arrays, "text" columns interned)
+    def __init__(self, schema):
+        # list of (key, kind) pairs
+        self.schema = schema
+
+        self.columns = {}
+        self.dates = set()
+        self.texts = set()
+
+        for key, kind in schema:
+            if kind == "text":
+                self.columns[key] = []
+                self.texts.add(key)
+            else:
+                self.columns[key] = array("q")
+
+                if kind == "date":
+                    self.dates.add(key)
+
+    @staticmethod
+    def _get(row, key):
+        # read a value from a dict or sqlite3.Row, missing keys are None
+        try:
+            return row[key]
+        except (KeyError, IndexError):
+            return None
+
+    def _pack(self, key, value):
+        if key in self.dates:
+            return pack_date(value)
+        elif key in self.texts:
+            return sys.intern(value) if type(value) is str else value
+
+        # typed arrays cannot hold NULL, missing or NULL values (like the counters a plain "SELECT * FROM books"
+        # does not read) are stored as 0
+        return 0 if value is None else int(value)
+
+    def cell(self, index, key):
+        # read a single value without building a row
+        value = self.columns[key][index]
+
+        return unpack_date(value) if key in self.dates else value
+
+    def find(self, key, value):
+        # position of the first row holding this value, or -1
+        try:
+            return self.columns[key].index(self._pack(key, value))
+        except ValueError:
+            return -1
+
+    def append(self, row):
+        for key, column in self.columns.items():
+            column.append(self._pack(key, self._get(row, key)))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+        return self
+
+    def take(self, indices):
+        # build a new store holding the given rows (in the given order)
+        store = BM_Column_Store(self.schema)
+
+        for key, column in self.columns.items():
+            if key in self.texts:
+                store.columns[key] = [column[i] for i in indices]
+            else:
+                store.columns[key] = array("q", (column[i] for i in indices))
+
+        return store
+
+    def nbytes(self):
+        # approximate size of our columns (shared interned strings are counted once)
+        size = 0
+        strings = {}
+
+        for column in self.columns.values():
+            size += sys.getsizeof(column)
+
+            if type(column) is list:
+                for value in column:
+                    strings[id(value)] = sys.getsizeof(value)
+
+        return size + sum(strings.values())
+
+    def __len__(self):
+        return len(self.columns[self.schema[0][0]])
+
+    def __getitem__(self, index):
+        return {key: self.cell(index, key) for key in self.columns}
+
+    def __setitem__(self, index, row):
+        # patch the columns present in the given row
+        for key, value in row.items():
+            if key in self.columns:
+                self.columns[key][index] = self._pack(key, value)
+
+    def __delitem__(self, index):
+        for column in self.columns.values():
+            del column[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
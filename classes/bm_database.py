@@ -0,0 +1,177 @@
+"""
+    This file contains the definition for the Book Management Database class
+"""
+import re
+import time
+import sqlite3
+import threading
+import contextlib
+from classes.bm_query_tracer import PLANNED
+
+
+class BM_Database:
+    # this class provides pooled stdlib sqlite3 connections with a cs50-like "execute" interface
+    def __init__(self, path="library.db", cache_size=16384, mmap_size=256 * 1024 * 1024, statements=256,
+                 tracer=None):
+        # database file
+        self.path = path
+
+        # optional statement statistics (see BM_Query_Tracer)
+        self.tracer = tracer
+
+        # connection properties
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.statements = statements
+
+        # one connection per thread (every connection is kept so they can be closed together)
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+        # rewritten statements (statement and list parameter lengths -> statement, command)
+        self.prepared = {}
+
+    def connection(self):
+        # return this thread's connection, opening it on first use
+        connection = getattr(self.local, "connection", None)
+
+        if connection is None:
+            # autocommit mode, transactions are started explicitly with "BEGIN"
+            # sqlite3 keeps the last "statements" compiled statements per connection
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5.0,
+                                         cached_statements=self.statements)
+            connection.row_factory = sqlite3.Row
+
+            # tune the connection
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA cache_size=-%i" % self.cache_size)
+            connection.execute("PRAGMA mmap_size=%i" % self.mmap_size)
+            connection.execute("PRAGMA temp_store=MEMORY")
+            connection.execute("PRAGMA foreign_keys=ON")
+
+            self.local.connection = connection
+
+            with self.lock:
+                self.connections.append(connection)
+
+        return connection
+
+    def _prepare(self, statement, params):
+        # expand list parameters (":ids" -> ":ids_0, :ids_1, ...") and find the statement's command
+        lists = tuple((k, len(v)) for k, v in params.items() if isinstance(v, (list, tuple)))
+        key = (statement, lists)
+
+        if key not in self.prepared:
+            text = statement
+
+            for name, length in lists:
+                text = re.sub(r":%s\b" % name, ", ".join(":%s_%i" % (name, i) for i in range(length)), text)
+
+            self.prepared[key] = (text, statement.lstrip().split(None, 1)[0].upper())
+
+        text, command = self.prepared[key]
+
+        # flatten list parameters
+        if lists:
+            params = dict(params)
+
+            for name, _ in lists:
+                for i, value in enumerate(params.pop(name)):
+                    params["%s_%i" % (name, i)] = value
+
+        return text, command, params
+
+    def execute(self, statement, **params):
+        # run a statement: queries return a list of rows, INSERT returns the new row id,
+        # UPDATE and DELETE return the number of affected rows
+        text, command, params = self._prepare(statement, params)
+
+        start = time.perf_counter()
+        cursor = self.connection().execute(text, params)
+
+        if command in ("SELECT", "WITH", "PRAGMA", "EXPLAIN"):
+            result = cursor.fetchall()
+            rows = len(result)
+        elif command in ("INSERT", "REPLACE"):
+            result = cursor.lastrowid
+            rows = cursor.rowcount
+        elif command in ("UPDATE", "DELETE"):
+            result = rows = cursor.rowcount
+        else:
+            result, rows = True, None
+
+        if self.tracer is not None:
+            self._trace(statement, text, command, params, time.perf_counter() - start, rows)
+
+        return result
+
+    def execute_many(self, statement, rows):
+        # run a statement once per parameter set, returns the number of affected rows
+        start = time.perf_counter()
+        count = self.connection().executemany(statement, rows).rowcount
+
+        if self.tracer is not None:
+            self.tracer.record(statement, statement.lstrip().split(None, 1)[0].upper(), time.perf_counter() - start,
+                               count)
+
+        return count
+
+    def cursor(self, statement, **params):
+        # run a query and return its cursor (rows are fetched lazily, so only the first step is traced)
+        text, command, params = self._prepare(statement, params)
+
+        start = time.perf_counter()
+        cursor = self.connection().execute(text, params)
+
+        if self.tracer is not None:
+            self._trace(statement, text, command, params, time.perf_counter() - start, None)
+
+        return cursor
+
+    def _trace(self, statement, text, command, params, elapsed, rows):
+        # record a statement, with its query plan if it was slow
+        plan = None
+
+        if self.tracer.is_slow(elapsed) and command in PLANNED:
+            try:
+                # one line per plan step, indented below its parent step
+                depths = {0: -1}
+                plan = []
+
+                for row in self.connection().execute("EXPLAIN QUERY PLAN " + text, params):
+                    depths[row["id"]] = depths.get(row["parent"], -1) + 1
+                    plan.append("  " * depths[row["id"]] + row["detail"])
+            except sqlite3.Error as e:
+                plan = ["(no plan: %s)" % e]
+
+        self.tracer.record(statement, command, elapsed, rows, plan)
+
+    def operation(self, name):
+        # trace the statements this thread runs until the block ends under "name"
+        if self.tracer is None:
+            return contextlib.nullcontext()
+
+        return self.tracer.operation(name)
+
+    def rollback(self):
+        # roll back this thread's transaction (if it has one)
+        connection = self.connection()
+
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+
+    def close(self):
+        # close every connection
+        with self.lock:
+            for connection in self.connections:
+                try:
+                    connection.close()
+                except sqlite3.ProgrammingError:
+                    # connections belonging to other threads which are still running
+                    pass
+
+            self.connections = []
+
+        self.local = threading.local()
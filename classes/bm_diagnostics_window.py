@@ -0,0 +1,168 @@
+"""
+    This file contains the definition for the Book Management Diagnostics Window class
+"""
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, \
+    QHeaderView, QAbstractItemView, QPlainTextEdit, QFileDialog, QMessageBox, QSplitter
+
+
+class BM_Diagnostics_Window(QWidget):
+    def __init__(self, tracer):
+        super().__init__()
+
+        # statement statistics of the model's database
+        self.tracer = tracer
+
+        # initialise UI and layout
+        self.statements = QTableWidget()
+        self.slow = QTableWidget()
+        self.plan = QPlainTextEdit()
+        self.status = QLabel()
+
+        # the latest snapshot of the tracer
+        self.snapshot = None
+
+        # refresh while visible
+        self.timer = QTimer(self)
+        self.timer.setInterval(2000)
+        self.timer.timeout.connect(self.refresh)
+
+        self.setWindowTitle("Diagnostics")
+
+        # set window properties
+        self.setMinimumSize(720, 540)
+
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # statements by total time
+        self.statements.setColumnCount(10)
+        self.statements.setHorizontalHeaderLabels(["Statement", "Operations", "Calls", "Total (ms)", "Mean (ms)",
+                                                   "p50 (ms)", "p90 (ms)", "p99 (ms)", "Max (ms)", "Rows"])
+
+        # slow statements (oldest first), the plan of the selected one is shown below them
+        self.slow.setColumnCount(4)
+        self.slow.setHorizontalHeaderLabels(["Time", "Elapsed (ms)", "Operation", "Statement"])
+        self.slow.itemSelectionChanged.connect(self._show_plan)
+
+        for table in (self.statements, self.slow):
+            table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+            table.horizontalHeader().setStretchLastSection(True)
+            table.verticalHeader().setVisible(False)
+
+        self.plan.setReadOnly(True)
+        self.plan.setPlaceholderText("Select a slow statement to see its query plan.")
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.statements)
+        splitter.addWidget(self.slow)
+        splitter.addWidget(self.plan)
+
+        layout.addWidget(splitter)
+        layout.addWidget(self.status)
+
+        # interaction buttons
+        buttons = QWidget()
+        blayout = QHBoxLayout()
+
+        btn_refresh = QPushButton("Refresh")
+        btn_refresh.setShortcut("F5")
+        btn_refresh.clicked.connect(self.refresh)
+
+        btn_reset = QPushButton("Reset")
+        btn_reset.clicked.connect(self._reset)
+
+        btn_dump = QPushButton("Dump...")
+        btn_dump.clicked.connect(self._dump)
+
+        btn_close = QPushButton("Close")
+        btn_close.setShortcut("Esc")
+        btn_close.clicked.connect(self.hide)
+
+        for button in (btn_refresh, btn_reset, btn_dump, btn_close):
+            blayout.addWidget(button)
+
+        buttons.setLayout(blayout)
+        layout.addWidget(buttons)
+
+        self.setLayout(layout)
+
+    def activate(self):
+        # show this window with the latest statistics
+        self.show()
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        # fill both tables from a new snapshot
+        self.snapshot = snapshot = self.tracer.snapshot()
+
+        self.status.setText("%i statement(s), %i call(s) taking %.1f ms since %s (slow: %.0f ms and over)" % (
+            len(snapshot["statements"]), snapshot["calls"], snapshot["total_ms"], snapshot["since"],
+            snapshot["threshold_ms"]))
+
+        self.statements.setRowCount(len(snapshot["statements"]))
+
+        for i, row in enumerate(snapshot["statements"]):
+            operations = ", ".join("%s (%i)" % item for item in sorted(row["operations"].items(),
+                                                                      key=lambda item: -item[1]))
+            values = [row["statement"], operations, "%i" % row["calls"], "%.1f" % row["total_ms"],
+                      "%.2f" % row["mean_ms"], "%.2f" % row["p50_ms"], "%.2f" % row["p90_ms"],
+                      "%.2f" % row["p99_ms"], "%.2f" % row["max_ms"], "%i" % row["rows"]]
+
+            for j, value in enumerate(values):
+                item = QTableWidgetItem(value)
+
+                # the full statement on hover
+                if j == 0:
+                    item.setToolTip(value)
+
+                self.statements.setItem(i, j, item)
+
+        self.slow.setRowCount(len(snapshot["slow"]))
+
+        for i, entry in enumerate(snapshot["slow"]):
+            values = [entry["time"], "%.1f" % entry["elapsed_ms"], entry["operation"], entry["statement"]]
+
+            for j, value in enumerate(values):
+                self.slow.setItem(i, j, QTableWidgetItem(value))
+
+        self._show_plan()
+
+    def _show_plan(self):
+        rows = self.slow.selectionModel().selectedRows()
+
+        if not rows or self.snapshot is None:
+            self.plan.clear()
+            return
+
+        entry = self.snapshot["slow"][rows[0].row()]
+        self.plan.setPlainText("%s\n\n%s" % (entry["statement"], "\n".join(entry["plan"]) or "(no plan)"))
+
+    def _reset(self):
+        self.tracer.reset()
+        self.refresh()
+
+    def _dump(self):
+        # write the statistics as JSON
+        filename, _ = QFileDialog.getSaveFileName(self, "Dump Diagnostics", "diagnostics.json",
+                                                  "JSON files (*.json)")
+
+        if not filename:
+            return
+
+        try:
+            self.tracer.dump(filename)
+        except OSError as e:
+            QMessageBox.warning(self, "Dump Diagnostics", "Could not write %s (%s)" % (filename, e))
+            return
+
+        self.status.setText("Wrote %s" % filename)
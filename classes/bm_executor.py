@@ -0,0 +1,141 @@
+"""
+    This file contains the definition for the Book Management Executor class
+"""
+import sys
+import queue
+import traceback
+from PyQt5.QtCore import QThread, QCoreApplication, pyqtSignal
+
+
+class BM_Executor(QThread):
+    # define executor signals ("done" and "error" are delivered to the GUI thread by Qt)
+    done = pyqtSignal(int, object)
+    error = pyqtSignal(int, str)
+    failed = pyqtSignal(str)
+    busy = pyqtSignal(bool)
+
+    def __init__(self, database):
+        super().__init__()
+
+        # every request runs on this thread's database connection
+        self.database = database
+
+        # requests run one at a time in the order they were submitted, so a write is always visible to the
+        # reads submitted after it (and their callbacks run in the same order)
+        self.requests = queue.Queue()
+
+        # callbacks and errbacks per request ticket
+        self.callbacks = {}
+        self.ticket = 0
+
+        self.done.connect(self._deliver)
+        self.error.connect(self._fail)
+
+        # writes are queued, so quitting must wait for the requests submitted before it
+        app = QCoreApplication.instance()
+
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+        self.start()
+
+    def submit(self, function, *args, callback=None, errback=None, **kwargs):
+        # run "function(*args, **kwargs)" on the database thread, "callback" receives its result on the GUI thread
+        # (or "errback" the error message if it raised, callers waiting for a result must clean up either way)
+        self.ticket += 1
+        self.callbacks[self.ticket] = (callback, errback)
+
+        # tell listeners we have work to do
+        if len(self.callbacks) == 1:
+            self.busy.emit(True)
+
+        self.requests.put((self.ticket, self._operation(function), function, args, kwargs))
+
+        return self.ticket
+
+    def execute(self, statement, callback=None, errback=None, **params):
+        # run a single statement on the database thread
+        return self.submit(self.database.execute, statement, callback=callback, errback=errback, **params)
+
+    def _operation(self, function):
+        # the name the request's statements are traced under: the submitted function (or the method which
+        # defined it), or the caller of "execute" for single statements
+        name = getattr(function, "__qualname__", "request").split(".<locals>")[0]
+
+        if name.startswith("BM_Database."):
+            frame = sys._getframe(2)
+
+            while frame is not None and frame.f_code.co_filename == __file__:
+                frame = frame.f_back
+
+            if frame is not None:
+                name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+
+        return name
+
+    def pending(self):
+        # number of requests which have not been delivered yet
+        return len(self.callbacks)
+
+    def stop(self):
+        # finish the submitted requests (in order, the queue drains before the thread ends) and end the
+        # database thread, stopping twice does nothing
+        if not self.isRunning():
+            return
+
+        self.requests.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+
+            if request is None:
+                break
+
+            ticket, operation, function, args, kwargs = request
+
+            try:
+                with self.database.operation(operation):
+                    result = function(*args, **kwargs)
+
+                self.done.emit(ticket, result)
+            except Exception as e:
+                # never leave a transaction open for the next request (the failure is reported either way)
+                try:
+                    self.database.rollback()
+                except Exception as rollback:
+                    print("Debug: rollback failed (%s)" % rollback)
+
+                self.error.emit(ticket, str(e))
+
+        self.database.close()
+
+    def _deliver(self, ticket, result):
+        callback, _ = self.callbacks.pop(ticket)
+
+        try:
+            if callback is not None:
+                callback(result)
+        except Exception:
+            # an exception escaping a slot aborts the application, a failed callback only loses its result
+            print("Debug: request callback failed\n%s" % traceback.format_exc().rstrip())
+        finally:
+            if len(self.callbacks) == 0:
+                self.busy.emit(False)
+
+    def _fail(self, ticket, message):
+        print("Debug: database request failed (%s)" % message)
+
+        _, errback = self.callbacks.pop(ticket)
+
+        try:
+            if errback is not None:
+                errback(message)
+        except Exception:
+            print("Debug: request errback failed\n%s" % traceback.format_exc().rstrip())
+        finally:
+            if len(self.callbacks) == 0:
+                self.busy.emit(False)
+
+        self.failed.emit(message)
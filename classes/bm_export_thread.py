@@ -0,0 +1,44 @@
+"""
+    This file contains the definition for the Book Management Export Thread class
+"""
+from PyQt5.QtCore import QThread, pyqtSignal
+from classes.bm_exporter import BM_Exporter
+
+
+class BM_Export_Thread(QThread):
+    # define export signals
+    progress = pyqtSignal(int, int)
+    exported = pyqtSignal(object, str)
+
+    def __init__(self, table, filename, fmt="csv", predicates=None, since=None, until=None, tracer=None):
+        super().__init__()
+
+        # export arguments
+        self.table = table
+        self.filename = filename
+        self.fmt = fmt
+        self.predicates = predicates
+        self.since = since
+        self.until = until
+
+        # optional statement statistics (see BM_Query_Tracer)
+        self.tracer = tracer
+
+        # set by "cancel"
+        self.aborted = False
+
+    def cancel(self):
+        self.aborted = True
+
+    def run(self):
+        # stream the export on this thread, reporting the number of rows (None if cancelled) and any error
+        exporter = BM_Exporter(tracer=self.tracer)
+
+        try:
+            written = exporter.export(self.table, self.filename, self.fmt, self.predicates, self.since, self.until,
+                                      self.progress.emit, lambda: self.aborted)
+        except Exception as e:
+            self.exported.emit(None, str(e))
+            return
+
+        self.exported.emit(written, "")
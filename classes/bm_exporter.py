@@ -0,0 +1,132 @@
+"""
+    This file contains the definition for the Book Management Exporter class
+"""
+import csv
+import json
+import os
+import heapq
+import itertools
+from classes.bm_database import BM_Database
+
+
+class BM_Exporter:
+    # this class streams tables (and the log history and outstanding loans) to CSV or JSON Lines files in chunks
+    def __init__(self, path="library.db", chunk_size=5000, tracer=None):
+        # database file
+        self.path = path
+
+        # optional statement statistics (see BM_Query_Tracer)
+        self.tracer = tracer
+
+        # number of rows fetched from the cursor at once
+        self.chunk_size = chunk_size
+
+        # exported columns, source and ordering per table, log entries are read in their (ldate, lid) index order
+        # (CROSS JOIN keeps them the outer loop) so nothing is sorted, the history merges its two partitions
+        self.sources = {
+            "books": (["bid", "title", "stock"], "books", "bid"),
+            "clients": (["cid", "fname", "lname"], "clients", "cid"),
+            "logs": (["lid", "ldate", "ltype", "logs.bid", "title", "logs.cid", "fname", "lname"],
+                     "logs CROSS JOIN books ON logs.bid=books.bid CROSS JOIN clients ON logs.cid=clients.cid",
+                     "ldate DESC, lid DESC"),
+            "history": (["lid", "ldate", "ltype", "history.bid", "title", "history.cid", "fname", "lname"],
+                        tuple("%s AS history CROSS JOIN books ON history.bid=books.bid CROSS JOIN clients "
+                              "ON history.cid=clients.cid" % table for table in ("logs", "logs_archive")),
+                        "ldate DESC, lid DESC"),
+            "loans": (["lid", "ldate", "loans.bid", "title", "loans.cid", "fname", "lname"],
+                      "loans CROSS JOIN books ON loans.bid=books.bid CROSS JOIN clients ON loans.cid=clients.cid",
+                      "ldate DESC, lid DESC")
+        }
+
+        # searchable columns (the same scope as the search bar)
+        self.scope = ["fname", "lname", "title"]
+
+    def _where(self, table, predicates, since, until):
+        # build the filter of an export
+        columns = self.sources[table][0]
+        conditions = []
+        params = {}
+
+        # search predicates (substring matches, ";" alternatives), an empty predicate matches everything
+        if predicates and "" not in predicates:
+            scope = [c for c in self.scope if c in columns]
+            alternatives = []
+
+            for i, predicate in enumerate(predicates):
+                alternatives.extend("instr(lower(%s), :predicate%i) > 0" % (c, i) for c in scope)
+                params["predicate%i" % i] = predicate.lower()
+
+            conditions.append("(%s)" % " OR ".join(alternatives))
+
+        # date range (log entries only)
+        if table in ("logs", "history"):
+            if since:
+                conditions.append("ldate >= :since")
+                params["since"] = since
+
+            if until:
+                conditions.append("ldate < :until")
+                params["until"] = until
+
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def export(self, table, filename, fmt="csv", predicates=None, since=None, until=None, progress=None,
+               cancelled=None):
+        # export a table, returns the number of rows written (or None if cancelled, removing the partial file)
+        # "progress" is called with (rows written, total rows) after every chunk
+        columns, source, order = self.sources[table]
+        names = [c.split(".")[-1] for c in columns]
+        where, params = self._where(table, predicates, since, until)
+
+        database = BM_Database(self.path, tracer=self.tracer)
+        written = 0
+        aborted = False
+
+        try:
+            partitions = source if isinstance(source, tuple) else (source,)
+
+            total = sum(database.execute("SELECT COUNT(*) FROM %s%s" % (partition, where), **params)[0][0]
+                        for partition in partitions)
+            cursors = [database.cursor("SELECT %s FROM %s%s ORDER BY %s" % (", ".join(columns), partition, where,
+                                                                            order), **params)
+                       for partition in partitions]
+
+            # (partitioned sources hold log entries, newest first)
+            if len(cursors) == 1:
+                cursor = cursors[0]
+            else:
+                cursor = heapq.merge(*cursors, key=lambda row: (row["ldate"], row["lid"]), reverse=True)
+
+            with open(filename, "w", encoding="utf-8", newline="") as output:
+                if fmt == "csv":
+                    writer = csv.writer(output)
+                    writer.writerow(names)
+
+                while True:
+                    if cancelled is not None and cancelled():
+                        aborted = True
+                        break
+
+                    rows = list(itertools.islice(cursor, self.chunk_size))
+
+                    if len(rows) == 0:
+                        break
+
+                    if fmt == "csv":
+                        writer.writerows(rows)
+                    else:
+                        output.writelines(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n"
+                                          for row in rows)
+
+                    written += len(rows)
+
+                    if progress is not None:
+                        progress(written, total)
+        finally:
+            database.close()
+
+        if aborted:
+            os.remove(filename)
+            return None
+
+        return written
@@ -0,0 +1,157 @@
+"""
+    This file contains the definition for the Book Management Full-Text Search class
+"""
+from classes.bm_row_pager import BM_Row_Pager
+from classes.bm_archiver import ENTRIES, HISTORY
+
+# circulation counters of a book or client row (read through a LEFT JOIN, rows without log entries have none)
+STATS = "COALESCE(borrows, 0) AS borrows, COALESCE(returns, 0) AS returns, lastdate"
+
+# share of the books or clients a query has to match before log entries are found by walking them newest first
+COMMON = 0.01
+
+
+class BM_FTS_Search:
+    # this class answers searches with SQLite FTS5 tables shadowing "books" and "clients"
+    def __init__(self, database, rank=False):
+        # database connection
+        self.database = database
+
+        # order books and clients by relevance (bm25) instead of by id
+        self.rank = rank
+
+        # shadowed tables (table -> primary key and searchable columns)
+        self.tables = {
+            "books": ("bid", ["title"]),
+            "clients": ("cid", ["fname", "lname"])
+        }
+
+        # circulation counters per shadowed table
+        self.stats = {"books": "book_stats", "clients": "client_stats"}
+
+    def install(self):
+        # create the FTS tables and their triggers, returns False if FTS5 is unavailable
+        try:
+            for table, (key, columns) in self.tables.items():
+                # only populate tables which did not exist before
+                exists = self.database.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=:name",
+                                               name=table + "_fts")
+
+                self.database.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS %s_fts USING fts5(%s, content='%s', content_rowid='%s', "
+                    "tokenize='unicode61 remove_diacritics 2')" % (table, ", ".join(columns), table, key))
+
+                # keep the FTS table in sync with its content table
+                cols = ", ".join(columns)
+                new = ", ".join("new." + c for c in columns)
+                old = ", ".join("old." + c for c in columns)
+
+                self.database.execute(
+                    "CREATE TRIGGER IF NOT EXISTS %s_fts_ai AFTER INSERT ON %s BEGIN "
+                    "INSERT INTO %s_fts (rowid, %s) VALUES (new.%s, %s); END" % (table, table, table, cols, key, new))
+                self.database.execute(
+                    "CREATE TRIGGER IF NOT EXISTS %s_fts_ad AFTER DELETE ON %s BEGIN "
+                    "INSERT INTO %s_fts (%s_fts, rowid, %s) VALUES ('delete', old.%s, %s); END" %
+                    (table, table, table, table, cols, key, old))
+                self.database.execute(
+                    "CREATE TRIGGER IF NOT EXISTS %s_fts_au AFTER UPDATE ON %s BEGIN "
+                    "INSERT INTO %s_fts (%s_fts, rowid, %s) VALUES ('delete', old.%s, %s); "
+                    "INSERT INTO %s_fts (rowid, %s) VALUES (new.%s, %s); END" %
+                    (table, table, table, table, cols, key, old, table, cols, key, new))
+
+                if len(exists) == 0:
+                    self.database.execute("INSERT INTO %s_fts (%s_fts) VALUES ('rebuild')" % (table, table))
+        except Exception as e:
+            print("Debug: full-text search is unavailable (%s)" % e)
+            return False
+
+        return True
+
+    def uninstall(self):
+        # drop the FTS tables and their triggers, so writes stop paying for them while FTS is disabled
+        # (the tables are rebuilt from their content tables by the next "install")
+        for table in self.tables:
+            for suffix in ("ai", "ad", "au"):
+                self.database.execute("DROP TRIGGER IF EXISTS %s_fts_%s" % (table, suffix))
+
+            self.database.execute("DROP TABLE IF EXISTS %s_fts" % table)
+
+        return True
+
+    def match_query(self, predicates):
+        # translate search bar predicates into an FTS query ("a b;c" -> ("a"* AND "b"*) OR ("c"*))
+        alternatives = []
+
+        for predicate in predicates:
+            tokens = predicate.split()
+
+            # an empty predicate matches everything
+            if len(tokens) == 0:
+                return None
+
+            alternatives.append("(%s)" % " AND ".join('"%s"*' % t.replace('"', '""') for t in tokens))
+
+        return " OR ".join(alternatives)
+
+    def _common(self, query):
+        # whether a query matches a sizeable share of the books or clients (the ids are dense, so their maximum
+        # stands in for the number of rows)
+        share = 0.0
+
+        for table, (key, _) in self.tables.items():
+            matches = self.database.execute("SELECT COUNT(*) FROM %s_fts WHERE %s_fts MATCH :query" % (table, table),
+                                            query=query)[0][0]
+            rows = self.database.execute("SELECT MAX(%s) FROM %s" % (key, table))[0][0] or 0
+
+            share += matches / max(rows, 1)
+
+        return share >= COMMON
+
+    def search(self, table, schema, predicates, page_size=256, max_pages=32):
+        # return a row pager over the matching rows, or None if every row matches
+        query = self.match_query(predicates)
+
+        if query is None:
+            return None
+
+        if table in ("logs", "history", "loans"):
+            # log entries (hot or archived) and loans match through the titles and names they refer to
+            # entries of common matches are found fastest by walking each table newest first until a page is full
+            # ("+" keeps SQLite off the bid and cid indexes), those of rare ones by looking up the matching books' and
+            # clients' entries and sorting them (at most a page per table, the history is never sorted as a whole)
+            plus = "+" if self._common(query) else ""
+            where = ("WHERE (%slogs.bid IN (SELECT rowid FROM books_fts WHERE books_fts MATCH :query) "
+                     "OR %slogs.cid IN (SELECT rowid FROM clients_fts WHERE clients_fts MATCH :query))" % (plus, plus))
+            template = HISTORY if table == "history" else ENTRIES % {"table": table, "where": "%(where)s"}
+
+            queries = (template % {"where": where},
+                       template % {"where": where + " AND (ldate < :ldate OR (ldate = :ldate AND lid < :lid))"},
+                       ["ldate", "lid"])
+        else:
+            key = self.tables[table][0]
+            stats = self.stats[table]
+            base = ("SELECT %s.*, %s, rank FROM %s_fts JOIN %s ON %s.%s=%s_fts.rowid "
+                    "LEFT JOIN %s ON %s.%s=%s.%s WHERE %s_fts MATCH :query" %
+                    (table, STATS, table, table, table, key, table, stats, stats, key, table, key, table))
+
+            # the key column exists in both joined tables
+            column = "%s.%s" % (table, key)
+
+            if self.rank:
+                # bm25 ranks are negative, the best matches come first
+                queries = (base + " ORDER BY rank, %s LIMIT :limit" % column,
+                           base + " AND (rank > :rank OR (rank = :rank AND %s > :%s)) ORDER BY rank, %s LIMIT :limit" %
+                           (column, key, column),
+                           ["rank", key])
+            else:
+                queries = (base + " ORDER BY %s LIMIT :limit" % column,
+                           base + " AND %s > :%s ORDER BY %s LIMIT :limit" % (column, key, column),
+                           [key])
+
+        pager = BM_Row_Pager(self.database, schema, *queries, page_size=page_size, max_pages=max_pages,
+                             params={"query": query})
+
+        # read the first page straight away
+        pager.grow(pager.next_page())
+
+        return pager
@@ -0,0 +1,45 @@
+"""
+    This file contains the definition for the Book Management Import Thread class
+"""
+from PyQt5.QtCore import QThread, pyqtSignal
+from classes.bm_importer import BM_Importer
+
+
+class BM_Import_Thread(QThread):
+    # define import signals
+    progress = pyqtSignal(int, int, int)
+    imported = pyqtSignal(int, int, str)
+
+    def __init__(self, table, filename, upsert=False, tracer=None):
+        super().__init__()
+
+        # import arguments
+        self.table = table
+        self.filename = filename
+        self.upsert = upsert
+
+        # optional statement statistics (see BM_Query_Tracer)
+        self.tracer = tracer
+
+        # set by "cancel"
+        self.aborted = False
+
+    def cancel(self):
+        self.aborted = True
+
+    def _progress(self, rows, position, total):
+        self.progress.emit(rows, position, total)
+
+        return not self.aborted
+
+    def run(self):
+        # stream the import on this thread, reporting the number of imported and skipped rows and any error
+        importer = BM_Importer(tracer=self.tracer)
+
+        try:
+            imported, skipped = importer.import_csv(self.table, self.filename, self.upsert, self._progress)
+        except Exception as e:
+            self.imported.emit(0, 0, str(e))
+            return
+
+        self.imported.emit(imported, skipped, "")
@@ -0,0 +1,114 @@
+"""
+    This file contains the definition for the Book Management Importer class
+"""
+import csv
+import io
+import os
+from classes.bm_database import BM_Database
+
+
+class BM_Importer:
+    # this class streams CSV files (shaped like "mock-data/") into the database in batched transactions
+    def __init__(self, path="library.db", batch_size=10000, tracer=None):
+        # database file
+        self.path = path
+
+        # optional statement statistics (see BM_Query_Tracer)
+        self.tracer = tracer
+
+        # number of rows passed to a single "executemany"
+        self.batch_size = batch_size
+
+        # columns per table (the first one is the primary key)
+        self.columns = {
+            "books": ["bid", "title", "stock"],
+            "clients": ["cid", "fname", "lname"]
+        }
+
+    def _convert(self, table, row):
+        # turn a CSV row into statement parameters (an empty id lets SQLite pick one)
+        key = int(row[0]) if row[0].strip() != "" else None
+
+        if table == "books":
+            return (key, row[1], int(row[2]))
+
+        return (key, row[1], row[2] if len(row) > 2 and row[2] != "" else None)
+
+    def _statement(self, table, upsert):
+        columns = self.columns[table]
+        statement = "INSERT%s INTO %s (%s) VALUES (%s)" % ("" if upsert else " OR IGNORE", table,
+                                                            ", ".join(columns), ", ".join("?" * len(columns)))
+
+        # update rows whose ids already exist
+        if upsert:
+            statement += " ON CONFLICT(%s) DO UPDATE SET %s" % (
+                columns[0], ", ".join("%s=excluded.%s" % (c, c) for c in columns[1:]))
+
+        return statement
+
+    def _write(self, database, statement, batch):
+        # write a batch in its own transaction (other connections wait for one batch at most), returns the number
+        # of imported rows
+        database.execute("BEGIN IMMEDIATE")
+
+        try:
+            count = database.execute_many(statement, batch)
+            database.execute("COMMIT")
+        except:
+            database.rollback()
+            raise
+
+        return count
+
+    def import_csv(self, table, filename, upsert=False, progress=None):
+        # import a CSV file, returns the number of imported (inserted or updated) and skipped rows (a header,
+        # malformed rows and, without "upsert", rows whose ids already exist), which add up to the rows of the file
+        # "progress" is called with (rows read, bytes read, total bytes) after every batch, it may return False to
+        # cancel (the batches written so far are kept, like those written before an error)
+        statement = self._statement(table, upsert)
+        total = os.path.getsize(filename)
+
+        read = 0
+        imported = 0
+        skipped = 0
+
+        database = BM_Database(self.path, tracer=self.tracer)
+
+        try:
+            with open(filename, "rb") as raw:
+                reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8", newline=""))
+                batch = []
+
+                for line, row in enumerate(reader):
+                    try:
+                        batch.append(self._convert(table, row))
+                    except (ValueError, IndexError):
+                        # a header or malformed row (only the latter is worth a message)
+                        if line > 0:
+                            print("Debug: skipping line %i of %s" % (line + 1, filename))
+
+                        skipped += 1
+                        continue
+
+                    if len(batch) >= self.batch_size:
+                        count = self._write(database, statement, batch)
+                        imported += count
+                        skipped += len(batch) - count
+                        read += len(batch)
+                        batch = []
+
+                        if progress is not None and progress(read, raw.tell(), total) is False:
+                            return imported, skipped
+
+                if len(batch) > 0:
+                    count = self._write(database, statement, batch)
+                    imported += count
+                    skipped += len(batch) - count
+                    read += len(batch)
+
+                if progress is not None:
+                    progress(read, total, total)
+        finally:
+            database.close()
+
+        return imported, skipped
@@ -1,16 +1,35 @@
 """
     This file contains the definition for the Book Management Main Window class
 """
-from PyQt5.QtCore import pyqtSlot
-from PyQt5.QtWidgets import QMainWindow, qApp, QAction, QMessageBox, QLineEdit, QVBoxLayout, QWidget
+import importlib
+from PyQt5.QtCore import QTimer, pyqtSlot
+from PyQt5.QtWidgets import QMainWindow, qApp, QAction, QMessageBox, QLineEdit, QVBoxLayout, QWidget, QFileDialog, \
+    QProgressDialog, QInputDialog, QLabel
 from classes.bm_table_model import Model_Mode
 from classes.bm_table_view import BM_Table_View
-from classes.bm_add_book import BM_Add_Book_Dialog
-from classes.bm_add_client import BM_Add_Client_Dialog
-from classes.bm_transaction_window import BM_Transaction_Dialog
+from classes.bm_search_scheduler import BM_Search_Scheduler
+
+# dialogs and windows, built (and their modules imported) on first use: name -> module, class, finished slot
+DIALOGS = {
+    "add_book": ("classes.bm_add_book", "BM_Add_Book_Dialog", "_add_book_finished"),
+    "add_client": ("classes.bm_add_client", "BM_Add_Client_Dialog", "_add_client_finished"),
+    "transaction": ("classes.bm_transaction_window", "BM_Transaction_Dialog", "_transaction_finished"),
+    "batch_transaction": ("classes.bm_batch_transaction_window", "BM_Batch_Transaction_Dialog",
+                          "_batch_transaction_finished"),
+    "reports": ("classes.bm_reports_window", "BM_Reports_Window", None),
+    "diagnostics": ("classes.bm_diagnostics_window", "BM_Diagnostics_Window", None)
+}
 
 
 class BM_Main_Window(QMainWindow):
+    # dialogs are built on first use (see "_dialog")
+    _add_book_dialog = property(lambda self: self._dialog("add_book"))
+    _add_client_dialog = property(lambda self: self._dialog("add_client"))
+    _transaction_dialog = property(lambda self: self._dialog("transaction"))
+    _batch_transaction_dialog = property(lambda self: self._dialog("batch_transaction"))
+    _reports_window = property(lambda self: self._dialog("reports"))
+    _diagnostics_window = property(lambda self: self._dialog("diagnostics"))
+
     def __init__(self):
         # initialise this as a subclass of QMainWindow
         super().__init__()
@@ -27,17 +46,23 @@ class BM_Main_Window(QMainWindow):
         self.table_view.switch_mode(Model_Mode.Book)
         self.table_view.contents_changed.connect(self._table_view_updated)
 
-        # initialise our dialog classes
-        self._add_book_dialog = BM_Add_Book_Dialog()
-        self._add_client_dialog = BM_Add_Client_Dialog()
-        self._transaction_dialog = BM_Transaction_Dialog(self.table_view.model.database)
+        # follow the model's background work
+        self.table_view.model.loading_changed.connect(self._loading_changed)
+        self.table_view.model.failed.connect(self._model_failed)
+        self.table_view.model.fts_changed.connect(self._fts_changed)
+
+        # our dialogs (built on first use)
+        self._dialogs = {}
 
-        # point to our transaction callback functions
-        self._add_book_dialog.transaction_finished.connect(self._add_book_finished)
-        self._add_client_dialog.transaction_finished.connect(self._add_client_finished)
-        self._transaction_dialog.transaction_finished.connect(self._transaction_finished)
+        # optional performance overlay (see BM_Profiler)
+        self.profiler = self.table_view.model.profiler
+        self.profiler.recorded.connect(self._action_recorded)
+        self.profiler.captured.connect(self._action_captured)
+        self._search_token = None
 
-        # handle search
+        # handle search (debounced and run off the GUI thread)
+        self.search_scheduler = BM_Search_Scheduler(self.table_view.model)
+        self.search_scheduler.finished.connect(self._search_finished)
         self.searchbar.textEdited.connect(self._search_items)
 
         self.setCentralWidget(self.view)
@@ -45,6 +70,30 @@ class BM_Main_Window(QMainWindow):
         # set up user interface
         self.init_ui()
 
+    def _dialog(self, name):
+        # return a dialog, building it on first use
+        dialog = self._dialogs.get(name)
+
+        if dialog is None:
+            module, cls, finished = DIALOGS[name]
+            cls = getattr(importlib.import_module(module), cls)
+
+            # the reports and transaction windows run their queries on the model's executor
+            if name == "diagnostics":
+                dialog = cls(self.table_view.model.tracer)
+            elif name in ("add_book", "add_client"):
+                dialog = cls()
+            else:
+                dialog = cls(self.table_view.model.executor)
+
+            # point to our transaction callback function
+            if finished is not None:
+                dialog.transaction_finished.connect(getattr(self, finished))
+
+            self._dialogs[name] = dialog
+
+        return dialog
+
     def init_ui(self):
         # set up layout
         layout = QVBoxLayout()
@@ -64,6 +113,19 @@ class BM_Main_Window(QMainWindow):
         self.menubar = self.menuBar()
         self.statusBar().showMessage("Welcome to the Book Management interface!")
 
+        # rolling statistics of the latest measured action (shown while the overlay is enabled)
+        self.perf_label = QLabel()
+        self.perf_label.setVisible(self.profiler.enabled)
+        self.statusBar().addPermanentWidget(self.perf_label)
+
+        # the statistics of every action (paints included) on hover, refreshed once a second instead of every frame
+        self.perf_timer = QTimer(self)
+        self.perf_timer.setInterval(1000)
+        self.perf_timer.timeout.connect(self._refresh_perf)
+
+        if self.profiler.enabled:
+            self.perf_timer.start()
+
         # create our menus
         self.init_menu()
 
@@ -89,12 +151,63 @@ class BM_Main_Window(QMainWindow):
         a_app_record_transaction.triggered.connect(self._record_transaction)
         m_app.addAction(a_app_record_transaction)
 
+        a_app_record_batch = QAction("Record B&atch Transaction", self)
+        a_app_record_batch.setShortcut("Ctrl+4")
+        a_app_record_batch.setStatusTip("Record a transaction for many books at once.")
+        a_app_record_batch.triggered.connect(self._record_batch_transaction)
+        m_app.addAction(a_app_record_batch)
+
+        m_app.addSeparator()
+
+        a_app_import_books = QAction("&Import Books...", self)
+        a_app_import_books.setStatusTip("Import books from a CSV file.")
+        a_app_import_books.triggered.connect(lambda: self._import_csv("books"))
+        m_app.addAction(a_app_import_books)
+
+        a_app_import_clients = QAction("Import C&lients...", self)
+        a_app_import_clients.setStatusTip("Import clients from a CSV file.")
+        a_app_import_clients.triggered.connect(lambda: self._import_csv("clients"))
+        m_app.addAction(a_app_import_clients)
+
+        a_app_export = QAction("&Export...", self)
+        a_app_export.setStatusTip("Export the active table (and search) to a CSV or JSON Lines file.")
+        a_app_export.triggered.connect(self._export)
+        m_app.addAction(a_app_export)
+
+        m_app.addSeparator()
+
         a_app_refresh = QAction("&Refresh", self)
         a_app_refresh.setShortcut("Ctrl+R")
         a_app_refresh.setStatusTip("Refresh the active table.")
         a_app_refresh.triggered.connect(self._refresh)
         m_app.addAction(a_app_refresh)
 
+        a_app_archive = QAction("&Archive Old Logs...", self)
+        a_app_archive.setStatusTip("Move old log entries out of the logs view into the archive.")
+        a_app_archive.triggered.connect(self._archive_logs)
+        m_app.addAction(a_app_archive)
+
+        a_app_rebuild = QAction("Re&build Counters", self)
+        a_app_rebuild.setStatusTip("Recompute the circulation counters of every book and client from the logs.")
+        a_app_rebuild.triggered.connect(self._rebuild_stats)
+        m_app.addAction(a_app_rebuild)
+
+        a_app_diagnostics = QAction("&Diagnostics...", self)
+        a_app_diagnostics.setShortcut("Ctrl+Shift+D")
+        a_app_diagnostics.setStatusTip("Show timing statistics and slow queries of every database statement.")
+        a_app_diagnostics.triggered.connect(self._show_diagnostics)
+        m_app.addAction(a_app_diagnostics)
+
+        a_app_profile = QAction("&Profile Next Action...", self)
+        a_app_profile.setStatusTip("Save cProfile statistics of the next action to a file.")
+        a_app_profile.triggered.connect(lambda: self._capture_next("profile"))
+        m_app.addAction(a_app_profile)
+
+        a_app_memory = QAction("Snapshot &Memory of Next Action...", self)
+        a_app_memory.setStatusTip("Save a tracemalloc snapshot of the memory allocated by the next action to a file.")
+        a_app_memory.triggered.connect(lambda: self._capture_next("memory"))
+        m_app.addAction(a_app_memory)
+
         m_app.addSeparator()
 
         a_app_quit = QAction("&Quit", self)
@@ -124,6 +237,49 @@ class BM_Main_Window(QMainWindow):
         a_view_logs.triggered.connect(self._switch_to_logs)
         m_view.addAction(a_view_logs)
 
+        a_view_loans = QAction("Lo&ans View", self)
+        a_view_loans.setShortcut("Ctrl+Shift+4")
+        a_view_loans.setStatusTip("Switch to outstanding loans view.")
+        a_view_loans.triggered.connect(self._switch_to_loans)
+        m_view.addAction(a_view_loans)
+
+        self.a_view_archive = QAction("Include &Archived Logs", self)
+        self.a_view_archive.setCheckable(True)
+        self.a_view_archive.setStatusTip("Show archived log entries in the logs view (and its exports).")
+        self.a_view_archive.triggered.connect(self._toggle_archive)
+        m_view.addAction(self.a_view_archive)
+
+        m_view.addSeparator()
+
+        self.a_view_stats = QAction("Circulation &Counters", self)
+        self.a_view_stats.setCheckable(True)
+        self.a_view_stats.setStatusTip("Show how often books and clients borrowed and returned, and when they last did.")
+        self.a_view_stats.triggered.connect(self._toggle_stats)
+        m_view.addAction(self.a_view_stats)
+
+        self.a_view_fts = QAction("&Full-Text Search", self)
+        self.a_view_fts.setCheckable(True)
+        self.a_view_fts.setStatusTip("Search the database with SQLite full-text search.")
+        self.a_view_fts.triggered.connect(self._toggle_fts)
+        m_view.addAction(self.a_view_fts)
+
+        self.a_view_rank = QAction("Rank Results by &Relevance", self)
+        self.a_view_rank.setCheckable(True)
+        self.a_view_rank.setEnabled(False)
+        self.a_view_rank.setStatusTip("Order full-text search results by relevance.")
+        self.a_view_rank.triggered.connect(self._toggle_fts)
+        m_view.addAction(self.a_view_rank)
+
+        m_view.addSeparator()
+
+        self.a_view_perf = QAction("&Performance Overlay", self)
+        self.a_view_perf.setShortcut("Ctrl+Shift+P")
+        self.a_view_perf.setCheckable(True)
+        self.a_view_perf.setChecked(self.profiler.enabled)
+        self.a_view_perf.setStatusTip("Show the time, data() calls and rows of every action in the status bar.")
+        self.a_view_perf.triggered.connect(self._toggle_perf)
+        m_view.addAction(self.a_view_perf)
+
         # books action menu
         self.m_books = self.menubar.addMenu("B&ooks")
         self.a_books_edit = QAction("&Edit book", self)
@@ -134,10 +290,20 @@ class BM_Main_Window(QMainWindow):
 
         self.a_books_delete = QAction("&Delete book", self)
         self.a_books_delete.setShortcut("Delete")
-        self.a_books_delete.setStatusTip("Delete the currently selected book.")
+        self.a_books_delete.setStatusTip("Delete the currently selected book(s).")
         self.a_books_delete.triggered.connect(self._delete_book)
         self.m_books.addAction(self.a_books_delete)
 
+        self.a_books_stock = QAction("Set &Stock...", self)
+        self.a_books_stock.setStatusTip("Set the stock of the currently selected book(s).")
+        self.a_books_stock.triggered.connect(self._set_stock)
+        self.m_books.addAction(self.a_books_stock)
+
+        self.a_books_holders = QAction("&Who Has This Book?", self)
+        self.a_books_holders.setStatusTip("Show the clients currently holding the selected book.")
+        self.a_books_holders.triggered.connect(self._show_holders)
+        self.m_books.addAction(self.a_books_holders)
+
         # clients action menu
         self.m_clients = self.menubar.addMenu("&Clients")
         self.a_clients_edit = QAction("&Edit client", self)
@@ -146,13 +312,26 @@ class BM_Main_Window(QMainWindow):
         self.m_clients.addAction(self.a_clients_edit)
 
         self.a_clients_delete = QAction("&Delete client", self)
-        self.a_clients_delete.setStatusTip("Delete the currently selected client.")
+        self.a_clients_delete.setStatusTip("Delete the currently selected client(s).")
         self.a_clients_delete.triggered.connect(self._delete_client)
         self.m_clients.addAction(self.a_clients_delete)
 
+        self.a_clients_loans = QAction("&Outstanding Loans", self)
+        self.a_clients_loans.setStatusTip("Show the books the selected client still has to return.")
+        self.a_clients_loans.triggered.connect(self._show_loans)
+        self.m_clients.addAction(self.a_clients_loans)
+
         # initially disable the clients menu
         self.m_clients.setEnabled(False)
 
+        # reports menu
+        m_reports = self.menubar.addMenu("&Reports")
+        a_reports_show = QAction("&Circulation Reports...", self)
+        a_reports_show.setShortcut("Ctrl+Shift+R")
+        a_reports_show.setStatusTip("Show borrowing trends, stock-outs and client activity.")
+        a_reports_show.triggered.connect(self._show_reports)
+        m_reports.addAction(a_reports_show)
+
         # help menu
         m_help = self.menubar.addMenu("&Help")
         a_help_about = QAction("About &Book Manager", self)
@@ -167,12 +346,21 @@ class BM_Main_Window(QMainWindow):
         m_help.addAction(a_help_qt)
 
     def _search_items(self, predicate):
-        # pass the predicate to our model
-        self.table_view.model.search(predicate)
+        # measured from the keystroke to the results (a newer search supersedes the previous one)
+        self.profiler.cancel(self._search_token)
+        self._search_token = self.profiler.start("search")
+
+        # pass the predicate to our search scheduler
+        self.search_scheduler.schedule(predicate)
+
+    @pyqtSlot(str, float)
+    def _search_finished(self, predicate, elapsed):
+        self.profiler.stop(self._search_token)
+        self._search_token = None
 
         # update status bar
         if predicate != "" and ';' not in predicate:
-            self.statusBar().showMessage('Showing results for "%s"' % predicate)
+            self.statusBar().showMessage('Showing results for "%s" (%.1f ms)' % (predicate, elapsed * 1000))
         elif predicate != "" and ';' in predicate:
             message = "Showing results for "
             predicates = predicate.split(';')
@@ -190,10 +378,25 @@ class BM_Main_Window(QMainWindow):
                 message += '"%s"%s' % (predicates[i], suffix)
 
             # update status bar
-            self.statusBar().showMessage(message)
+            self.statusBar().showMessage("%s (%.1f ms)" % (message, elapsed * 1000))
         else:
             self.statusBar().showMessage("Search finished...")
 
+    def _toggle_fts(self):
+        # (re)configure the full-text search engine (the tables are installed in the background)
+        self.table_view.model.enable_fts(self.a_view_fts.isChecked(), self.a_view_rank.isChecked())
+
+    @pyqtSlot(bool)
+    def _fts_changed(self, enabled):
+        if self.a_view_fts.isChecked() and not enabled:
+            QMessageBox.warning(self, "Full-Text Search", "SQLite full-text search (FTS5) is not available!")
+            self.a_view_fts.setChecked(False)
+
+        self.a_view_rank.setEnabled(enabled)
+
+        # re-run the active search
+        self._search_items(self.searchbar.text())
+
     # confirmation dialog
     def confirm(self, title, message):
         response = QMessageBox.question(self, title, message)
@@ -214,9 +417,24 @@ class BM_Main_Window(QMainWindow):
         # show Qt information
         QMessageBox.aboutQt(self)
 
+    # model callback functions
+    @pyqtSlot(bool)
+    def _loading_changed(self, loading):
+        if loading:
+            self.statusBar().showMessage("Loading...")
+
+    @pyqtSlot(str, str)
+    def _model_failed(self, title, message):
+        QMessageBox.warning(self, title, message)
+
     # table view update callback function
     @pyqtSlot(int)
     def _table_view_updated(self, x):
+        # results of a pending search no longer apply
+        self.search_scheduler.cancel()
+        self.profiler.cancel(self._search_token)
+        self._search_token = None
+
         self.statusBar().showMessage("Loaded %i item(s)..." % x)
 
     # mode switching methods
@@ -227,6 +445,7 @@ class BM_Main_Window(QMainWindow):
         # enable the books menu
         self.m_books.setEnabled(True)
         self.a_books_delete.setEnabled(True)
+        self.a_books_stock.setEnabled(True)
 
         # disable the clients menu
         self.m_clients.setEnabled(False)
@@ -254,6 +473,7 @@ class BM_Main_Window(QMainWindow):
         # disable the books menu
         self.m_books.setEnabled(False)
         self.a_books_delete.setEnabled(False)
+        self.a_books_stock.setEnabled(False)
 
         # update keyboard shortcuts
         self.a_clients_edit.setShortcut("Return")
@@ -271,6 +491,7 @@ class BM_Main_Window(QMainWindow):
         self.table_view.switch_mode(Model_Mode.Log)
         self.m_books.setEnabled(True)
         self.a_books_delete.setEnabled(False)
+        self.a_books_stock.setEnabled(False)
         self.m_clients.setEnabled(True)
         self.a_clients_delete.setEnabled(False)
 
@@ -285,16 +506,146 @@ class BM_Main_Window(QMainWindow):
 
         self.setWindowTitle("Book Management - Logs")
 
+    def _switch_to_loans(self):
+        # switch to loans mode (loans are settled by recording returns, never edited directly)
+        self.table_view.switch_mode(Model_Mode.Loan)
+        self.m_books.setEnabled(True)
+        self.a_books_delete.setEnabled(False)
+        self.a_books_stock.setEnabled(False)
+        self.m_clients.setEnabled(True)
+        self.a_clients_delete.setEnabled(False)
+
+        # update keyboard shortcuts
+        self.a_clients_delete.setShortcut("Delete")
+        self.a_books_delete.setShortcut("Delete")
+        self.a_clients_edit.setShortcut("Shift+C")
+        self.a_books_edit.setShortcut("Shift+B")
+
+        # reset search bar
+        self.searchbar.setText("")
+
+        self.setWindowTitle("Book Management - Loans")
+
     def _refresh(self):
         # reset search bar
         self.searchbar.setText("")
 
+        # reload our cached rows and search indexes from the database
+        self.table_view.model.invalidate()
+
         self.table_view.switch_mode(self.table_view.model.mode)
 
+    def _toggle_stats(self):
+        # show (or hide) the circulation counter columns
+        self.table_view.model.show_stats(self.a_view_stats.isChecked())
+
+    def _toggle_archive(self):
+        self.table_view.model.show_archive(self.a_view_archive.isChecked())
+
+        # reload the logs view
+        if self.table_view.model.mode == Model_Mode.Log:
+            self._switch_to_logs()
+
+    def _archive_logs(self):
+        days, ok = QInputDialog.getInt(self, "Archive Old Logs", "Archive log entries older than (days):",
+                                       365, 0, 100000)
+
+        if not ok:
+            return
+
+        self.statusBar().showMessage("Archiving log entries older than %i day(s)..." % days)
+
+        # entries are moved in the background, a batch at a time
+        self.table_view.model.archive_logs(
+            days, lambda moved: self.statusBar().showMessage("Archived %i log entries..." % moved),
+            self._logs_archived)
+
+    def _logs_archived(self, moved):
+        # the logs view only shows the hot entries
+        if moved > 0 and self.table_view.model.mode == Model_Mode.Log and not self.table_view.model.archived:
+            self._switch_to_logs()
+
+        self.statusBar().showMessage("Archived %i log entries." % moved)
+
+    def _rebuild_stats(self):
+        self.statusBar().showMessage("Rebuilding circulation counters...")
+        self.table_view.model.rebuild_stats(self._stats_rebuilt)
+
+    def _stats_rebuilt(self, stale):
+        # reload the list on display if any counters were stale
+        if stale > 0:
+            self._refresh()
+
+        self.statusBar().showMessage("Rebuilt circulation counters (%i stale counter(s) fixed)..." % stale)
+
+    def _show_reports(self):
+        # adjust its positioning
+        self._reports_window.move(self.x(), self.y())
+
+        # show the reports window (it updates itself in the background)
+        with self.profiler.measure("activate reports"):
+            self._reports_window.activate()
+
+    # performance overlay methods
+    def _toggle_perf(self):
+        self.profiler.enable(self.a_view_perf.isChecked())
+        self.perf_label.setVisible(self.profiler.enabled)
+        self._search_token = None
+
+        if self.profiler.enabled:
+            self.perf_timer.start()
+        else:
+            self.perf_timer.stop()
+
+    def _action_recorded(self, name):
+        # the latest user action (paints and relayouts are not reported, see BM_Profiler)
+        summary = self.profiler.summary(name)
+
+        self.perf_label.setText("%s %.1f ms (p50 %.1f, p90 %.1f ms, n=%i) | %i data() | %i headerData() | %i rows" % (
+            name, summary["last_ms"], summary["p50_ms"], summary["p90_ms"], summary["n"], summary["data_calls"],
+            summary["header_calls"], summary["rows"]))
+
+    def _refresh_perf(self):
+        # every action on hover
+        self.perf_label.setToolTip("\n".join(
+            "%s: p50 %.1f ms, p90 %.1f ms, max %.1f ms, %.0f data() per action (n=%i)" % (
+                s["name"], s["p50_ms"], s["p90_ms"], s["max_ms"], s["mean_data_calls"], s["n"])
+            for s in self.profiler.summaries()))
+
+    def _capture_next(self, kind):
+        # pick the capture file, then wait for the next action
+        if kind == "profile":
+            filename, _ = QFileDialog.getSaveFileName(self, "Profile Next Action", "action.prof",
+                                                      "cProfile statistics (*.prof)")
+        else:
+            filename, _ = QFileDialog.getSaveFileName(self, "Snapshot Memory of Next Action", "action.tracemalloc",
+                                                      "tracemalloc snapshots (*.tracemalloc)")
+
+        if not filename:
+            return
+
+        # captures need the overlay
+        if not self.profiler.enabled:
+            self.a_view_perf.setChecked(True)
+            self._toggle_perf()
+
+        self.profiler.capture_next(kind, filename)
+        self.statusBar().showMessage("The next action will be captured to %s..." % filename)
+
+    def _action_captured(self, name, filename):
+        self.statusBar().showMessage('Captured "%s" to %s.' % (name, filename))
+
+    def _show_diagnostics(self):
+        # adjust its positioning
+        self._diagnostics_window.move(self.x(), self.y())
+
+        self._diagnostics_window.activate()
+
     # add items methods
     def _add_book(self):
         # show the add book dialog
-        self._add_book_dialog.activate(purpose="add")
+        with self.profiler.measure("activate add book"):
+            self._add_book_dialog.activate(purpose="add")
 
         # switch to book view
         self._switch_to_books()
@@ -304,7 +655,8 @@ class BM_Main_Window(QMainWindow):
 
     def _add_client(self):
         # show the add client dialog
-        self._add_client_dialog.activate()
+        with self.profiler.measure("activate add client"):
+            self._add_client_dialog.activate()
 
         # adjust its positioning
         self._add_client_dialog.move(self.x(), self.y())
@@ -316,81 +668,301 @@ class BM_Main_Window(QMainWindow):
         # pre-selection values
         psb = None
         psc = None
+        ttype = None
 
         # if the user selects a book or a client, update the index
-        if self.table_view.selected_row is not None:
-            # get selection
-            selection = self.table_view.selected_item()
+        selection = self.table_view.selected_item()
 
+        if selection is not None:
             if self.table_view.model.mode == Model_Mode.Book:
-                psb = selection["title"]
-                self.statusBar().showMessage('Selecting "%s" for book...' % psb)
+                psb = selection
+                self.statusBar().showMessage('Selecting "%s" for book...' % psb["title"])
             elif self.table_view.model.mode == Model_Mode.Client:
-                psc = "%s %s" % (selection["fname"], selection["lname"])
-                self.statusBar().showMessage('Selecting "%s" for client...' % psc)
+                psc = selection
+                self.statusBar().showMessage('Selecting "%s %s" for client...' % (psc["fname"], psc["lname"]))
+            elif self.table_view.model.mode == Model_Mode.Loan:
+                # a loan is usually selected to record its return
+                psb = {"bid": selection["bid"], "title": selection["title"], "stock": selection["stock"]}
+                psc = {"cid": selection["cid"], "fname": selection["fname"], "lname": selection["lname"]}
+                self.statusBar().showMessage('Selecting "%s" lent to "%s %s"...' %
+                                             (psb["title"], psc["fname"], psc["lname"]))
+                ttype = "Returning"
 
         # adjust its positioning
         self._transaction_dialog.move(self.x(), self.y())
 
         # activate the transaction dialog
-        self._transaction_dialog.activate(psb, psc)
+        with self.profiler.measure("activate transaction"):
+            self._transaction_dialog.activate(psb, psc, ttype)
+
+    def _import_csv(self, table):
+        # pick a CSV file
+        filename, _ = QFileDialog.getOpenFileName(self, "Import %s" % table, "", "CSV files (*.csv);;All files (*)")
+
+        if not filename:
+            return
+
+        upsert = self.confirm("Update existing %s?" % table,
+                              "Should rows whose ids already exist replace the stored %s?" % table)
+
+        # run the import on a worker thread (imported here, most sessions never import anything), its statements are
+        # traced with the model's
+        from classes.bm_import_thread import BM_Import_Thread
+
+        self._import_thread = BM_Import_Thread(table, filename, upsert, self.table_view.model.tracer)
+
+        self._import_dialog = QProgressDialog("Importing %s..." % table, "Cancel", 0, 100, self)
+        self._import_dialog.canceled.connect(self._import_thread.cancel)
+
+        self._import_thread.progress.connect(self._import_progress)
+        self._import_thread.imported.connect(self._import_finished)
+        self._import_thread.start()
+
+    @pyqtSlot(int, int, int)
+    def _import_progress(self, rows, position, total):
+        self._import_dialog.setValue(int(100 * position / max(total, 1)))
+        self._import_dialog.setLabelText("Read %i row(s)..." % rows)
+
+    @pyqtSlot(int, int, str)
+    def _import_finished(self, imported, skipped, error):
+        self._import_dialog.close()
+
+        table = self._import_thread.table
+
+        # our cached rows and search indexes are out of date (batches are committed as they are written, even when
+        # the import fails or is cancelled later on)
+        self.table_view.model.invalidate()
+
+        if table == "books":
+            self._switch_to_books()
+        else:
+            self._switch_to_clients()
+
+        if error:
+            QMessageBox.warning(self, "Import failed", "Could not import %s:\n%s" %
+                                (self._import_thread.filename, error))
+        elif self._import_thread.aborted:
+            self.statusBar().showMessage("Import cancelled after %i %s (%i row(s) skipped)..." %
+                                         (imported, table, skipped))
+        else:
+            self.statusBar().showMessage("Imported %i %s (%i row(s) skipped)..." % (imported, table, skipped))
+
+    def _export(self):
+        # export the active table
+        mode = self.table_view.model.mode
+        table = {Model_Mode.Book: "books", Model_Mode.Client: "clients", Model_Mode.Log: "logs",
+                 Model_Mode.Loan: "loans"}[mode]
+
+        # the logs view may include archived entries
+        if mode == Model_Mode.Log and self.table_view.model.archived:
+            table = "history"
+
+        filename, selected = QFileDialog.getSaveFileName(self, "Export %s" % table, table + ".csv",
+                                                         "CSV files (*.csv);;JSON Lines files (*.jsonl)")
+
+        if not filename:
+            return
+
+        fmt = "jsonl" if selected.startswith("JSON") or filename.endswith(".jsonl") else "csv"
+
+        # apply the active search
+        predicate = self.searchbar.text()
+        predicates = predicate.split(';') if predicate != "" else None
+
+        # log entries may be limited to a date range
+        since = until = None
+
+        if mode == Model_Mode.Log:
+            since, ok = QInputDialog.getText(self, "Export logs", "Export entries since (YYYY-MM-DD, optional):")
+
+            if not ok:
+                return
+
+            until, ok = QInputDialog.getText(self, "Export logs", "Export entries before (YYYY-MM-DD, optional):")
+
+            if not ok:
+                return
+
+        # run the export on a worker thread (imported here, most sessions never export anything)
+        from classes.bm_export_thread import BM_Export_Thread
+
+        self._export_thread = BM_Export_Thread(table, filename, fmt, predicates, since.strip() if since else None,
+                                               until.strip() if until else None, self.table_view.model.tracer)
+
+        self._export_dialog = QProgressDialog("Exporting %s..." % table, "Cancel", 0, 100, self)
+        self._export_dialog.canceled.connect(self._export_thread.cancel)
+
+        self._export_thread.progress.connect(self._export_progress)
+        self._export_thread.exported.connect(self._export_finished)
+        self._export_thread.start()
+
+    @pyqtSlot(int, int)
+    def _export_progress(self, written, total):
+        self._export_dialog.setValue(int(100 * written / max(total, 1)))
+        self.statusBar().showMessage("Exported %i of %i row(s)..." % (written, total))
+
+    @pyqtSlot(object, str)
+    def _export_finished(self, written, error):
+        self._export_dialog.close()
+
+        if error:
+            QMessageBox.warning(self, "Export failed", "Could not export %s:\n%s" %
+                                (self._export_thread.filename, error))
+        elif written is None:
+            self.statusBar().showMessage("Export cancelled...")
+        else:
+            self.statusBar().showMessage('Exported %i row(s) to "%s"...' % (written, self._export_thread.filename))
+
+    def _record_batch_transaction(self):
+        # pre-select the selected client (if any)
+        psc = None
+
+        if self.table_view.model.mode == Model_Mode.Client:
+            psc = self.table_view.selected_item()
+
+        # adjust its positioning
+        self._batch_transaction_dialog.move(self.x(), self.y())
+
+        # activate the batch transaction dialog
+        with self.profiler.measure("activate batch transaction"):
+            self._batch_transaction_dialog.activate(psc)
 
     # book menu methods
     def _edit_book(self):
-        if self.table_view.selected_row is not None:
-            # get the selected item
-            selection = self.table_view.selected_item()
+        # get the selected item (not the last activated one, another row may have been clicked since)
+        rows = self.table_view.selected_rows()
+
+        if rows:
+            selection = self.table_view.model.items[rows[0]]
 
             # adjust positioning
             self._add_book_dialog.move(self.x(), self.y())
 
             # open the add book dialog in edit mode
-            self._add_book_dialog.activate(
-                purpose="edit", values=selection, sid=self.table_view.selected_row)
+            with self.profiler.measure("activate edit book"):
+                self._add_book_dialog.activate(purpose="edit", values=selection, sid=rows[0])
 
     def _delete_book(self):
-        # get the selected item
-        selection = self.table_view.selected_item()
+        # delete every selected book at once
+        bids = self.table_view.selected_keys("bid")
+
+        if len(bids) > 1:
+            if self.confirm("Are you sure?", "Deleting %i books is irreversible!" % len(bids)):
+                self.table_view.model.bulk_delete(Model_Mode.Book, bids)
+
+                # update status bar
+                self.statusBar().showMessage("Deleting %i books from the database..." % len(bids))
+
+            return
+
+        # get the selected item (not the last activated one, another row may have been clicked since)
+        rows = self.table_view.selected_rows()
+
+        if not rows:
+            return
+
+        selection = self.table_view.model.items[rows[0]]
 
         # verify this action first
         if self.confirm("Are you sure?", 'Deleting "%s" is irreversible!' % selection["title"]):
-            if self.table_view.selected_row is not None:
-                # exterminate this book!
-                self.table_view.model.book_mod(
-                    "delete", target=selection["bid"], sid=self.table_view.selected_row)
+            # exterminate this book!
+            self.table_view.model.book_mod("delete", target=selection["bid"], sid=rows[0])
 
-                # update status bar
-                self.statusBar().showMessage(
-                    'Deleting "%s" from the database...' % selection["title"])
+            # update status bar
+            self.statusBar().showMessage(
+                'Deleting "%s" from the database...' % selection["title"])
+
+    def _show_holders(self):
+        # list the clients holding the selected book (read through the loans table's book index)
+        selection = self.table_view.selected_item()
+
+        if selection is None:
+            return
+
+        self.table_view.model.holders(selection["bid"], lambda rows: self._show_rows(
+            'Who has "%s"?' % selection["title"], "Nobody has borrowed this book.",
+            ["%s %s (since %s)" % (row["fname"], row["lname"], row["ldate"]) for row in rows]))
 
     # client menu methods
+    def _show_loans(self):
+        # list the books the selected client still has to return (read through the loans table's client index)
+        selection = self.table_view.selected_item()
+
+        if selection is None:
+            return
+
+        self.table_view.model.loans_of(selection["cid"], lambda rows: self._show_rows(
+            "Outstanding loans of %s %s" % (selection["fname"], selection["lname"]), "Nothing to return.",
+            ["%s (since %s)" % (row["title"], row["ldate"]) for row in rows]))
+
+    def _show_rows(self, title, empty, lines):
+        # show a short list of rows (loans lists are short, the first rows are enough)
+        if len(lines) == 0:
+            QMessageBox.information(self, title, empty)
+        elif len(lines) > 30:
+            QMessageBox.information(self, title, "\n".join(lines[:30] + ["... and %i more" % (len(lines) - 30)]))
+        else:
+            QMessageBox.information(self, title, "\n".join(lines))
+
     def _edit_client(self):
-        # get the selected item
-        if self.table_view.selected_row is not None:
-            selection = self.table_view.selected_item()
+        # get the selected item (not the last activated one, another row may have been clicked since)
+        rows = self.table_view.selected_rows()
+
+        if rows:
+            selection = self.table_view.model.items[rows[0]]
 
             # adjust positioning
             self._add_client_dialog.move(self.x(), self.y())
 
             # activate the client dialog in edit mode
-            self._add_client_dialog.activate(
-                purpose="edit", values=selection, sid=self.table_view.selected_row)
+            with self.profiler.measure("activate edit client"):
+                self._add_client_dialog.activate(purpose="edit", values=selection, sid=rows[0])
+
+    def _set_stock(self):
+        # update the stock of every selected book at once
+        bids = self.table_view.selected_keys("bid")
+
+        if len(bids) == 0:
+            return
+
+        stock, ok = QInputDialog.getInt(self, "Set Stock", "Stock of the %i selected book(s):" % len(bids), 0, 0, 10000)
+
+        if ok:
+            self.table_view.model.bulk_update(Model_Mode.Book, bids, {"stock": stock})
+
+            # update status bar
+            self.statusBar().showMessage("Updating %i book(s)..." % len(bids))
 
     def _delete_client(self):
-        # get the selected item
-        selection = self.table_view.selected_item()
+        # delete every selected client at once
+        cids = self.table_view.selected_keys("cid")
+
+        if len(cids) > 1:
+            if self.confirm("Are you sure?", "Deleting %i clients is irreversible!" % len(cids)):
+                self.table_view.model.bulk_delete(Model_Mode.Client, cids)
+
+                # update status bar
+                self.statusBar().showMessage("Deleting %i clients from the database..." % len(cids))
+
+            return
+
+        # get the selected item (not the last activated one, another row may have been clicked since)
+        rows = self.table_view.selected_rows()
+
+        if not rows:
+            return
+
+        selection = self.table_view.model.items[rows[0]]
 
         # verify this action first
         if self.confirm("Are you sure?", 'Deleting "%s %s" is irreversible!' %
                         (selection["fname"], selection["lname"])):
-            if self.table_view.selected_row is not None:
-                # delete this book
-                self.table_view.model.client_mod(
-                    "delete", target=selection["cid"], sid=self.table_view.selected_row)
+            # delete this client
+            self.table_view.model.client_mod("delete", target=selection["cid"], sid=rows[0])
 
-                # update status bar
-                self.statusBar().showMessage('Deleting "%s %s" from the database...' %
-                                             (selection["fname"], selection["lname"]))
+            # update status bar
+            self.statusBar().showMessage('Deleting "%s %s" from the database...' %
+                                         (selection["fname"], selection["lname"]))
 
     # define our transaction callback functions
     @pyqtSlot(dict)
@@ -423,14 +995,22 @@ class BM_Main_Window(QMainWindow):
 
     @pyqtSlot(dict)
     def _transaction_finished(self, response):
-        if response["bid"] and response["cid"] and response["type"] and response["stock"] is not None:
-            # handle "out of stock" event
-            if response["type"] == "Borrowing" and response["stock"] == 0:
-                QMessageBox.warning(self, "Invalid Transaction", "This book is out of stock!")
-            else:
-                # insert this transaction to the database
-                self.table_view.model.transaction_mod(
-                    "add", response["bid"], response["cid"], response["type"])
+        if response["bid"] and response["cid"] and response["type"]:
+            # insert this transaction to the database (the model checks the stock as it records the transaction and
+            # warns us if the book is out of stock, the picked row may be older than that)
+            self.table_view.model.transaction_mod("add", response["bid"], response["cid"], response["type"])
+
+            # switch to logs view
+            self._switch_to_logs()
+
+    @pyqtSlot(dict)
+    def _batch_transaction_finished(self, response):
+        if response["bids"] and response["cid"] and response["type"]:
+            # record every transaction at once (the model warns us if any book is out of stock)
+            if not self.table_view.model.transaction_batch(response["bids"], response["cid"], response["type"]):
+                return
+
+            # switch to logs view (once for the whole batch)
+            self._switch_to_logs()
 
-                # switch to logs view
-                self._switch_to_logs()
+            self.statusBar().showMessage("Recording %i transaction(s)..." % len(response["bids"]))
@@ -0,0 +1,115 @@
+"""
+    This file contains the definition for the Book Management Migrations class
+"""
+
+
+class BM_Migrations:
+    # this class upgrades the database schema, the applied version is stored in "PRAGMA user_version"
+    def __init__(self, database):
+        # database connection
+        self.database = database
+
+        # migrations in order (applying migration "i" takes the schema to version i + 1)
+        self.migrations = [
+            # indexes for the logs joins, cascading deletes, keyset pages and name/title lookups
+            ["CREATE INDEX IF NOT EXISTS logs_bid ON logs (bid)",
+             "CREATE INDEX IF NOT EXISTS logs_cid ON logs (cid)",
+             "CREATE INDEX IF NOT EXISTS logs_ldate_lid ON logs (ldate, lid)",
+             "CREATE INDEX IF NOT EXISTS clients_lname_fname ON clients (lname, fname)",
+             "CREATE INDEX IF NOT EXISTS books_title ON books (title)",
+             "ANALYZE"],
+
+            # case-insensitive prefix lookups for the book and client pickers
+            ["CREATE INDEX IF NOT EXISTS books_title_nocase ON books (title COLLATE NOCASE)",
+             "CREATE INDEX IF NOT EXISTS clients_fname_nocase ON clients (fname COLLATE NOCASE)",
+             "CREATE INDEX IF NOT EXISTS clients_lname_nocase ON clients (lname COLLATE NOCASE)",
+             "ANALYZE"],
+
+            # outstanding loans (one row per borrowed copy, keyed by its "Borrowing" log entry)
+            ["CREATE TABLE IF NOT EXISTS loans (\n"
+             "lid integer not null primary key,\n"
+             "bid integer not null,\n"
+             "cid integer not null,\n"
+             "ldate datetime not null\n"
+             ")",
+             "CREATE INDEX IF NOT EXISTS loans_bid_cid ON loans (bid, cid)",
+             "CREATE INDEX IF NOT EXISTS loans_cid ON loans (cid)",
+             "CREATE INDEX IF NOT EXISTS loans_ldate_lid ON loans (ldate, lid)",
+             # replay the history: returns settle the oldest copies a client borrowed, the rest are still out
+             "INSERT OR IGNORE INTO loans (lid, bid, cid, ldate) "
+             "SELECT lid, bid, cid, ldate FROM ("
+             "SELECT lid, bid, cid, ldate, ltype, "
+             "ROW_NUMBER() OVER (PARTITION BY bid, cid, ltype ORDER BY lid DESC) AS n, "
+             "SUM(CASE ltype WHEN 'Borrowing' THEN 1 ELSE -1 END) OVER (PARTITION BY bid, cid) AS outstanding "
+             "FROM logs) "
+             "WHERE ltype='Borrowing' AND n <= outstanding",
+             "ANALYZE loans"],
+
+            # circulation counters per book and client (kept up to date with every transaction and deletion)
+            ["CREATE TABLE IF NOT EXISTS book_stats (\n"
+             "bid integer not null primary key,\n"
+             "borrows integer not null default 0,\n"
+             "returns integer not null default 0,\n"
+             "lastdate datetime\n"
+             ")",
+             "CREATE TABLE IF NOT EXISTS client_stats (\n"
+             "cid integer not null primary key,\n"
+             "borrows integer not null default 0,\n"
+             "returns integer not null default 0,\n"
+             "lastdate datetime\n"
+             ")",
+             "INSERT OR REPLACE INTO book_stats (bid, borrows, returns, lastdate) "
+             "SELECT bid, SUM(ltype='Borrowing'), SUM(ltype='Returning'), MAX(ldate) FROM logs GROUP BY bid",
+             "INSERT OR REPLACE INTO client_stats (cid, borrows, returns, lastdate) "
+             "SELECT cid, SUM(ltype='Borrowing'), SUM(ltype='Returning'), MAX(ldate) FROM logs GROUP BY cid"],
+
+            # cold partition of the logs (old entries keep their ids) and the whole history across both partitions
+            ["CREATE TABLE IF NOT EXISTS logs_archive (\n"
+             "lid integer not null primary key,\n"
+             "bid integer not null,\n"
+             "cid integer not null,\n"
+             "ltype varchar(10) not null,\n"
+             "ldate datetime not null\n"
+             ")",
+             "CREATE INDEX IF NOT EXISTS logs_archive_bid ON logs_archive (bid)",
+             "CREATE INDEX IF NOT EXISTS logs_archive_cid ON logs_archive (cid)",
+             "CREATE INDEX IF NOT EXISTS logs_archive_ldate_lid ON logs_archive (ldate, lid)",
+             "CREATE VIEW IF NOT EXISTS history AS "
+             "SELECT lid, bid, cid, ltype, ldate FROM logs UNION ALL "
+             "SELECT lid, bid, cid, ltype, ldate FROM logs_archive"]
+        ]
+
+    def version(self):
+        # the schema version of the database
+        return self.database.execute("PRAGMA user_version")[0][0]
+
+    def pending(self):
+        # number of migrations which have not been applied yet
+        return max(len(self.migrations) - self.version(), 0)
+
+    def migrate(self):
+        # apply every pending migration (one transaction each), returns the number of applied migrations
+        applied = 0
+
+        while True:
+            # the write lock keeps other instances from applying the same migration
+            self.database.execute("BEGIN IMMEDIATE")
+
+            try:
+                version = self.version()
+
+                if version >= len(self.migrations):
+                    self.database.execute("COMMIT")
+                    return applied
+
+                for statement in self.migrations[version]:
+                    self.database.execute(statement)
+
+                self.database.execute("PRAGMA user_version=%i" % (version + 1))
+                self.database.execute("COMMIT")
+            except Exception as e:
+                print("Debug: migration failed (%s)" % e)
+                self.database.rollback()
+                raise
+
+            applied += 1
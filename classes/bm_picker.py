@@ -0,0 +1,168 @@
+"""
+    This file contains the definition for the Book Management Picker class
+"""
+from collections import OrderedDict
+from PyQt5.QtCore import QModelIndex, QStringListModel, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QLineEdit, QCompleter
+
+# upper bound for prefix ranges (sorts after every character)
+HIGHEST = "\U0010ffff"
+
+
+class BM_Picker(QLineEdit):
+    # define picker signal
+    picked = pyqtSignal(object)
+
+    def __init__(self, executor, table, limit=20, recent=8, delay=100):
+        super().__init__()
+
+        # queries run on the executor's thread
+        self.executor = executor
+        self.database = executor.database
+
+        # the table we pick rows from ("books" or "clients") and its primary key
+        self.table = table
+        self.key = "bid" if table == "books" else "cid"
+
+        # number of matches shown
+        self.limit = limit
+
+        # the picked row (None until the user picks one)
+        self.current = None
+
+        # recently used rows (least recently used first)
+        self.recent = OrderedDict()
+        self.recent_size = recent
+
+        # rows offered by the completer, the latest query supersedes older ones
+        self.matches = []
+        self.generation = 0
+
+        # offer the matches of our queries as they are (they are already filtered)
+        self.choices = QStringListModel(self)
+        self.completer = QCompleter(self.choices, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.activated[QModelIndex].connect(self._activated)
+        self.setCompleter(self.completer)
+
+        # debounce keystrokes
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self._start)
+
+        self.textEdited.connect(self._edited)
+
+        self.setPlaceholderText("Type a %s or an ID..." % ("title" if table == "books" else "name"))
+
+    def label(self, row):
+        # the text shown for a row (the ID tells rows with the same name apart)
+        if self.table == "books":
+            return "%s (#%i)" % (row["title"], row["bid"])
+
+        return "%s %s (#%i)" % (row["fname"], row["lname"], row["cid"])
+
+    def pick(self, row):
+        # select a row (without querying anything)
+        self.current = row
+        self.setText(self.label(row) if row is not None else "")
+
+        self.picked.emit(row)
+
+    def reset(self, row=None):
+        # forget the last query, optionally pre-selecting a row, and offer the recently used rows
+        self.generation += 1
+        self.timer.stop()
+        self.pick(row)
+        self._offer(list(reversed(self.recent.values())))
+
+    def remember(self):
+        # move the picked row to the front of the recently used rows
+        if self.current is None:
+            return
+
+        self.recent[self.current[self.key]] = self.current
+        self.recent.move_to_end(self.current[self.key])
+
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    def _edited(self, text):
+        # typing invalidates the picked row
+        self.current = None
+        self.timer.start()
+
+    def _start(self):
+        self.generation += 1
+
+        generation = self.generation
+        text = self.text().strip()
+
+        self.executor.submit(self._search, text, callback=lambda rows: self._matched(generation, text, rows))
+
+    def _prefix(self, column, prefix, extra=None):
+        # rows whose column starts with a prefix (ignoring case), read in index order
+        # "extra" is an optional (column, prefix) pair the rows have to match as well
+        condition = "%s >= :low COLLATE NOCASE AND %s < :high COLLATE NOCASE" % (column, column)
+        params = {"low": prefix, "high": prefix + HIGHEST}
+
+        if extra is not None:
+            condition += " AND %s >= :elow COLLATE NOCASE AND %s < :ehigh COLLATE NOCASE" % (extra[0], extra[0])
+            params.update(elow=extra[1], ehigh=extra[1] + HIGHEST)
+
+        return self.database.execute("SELECT * FROM %s WHERE %s ORDER BY %s COLLATE NOCASE LIMIT :limit" %
+                                     (self.table, condition, column), limit=self.limit, **params)
+
+    def _search(self, text):
+        # this runs on the executor's thread, every query reads at most "limit" rows from an index
+        rows = []
+
+        if text == "":
+            return rows
+
+        # an ID ("12" or "#12")
+        if text.lstrip("#").isdigit():
+            rows += self.database.execute("SELECT * FROM %s WHERE %s=:id" % (self.table, self.key),
+                                          id=int(text.lstrip("#")))
+
+        if self.table == "books":
+            rows += self._prefix("title", text)
+        elif " " in text:
+            # a first name followed by (the start of) a last name
+            first, last = text.split(None, 1)
+            rows += self._prefix("fname", first, ("lname", last))
+        else:
+            rows += self._prefix("fname", text)
+            rows += self._prefix("lname", text)
+
+        return rows
+
+    def _matched(self, generation, text, rows):
+        # ignore superseded queries
+        if generation != self.generation:
+            return
+
+        # recently used rows come first
+        query = text.lower()
+        recent = [row for row in reversed(self.recent.values()) if query in self.label(row).lower()]
+
+        self._offer(recent + [dict(row) for row in rows])
+
+        if len(self.matches) > 0 and self.hasFocus():
+            self.completer.complete()
+
+    def _offer(self, rows):
+        # offer each row once
+        seen = set()
+        self.matches = []
+
+        for row in rows:
+            if row[self.key] not in seen and len(self.matches) < self.limit:
+                seen.add(row[self.key])
+                self.matches.append(row)
+
+        self.choices.setStringList([self.label(row) for row in self.matches])
+
+    def _activated(self, index):
+        # the completer's rows match our matches
+        self.pick(self.matches[self.completer.completionModel().mapToSource(index).row()])
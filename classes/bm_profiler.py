@@ -0,0 +1,197 @@
+"""
+    This file contains the definition for the Book Management Profiler class
+"""
+import os
+import time
+import contextlib
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class BM_Profiler(QObject):
+    # this class measures GUI actions: wall time, and the data() and headerData() calls (and distinct rows) the
+    # model answered while an action ran; it can profile (cProfile) or trace the allocations (tracemalloc) of the
+    # next action into a file
+    # every method must be called from the GUI thread (actions started on it may finish asynchronously)
+    # "recorded" is emitted for user actions only, paints and relayouts happen all the time and are measured silently
+    recorded = pyqtSignal(str)
+    captured = pyqtSignal(str, str)
+
+    def __init__(self, window=100):
+        super().__init__()
+
+        # nothing is counted until the profiler is enabled (also with the BM_PROFILE environment variable)
+        self.enabled = os.environ.get("BM_PROFILE", "") not in ("", "0")
+
+        # model call counters (see BM_Table_Model.data and headerData) and the rows touched by running actions
+        self.data_calls = 0
+        self.header_calls = 0
+        self.touched = set()
+
+        # running actions (token -> name, whether it is a user action, start time, counters at the start)
+        self.running = {}
+        self.token = 0
+
+        # the latest measurements per action (elapsed seconds, data() calls, headerData() calls, rows touched)
+        self.window = window
+        self.actions = {}
+
+        # capture of the next action (kind and file) and the action being captured
+        self.capture = None
+        self.capturing = None
+        self.profile = None
+
+    def enable(self, enabled):
+        self.enabled = enabled
+
+        # measurements of running actions no longer add up (and a running capture is dropped)
+        self.running = {}
+        self.touched = set()
+
+        if self.capturing is not None:
+            self.capturing = None
+
+            if self.profile is not None:
+                self.profile.disable()
+                self.profile = None
+            else:
+                import tracemalloc
+
+                tracemalloc.stop()
+
+    def touch(self, row):
+        # count a data() call for "row" (called by the model)
+        self.data_calls += 1
+
+        if self.running:
+            self.touched.add(row)
+
+    def header(self):
+        # count a headerData() call (called by the model)
+        self.header_calls += 1
+
+    def capture_next(self, kind, path):
+        # capture the next action ("profile" for cProfile statistics, "memory" for a tracemalloc snapshot)
+        self.capture = (kind, path)
+
+    def start(self, name, capturable=True):
+        # start measuring an action, returns the token which stops it (None while disabled)
+        # a pending capture starts with the next capturable action (paints and relayouts happen all the time)
+        if not self.enabled:
+            return None
+
+        self.token += 1
+
+        if capturable and self.capture is not None and self.capturing is None:
+            kind, path = self.capture
+            self.capture = None
+            self.capturing = (self.token, kind, path)
+
+            # (imported here, they are only needed for captures and take a while to import)
+            if kind == "profile":
+                import cProfile
+
+                self.profile = cProfile.Profile()
+                self.profile.enable()
+            else:
+                import tracemalloc
+
+                tracemalloc.start(25)
+
+        if not self.running:
+            self.touched = set()
+
+        self.running[self.token] = (name, capturable, time.perf_counter(), self.data_calls, self.header_calls)
+
+        return self.token
+
+    def stop(self, token):
+        # finish measuring an action (unknown tokens are ignored)
+        if token not in self.running:
+            return
+
+        name, capturable, start, data_calls, header_calls = self.running.pop(token)
+        elapsed = time.perf_counter() - start
+
+        if self.capturing is not None and self.capturing[0] == token:
+            self._finish_capture(name)
+
+        measurements = self.actions.setdefault(name, deque(maxlen=self.window))
+        measurements.append((elapsed, self.data_calls - data_calls, self.header_calls - header_calls,
+                             len(self.touched)))
+
+        if capturable:
+            self.recorded.emit(name)
+
+    def cancel(self, token):
+        # forget an action which will never finish (a superseded search)
+        self.running.pop(token, None)
+
+        if self.capturing is not None and self.capturing[0] == token:
+            self._finish_capture("cancelled action")
+
+    @contextlib.contextmanager
+    def measure(self, name, capturable=True):
+        # measure a block as an action
+        token = self.start(name, capturable)
+
+        try:
+            yield
+        finally:
+            self.stop(token)
+
+    def _finish_capture(self, name):
+        _, kind, path = self.capturing
+        self.capturing = None
+
+        try:
+            if kind == "profile":
+                self.profile.disable()
+                self.profile.dump_stats(path)
+                self.profile = None
+            else:
+                import tracemalloc
+
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                snapshot.dump(path)
+        except OSError as e:
+            print("Debug: could not write the capture of %s (%s)" % (name, e))
+            return
+
+        self.captured.emit(name, path)
+
+    def summary(self, name):
+        # rolling statistics of an action (or None if it was never measured)
+        measurements = self.actions.get(name)
+
+        if not measurements:
+            return None
+
+        times = sorted(m[0] for m in measurements)
+
+        def _at(q):
+            return 1000 * times[min(len(times) - 1, int(round(q * (len(times) - 1))))]
+
+        last = measurements[-1]
+
+        return {
+            "name": name,
+            "n": len(times),
+            "last_ms": 1000 * last[0],
+            "p50_ms": _at(0.50),
+            "p90_ms": _at(0.90),
+            "max_ms": 1000 * times[-1],
+            "data_calls": last[1],
+            "header_calls": last[2],
+            "rows": last[3],
+            "mean_data_calls": sum(m[1] for m in measurements) / len(measurements)
+        }
+
+    def summaries(self):
+        # rolling statistics of every measured action (by name)
+        return [self.summary(name) for name in sorted(self.actions)]
+
+    def reset(self):
+        self.actions = {}
+
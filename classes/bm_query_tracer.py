@@ -0,0 +1,201 @@
+"""
+    This file contains the definition for the Book Management Query Tracer class
+"""
+import os
+import re
+import sys
+import json
+import time
+import threading
+import contextlib
+from collections import Counter, deque
+
+# latency histogram buckets (upper bounds in milliseconds, the last bucket has none)
+BUCKETS = [0.1, 1.0, 10.0, 100.0, 1000.0]
+
+# statements which have a query plan
+PLANNED = ("SELECT", "WITH", "INSERT", "REPLACE", "UPDATE", "DELETE")
+
+# literals and expanded lists
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+class BM_Query_Tracer:
+    # this class keeps timing statistics per normalised statement, and the statements slower than "threshold"
+    # seconds with their query plans (in memory and, if "path" is given, appended to a JSON Lines slow-query log)
+    # every method is thread-safe: statements are recorded by the executor's thread as well as the GUI thread
+    def __init__(self, threshold=0.05, path=None, window=512, slow=200):
+        # slow-query threshold (seconds) and slow-query log file
+        self.threshold = threshold
+        self.path = path
+
+        # number of latest timings kept per statement and number of slow statements kept
+        self.window = window
+        self.slow = deque(maxlen=slow)
+
+        # statistics per normalised statement
+        self.statements = {}
+        self.lock = threading.Lock()
+
+        # normalised statement per statement text
+        self.normalised = {}
+
+        # operation (model method) of the statements run by each thread
+        self.local = threading.local()
+
+        # files whose frames are never the calling operation
+        self.internal = {os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                         for name in ("bm_database.py", "bm_query_tracer.py")}
+
+        self.since = time.time()
+
+    def normalise(self, statement):
+        # the statement with its literals replaced by "?" (so ids formatted into it do not create new entries)
+        text = self.normalised.get(statement)
+
+        if text is None:
+            text = LISTS.sub("?, ...", LITERALS.sub("?", " ".join(statement.split())))
+
+            # statements built with "%" formatting are not bounded
+            if len(self.normalised) > 4096:
+                self.normalised.clear()
+
+            self.normalised[statement] = text
+
+        return text
+
+    @contextlib.contextmanager
+    def operation(self, name):
+        # trace the statements run by this thread under "name" until the block ends
+        previous = getattr(self.local, "operation", None)
+        self.local.operation = name
+
+        try:
+            yield
+        finally:
+            self.local.operation = previous
+
+    def _caller(self):
+        # the operation of the running statement (the innermost function outside the database layer by default)
+        operation = getattr(self.local, "operation", None)
+
+        if operation is not None:
+            return operation
+
+        frame = sys._getframe(1)
+
+        while frame is not None and frame.f_code.co_filename in self.internal:
+            frame = frame.f_back
+
+        if frame is None:
+            return "unknown"
+
+        return getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+
+    def is_slow(self, elapsed):
+        return elapsed >= self.threshold
+
+    def record(self, statement, command, elapsed, rows=None, plan=None):
+        # add a statement's timing (seconds) and number of rows, "plan" is the query plan of a slow statement
+        text = self.normalise(statement)
+        operation = self._caller()
+
+        with self.lock:
+            stats = self.statements.get(text)
+
+            if stats is None:
+                stats = self.statements[text] = {
+                    "command": command, "calls": 0, "total": 0.0, "max": 0.0, "rows": 0, "slow": 0,
+                    "operations": Counter(), "latest": deque(maxlen=self.window)
+                }
+
+            stats["calls"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["rows"] += rows or 0
+            stats["operations"][operation] += 1
+            stats["latest"].append(elapsed)
+
+            if not self.is_slow(elapsed):
+                return
+
+            stats["slow"] += 1
+
+            entry = {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "elapsed_ms": elapsed * 1000,
+                "operation": operation,
+                "statement": " ".join(statement.split()),
+                "rows": rows,
+                "plan": plan or []
+            }
+
+            self.slow.append(entry)
+
+            if self.path is not None:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as log:
+                        log.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print("Debug: could not write the slow-query log (%s)" % e)
+
+    def reset(self):
+        # forget every statistic
+        with self.lock:
+            self.statements = {}
+            self.slow.clear()
+            self.since = time.time()
+
+    def snapshot(self):
+        # a JSON-serialisable copy of the statistics (statements by total time, slowest first)
+        with self.lock:
+            statements = [(text, dict(stats, operations=dict(stats["operations"]), latest=sorted(stats["latest"])))
+                          for text, stats in self.statements.items()]
+            slow = list(self.slow)
+            since = self.since
+
+        def _at(ordered, q):
+            return 1000 * ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+        rows = []
+
+        for text, stats in sorted(statements, key=lambda item: -item[1]["total"]):
+            latest = stats["latest"]
+
+            # the histogram of the latest timings
+            histogram = [0] * (len(BUCKETS) + 1)
+
+            for elapsed in latest:
+                histogram[sum(1 for bound in BUCKETS if elapsed * 1000 > bound)] += 1
+
+            rows.append({
+                "statement": text,
+                "command": stats["command"],
+                "operations": stats["operations"],
+                "calls": stats["calls"],
+                "rows": stats["rows"],
+                "slow": stats["slow"],
+                "total_ms": stats["total"] * 1000,
+                "mean_ms": stats["total"] * 1000 / stats["calls"],
+                "max_ms": stats["max"] * 1000,
+                "p50_ms": _at(latest, 0.50),
+                "p90_ms": _at(latest, 0.90),
+                "p99_ms": _at(latest, 0.99),
+                "histogram": histogram
+            })
+
+        return {
+            "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(since)),
+            "threshold_ms": self.threshold * 1000,
+            "buckets_ms": BUCKETS,
+            "calls": sum(row["calls"] for row in rows),
+            "total_ms": sum(row["total_ms"] for row in rows),
+            "statements": rows,
+            "slow": slow
+        }
+
+    def dump(self, path):
+        # write the statistics to "path" as JSON
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump(self.snapshot(), output, indent=2)
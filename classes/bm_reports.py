@@ -0,0 +1,131 @@
+"""
+    This file contains the definition for the Book Management Reports class
+"""
+from collections import Counter
+from datetime import date
+
+
+class BM_Reports:
+    # this class aggregates the circulation history (archived entries included) in SQL, folding in only the log
+    # entries recorded since the last refresh (the instance is not thread-safe, keep it on a single thread such as
+    # the executor's)
+    def __init__(self, database, top=10):
+        # database connection
+        self.database = database
+
+        # number of rows in the top-N reports
+        self.top = top
+
+        # report titles and column headers
+        self.sections = {
+            "top_titles": ("Most Borrowed Titles", ["Title", "Borrowings"]),
+            "per_day": ("Borrowings per Day", ["Day", "Borrowings"]),
+            "per_week": ("Borrowings per Week", ["Week", "Borrowings"]),
+            "stock_outs": ("Most Frequent Stock-Outs", ["Title", "Stock-Outs"]),
+            "client_activity": ("Client Activity", ["Transactions", "Clients"])
+        }
+
+        self._reset()
+
+    def _reset(self):
+        # last log entry folded into our aggregates and the number of entries folded so far
+        self.last = 0
+        self.total = 0
+
+        # borrowings per day and stock-outs per book
+        self.days = Counter()
+        self.outs = Counter()
+
+        # cached report rows per section
+        self.results = {}
+
+    def _fold(self, last):
+        # add the log entries after "last" to our aggregates, returns the number of entries folded
+        for day, count in self.database.execute(
+                "SELECT date(ldate) AS day, COUNT(*) FROM history WHERE lid > :last AND ltype='Borrowing' GROUP BY day",
+                last=last):
+            self.days[day] += count
+
+        # the stock after each entry is the current stock plus the borrowings and minus the returns which followed
+        # (a borrowing which left no copy behind is a stock-out)
+        for bid, count in self.database.execute(
+                "SELECT bid, COUNT(*) FROM ("
+                "SELECT history.bid, ltype, stock + IFNULL(SUM(CASE ltype WHEN 'Borrowing' THEN 1 ELSE -1 END) OVER ("
+                "PARTITION BY history.bid ORDER BY lid DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) "
+                "AS remaining FROM history JOIN books ON books.bid=history.bid WHERE lid > :last) "
+                "WHERE ltype='Borrowing' AND remaining=0 GROUP BY bid", last=last):
+            self.outs[bid] += count
+
+        return self.database.execute("SELECT COUNT(*) FROM history WHERE lid > :last", last=last)[0][0]
+
+    def refresh(self):
+        # bring our aggregates up to date, returns True if anything has changed since the last refresh
+        # (everything is read from one snapshot of the database)
+        self.database.execute("BEGIN")
+
+        try:
+            # (archived entries are older than the hot ones, but the hot table may be empty)
+            last = self.database.execute("SELECT MAX((SELECT IFNULL(MAX(lid), 0) FROM logs), "
+                                         "(SELECT IFNULL(MAX(lid), 0) FROM logs_archive))")[0][0]
+
+            # new entries are only ever added after "last", so if the log entries no longer add up to what we
+            # folded, some were deleted (counting walks the smallest index, a few milliseconds per million entries)
+            total = self.database.execute("SELECT (SELECT COUNT(*) FROM logs) + "
+                                          "(SELECT COUNT(*) FROM logs_archive)")[0][0]
+
+            if last == self.last and total == self.total and len(self.results) > 0:
+                return False
+
+            self.total += self._fold(self.last)
+
+            # deleted log entries cannot be taken out of our aggregates, start over
+            if self.total != total:
+                self._reset()
+                self.total = self._fold(0)
+
+            self.last = last
+            self.results = self._summarise()
+        finally:
+            self.database.execute("COMMIT")
+
+        return True
+
+    def _summarise(self):
+        # build the report rows (the top titles and client activity are read from the circulation counters)
+        results = {}
+
+        results["top_titles"] = [tuple(row) for row in self.database.execute(
+            "SELECT title, borrows FROM book_stats JOIN books ON books.bid=book_stats.bid "
+            "ORDER BY borrows DESC, books.bid LIMIT :limit", limit=self.top)]
+
+        results["per_day"] = sorted(self.days.items())
+
+        # ISO weeks ("2018-W07")
+        weeks = Counter()
+
+        for day, count in self.days.items():
+            year, week, _ = date.fromisoformat(day).isocalendar()
+            weeks["%i-W%02i" % (year, week)] += count
+
+        results["per_week"] = sorted(weeks.items())
+
+        # the most frequent first (ties by id, like the top titles)
+        outs = sorted(self.outs.items(), key=lambda item: (-item[1], item[0]))[:self.top]
+        titles = {row["bid"]: row["title"] for row in self.database.execute(
+            "SELECT bid, title FROM books WHERE bid IN (:bids)", bids=[bid for bid, _ in outs])} if outs else {}
+
+        results["stock_outs"] = [(titles.get(bid, "#%i" % bid), count) for bid, count in outs]
+
+        results["client_activity"] = [(row["bucket"], row["clients"]) for row in self.database.execute(
+            "SELECT CASE WHEN n = 0 THEN '0' WHEN n = 1 THEN '1' WHEN n <= 5 THEN '2-5' WHEN n <= 20 THEN '6-20' "
+            "WHEN n <= 100 THEN '21-100' ELSE 'over 100' END AS bucket, COUNT(*) AS clients FROM ("
+            "SELECT IFNULL(borrows + returns, 0) AS n FROM clients "
+            "LEFT JOIN client_stats ON client_stats.cid=clients.cid) GROUP BY bucket ORDER BY MIN(n)")]
+
+        return results
+
+    def report(self, section=None):
+        # the rows of a report section (or a dict of every section), brought up to date first
+        self.refresh()
+
+        return self.results if section is None else self.results[section]
@@ -0,0 +1,113 @@
+"""
+    This file contains the definition for the Book Management Reports Window class
+"""
+import time
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QTableWidget, \
+    QTableWidgetItem, QHeaderView, QAbstractItemView
+from classes.bm_reports import BM_Reports
+
+
+class BM_Reports_Window(QWidget):
+    def __init__(self, executor):
+        super().__init__()
+
+        # reports are computed on the executor's thread (their aggregates are kept between openings)
+        self.executor = executor
+        self.reports = BM_Reports(executor.database)
+
+        # initialise UI and layout
+        self.section = QComboBox()
+        self.table = QTableWidget()
+        self.status = QLabel()
+
+        self.keys = list(self.reports.sections)
+
+        for key in self.keys:
+            self.section.addItem(self.reports.sections[key][0])
+
+        self.section.currentIndexChanged.connect(self._show)
+
+        # the latest report rows (per section)
+        self.results = {}
+
+        self.setWindowTitle("Circulation Reports")
+
+        # set window properties
+        self.setMinimumSize(480, 420)
+        self.setMaximumSize(1024, 1024)
+
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # add a row with label
+        def _add_row(label, widget):
+            row = QWidget()
+
+            # initialise layout
+            rlayout = QHBoxLayout()
+            rlayout.addWidget(QLabel(label))
+            rlayout.addWidget(widget)
+
+            row.setLayout(rlayout)
+            layout.addWidget(row)
+
+        _add_row("Report", self.section)
+
+        # report rows are read-only
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        layout.addWidget(self.status)
+
+        # interaction buttons
+        btn_refresh = QPushButton("Refresh")
+        btn_refresh.setShortcut("F5")
+        btn_refresh.clicked.connect(self.refresh)
+
+        btn_close = QPushButton("Close")
+        btn_close.setShortcut("Esc")
+        btn_close.clicked.connect(self.hide)
+
+        layout.addWidget(btn_refresh)
+        layout.addWidget(btn_close)
+
+        self.setLayout(layout)
+
+    def activate(self):
+        # show this window with up-to-date reports
+        self.show()
+        self.refresh()
+
+    def refresh(self):
+        # fold in the latest log entries (in the background)
+        self.status.setText("Updating reports...")
+
+        start = time.perf_counter()
+
+        self.executor.submit(self.reports.report, callback=lambda results: self._refreshed(
+            results, time.perf_counter() - start), errback=lambda message: self.status.setText(
+            "Could not update reports (%s)" % message))
+
+    def _refreshed(self, results, elapsed):
+        self.results = results
+        self.status.setText("Updated in %.1f ms (%i log entries)" % (elapsed * 1000, self.reports.total))
+
+        self._show()
+
+    def _show(self):
+        # fill the table with the rows of the selected section
+        key = self.keys[self.section.currentIndex()]
+        rows = self.results.get(key, [])
+
+        self.table.clear()
+        self.table.setColumnCount(2)
+        self.table.setHorizontalHeaderLabels(self.reports.sections[key][1])
+        self.table.setRowCount(len(rows))
+
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                self.table.setItem(i, j, QTableWidgetItem(str(value)))
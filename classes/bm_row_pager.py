@@ -0,0 +1,259 @@
+"""
+    This file contains the definition for the Book Management Row Pager class
+"""
+import threading
+from classes.bm_column_store import BM_Column_Store
+
+
+class BM_Row_Pager:
+    # this class exposes a table as a lazily loaded, keyset paginated list of rows
+    def __init__(self, database, schema, first_query, next_query, key, page_size=256, max_pages=32, params=None):
+        # database connection and keyset queries (the next query receives the bound of the previous page)
+        self.database = database
+        self.first_query = first_query
+        self.next_query = next_query
+
+        # extra parameters passed to both queries
+        self.params = params or {}
+
+        # columns kept for every row (pages are stored column by column)
+        self.schema = schema
+
+        # columns which make up the keyset (in sort order)
+        self.key = key
+
+        # page properties
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        # number of rows exposed to the view
+        self.loaded = 0
+
+        # this flag is set once the last page has been read
+        self.exhausted = False
+
+        # where every page we know of after the first one starts: the keyset of a row and its position (page
+        # "p" starts at the row following bounds[p - 1], minus the rows deleted since, see __delitem__)
+        self.bounds = []
+
+        # resident pages (page index -> column store), the dict is replaced rather than changed, so the GUI thread
+        # reads and walks it without locking while a worker thread reads pages
+        self.pages = {}
+
+        # this lock serialises changes to the pages and bounds (never held while querying the database), the
+        # generation tells a page read whether the pages shifted while it was querying
+        self.lock = threading.RLock()
+        self.generation = 0
+
+    def _query(self, bound, limit):
+        # read up to "limit" rows following the given bound
+        if bound is None:
+            return self.database.execute(self.first_query, limit=limit, **self.params)
+
+        return self.database.execute(self.next_query, limit=limit, **self.params, **bound)
+
+    def _bound(self, row):
+        # extract the keyset of a row
+        return {k: row[k] for k in self.key}
+
+    def _load(self, page):
+        # return resident pages straight away (a single lookup, so cell reads never wait for a page being read)
+        store = self.pages.get(page)
+
+        if store is not None:
+            return store
+
+        while True:
+            with self.lock:
+                # another thread may have read this page while we were waiting
+                store = self.pages.get(page)
+
+                if store is not None:
+                    return store
+
+                # walk forward from the closest known bound (only happens after an invalidation)
+                known = min(page, len(self.bounds))
+                bound = self.bounds[known - 1] if known > 0 else None
+                generation = self.generation
+
+            rows = self._read(known, bound)
+            store = BM_Column_Store(self.schema).extend(rows)
+
+            with self.lock:
+                # the pages shifted while we were reading, read again
+                if generation != self.generation:
+                    continue
+
+                self._keep(known, rows, store)
+
+            if known == page:
+                return store
+
+    def _read(self, page, bound):
+        # read a page starting after a bound (skipping the rows which moved onto the page since it was recorded)
+        if bound is None:
+            return self._query(None, self.page_size)
+
+        keyset, position = bound
+        skip = page * self.page_size - position - 1
+
+        return self._query(keyset, self.page_size + skip)[skip:]
+
+    def _keep(self, page, rows, store):
+        # make a page we have read resident (called with the lock held)
+        if len(rows) > 0:
+            bound = (self._bound(rows[-1]), page * self.page_size + len(rows) - 1)
+
+            # keep track of this page's bound (a fresh one needs no skipping)
+            if page == len(self.bounds):
+                self.bounds.append(bound)
+            elif page < len(self.bounds):
+                self.bounds[page] = bound
+
+        # a short frontier page (the page following the loaded rows) means there is nothing left to read
+        if page >= self.loaded // self.page_size:
+            self.exhausted = len(rows) < self.page_size
+
+        pages = dict(self.pages)
+        pages[page] = store
+
+        # evict the pages furthest away from this one
+        while len(pages) > self.max_pages:
+            del pages[max(pages, key=lambda p: abs(p - page))]
+
+        self.pages = pages
+
+    def _invalidate(self, page):
+        # pages from this point onwards may have shifted, forget them
+        with self.lock:
+            self.generation += 1
+
+            del self.bounds[page:]
+            self.pages = {p: store for p, store in self.pages.items() if p < page}
+
+    def next_page(self):
+        # read the page following the loaded rows, returns the number of rows it adds
+        page = self.loaded // self.page_size
+        rows = self._load(page)
+
+        return page * self.page_size + len(rows) - self.loaded
+
+    def load_page(self, page):
+        # make a page resident, returns the number of rows it holds
+        return len(self._load(page))
+
+    def holds(self, index):
+        # whether a row can be read without querying the database
+        return index // self.page_size in self.pages
+
+    def grow(self, count):
+        # expose "count" more rows
+        self.loaded += count
+
+    def clear(self):
+        # forget everything, the first page will be read again when it is needed
+        self._invalidate(0)
+        self.loaded = 0
+        self.exhausted = False
+
+    def resident(self):
+        # number of rows held in memory
+        return sum(len(store) for store in self.pages.values())
+
+    def locate(self, key, value):
+        # position of a resident row, or -1
+        for page, store in self.pages.items():
+            offset = store.find(key, value)
+
+            if offset >= 0:
+                return page * self.page_size + offset
+
+        return -1
+
+    def patch(self, key, row):
+        # update a row if it is resident (other rows will be read from the database)
+        index = self.locate(key, row[key])
+
+        if 0 <= index < self.loaded:
+            self[index] = row
+
+    def remove(self, key, value):
+        # drop a row, starting over if we do not know where it was
+        index = self.locate(key, value)
+
+        if 0 <= index < self.loaded:
+            del self[index]
+        else:
+            self.clear()
+
+    def __len__(self):
+        return self.loaded
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.loaded
+
+        if index < 0 or index >= self.loaded:
+            raise IndexError("row index out of range")
+
+        page = index // self.page_size
+
+        return self._load(page)[index - page * self.page_size]
+
+    def cell(self, index, key):
+        # read a single value without building a row
+        page = index // self.page_size
+
+        return self._load(page).cell(index - page * self.page_size, key)
+
+    def __setitem__(self, index, row):
+        # only resident rows have to be patched, the rest will be read from the database
+        page = index // self.page_size
+        store = self.pages.get(page)
+
+        if store is not None:
+            store[index - page * self.page_size] = row
+
+    def __delitem__(self, index):
+        # a slice drops a range of rows
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(self.loaded)
+            count = max(stop - start, 0)
+        else:
+            start, count = index, 1
+
+        with self.lock:
+            self.generation += 1
+            self.loaded -= count
+
+            # the pages holding or following these rows have shifted and will be read again
+            self.pages = {p: store for p, store in self.pages.items() if p < start // self.page_size}
+
+            # the bounds of the following pages stay valid, only their positions move (a deleted bound row keeps
+            # marking the place it was deleted from), so any page can still be read with a single query
+            for i, (keyset, position) in enumerate(self.bounds):
+                if position >= start + count:
+                    self.bounds[i] = (keyset, position - count)
+                elif position >= start:
+                    self.bounds[i] = (keyset, start - 1)
+
+    def append(self, row):
+        # new rows are only visible to us once every page before them has been read
+        if self.exhausted:
+            self.loaded += 1
+            self._invalidate((self.loaded - 1) // self.page_size)
+
+    def __iter__(self):
+        # stream the whole table without disturbing the resident pages
+        bound = None
+
+        while True:
+            rows = self._query(bound, self.page_size)
+
+            for row in rows:
+                yield row
+
+            if len(rows) < self.page_size:
+                return
+
+            bound = self._bound(rows[-1])
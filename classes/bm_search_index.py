@@ -0,0 +1,213 @@
+"""
+    This file contains the definition for the Book Management Search Index class
+"""
+import threading
+from array import array
+from collections import OrderedDict
+from classes.bm_column_store import BM_Column_Store
+
+
+class BM_Search_Index:
+    # this class maintains an inverted n-gram index over the searchable fields of a table
+    # only n-grams of length "gram" are indexed, shorter predicates scan the lowercase texts (see
+    # benchmarks/bench_search_index.py for the build time and size of large indexes)
+    def __init__(self, key, schema, fields=("fname", "lname", "title"), gram=3, recent=16):
+        # primary key column of the indexed rows and the fields we search in
+        self.key = key
+        self.fields = fields
+        self.gram = gram
+
+        # indexed rows (document id -> row), deleted rows stay behind so ids keep their order
+        self.docs = BM_Column_Store(schema)
+
+        # lowercase search scope per document (None once deleted)
+        self.texts = []
+
+        # primary key -> document id
+        self.slots = {}
+
+        # n-gram -> array of document ids (appended to, never rewritten: entries of removed or edited documents
+        # stay behind and are filtered out by checking the text of every candidate)
+        self.postings = {}
+
+        # recently answered queries (predicates -> sorted document ids), least recently used first
+        self.recent = OrderedDict()
+        self.max_recent = recent
+
+        # searches run on a worker thread while the GUI thread keeps the index in sync with modifications
+        self.lock = threading.RLock()
+
+    def _grams(self, text):
+        # every n-gram of a string
+        return {text[i:i + self.gram] for i in range(len(text) - self.gram + 1)}
+
+    def _scope(self, doc):
+        # lowercase searchable fields of a stored document
+        return tuple(str(self.docs.cell(doc, f) or "").lower() if f in self.docs.columns else ""
+                     for f in self.fields)
+
+    def _link(self, doc):
+        # register a document's n-grams
+        grams = set()
+
+        for text in self.texts[doc]:
+            grams |= self._grams(text)
+
+        for g in grams:
+            posting = self.postings.get(g)
+
+            if posting is None:
+                posting = self.postings[g] = array("i")
+
+            posting.append(doc)
+
+    def build(self, rows, cancelled=None):
+        # index every row in order, returns None if cancelled
+        with self.lock:
+            for i, row in enumerate(rows):
+                if cancelled is not None and i % 4096 == 0 and cancelled():
+                    return None
+
+                self.add(row)
+
+            return self
+
+    def add(self, row):
+        # any modification invalidates our recent results
+        with self.lock:
+            self.recent.clear()
+
+            doc = len(self.docs)
+
+            self.docs.append(row)
+            self.texts.append(self._scope(doc))
+            self.slots[row[self.key]] = doc
+
+            self._link(doc)
+
+    def update(self, row):
+        with self.lock:
+            doc = self.slots.get(row[self.key])
+
+            if doc is None:
+                return
+
+            self.docs[doc] = row
+
+            # only re-index when the searchable fields have changed
+            scope = self._scope(doc)
+
+            if scope != self.texts[doc]:
+                self.recent.clear()
+                self.texts[doc] = scope
+                self._link(doc)
+
+    def get(self, key):
+        with self.lock:
+            doc = self.slots.get(key)
+
+            return self.docs[doc] if doc is not None else None
+
+    def remove(self, key):
+        with self.lock:
+            doc = self.slots.pop(key, None)
+
+            if doc is not None:
+                self.recent.clear()
+                self.texts[doc] = None
+
+    def _match(self, predicate, cancelled=None):
+        # an empty predicate matches everything
+        if predicate == "":
+            return set(self.slots.values())
+
+        # predicates shorter than our n-grams are looked for in every document
+        if len(predicate) < self.gram:
+            matches = set()
+
+            for doc, texts in enumerate(self.texts):
+                if cancelled is not None and doc % 4096 == 0 and cancelled():
+                    return None
+
+                if texts is not None and any(predicate in text for text in texts):
+                    matches.add(doc)
+
+            return matches
+
+        # every match holds all of the predicate's n-grams, so the rarest one lists every candidate
+        postings = [self.postings.get(g) for g in self._grams(predicate)]
+
+        if any(posting is None for posting in postings):
+            return set()
+
+        # verify the candidates (n-grams alone do not guarantee a substring match, and postings hold stale entries)
+        matches = set()
+
+        for i, doc in enumerate(min(postings, key=len)):
+            if cancelled is not None and i % 4096 == 0 and cancelled():
+                return None
+
+            texts = self.texts[doc]
+
+            if texts is not None and any(predicate in text for text in texts):
+                matches.add(doc)
+
+        return matches
+
+    def _narrowest(self, predicates):
+        # find the smallest recent result every match of these predicates must be part of
+        # (a row containing "harry" also contains "har")
+        best = None
+
+        for query, docs in self.recent.items():
+            if all(any(p in q for p in query) for q in predicates):
+                if best is None or len(docs) < len(self.recent[best]):
+                    best = query
+
+        return best
+
+    def search(self, predicates, cancelled=None):
+        # union the matches of every (lowercase) predicate keeping index order, returns None if cancelled
+        with self.lock:
+            query = tuple(predicates)
+
+            if query in self.recent:
+                # repeated queries (e.g. after a backspace) are answered straight away
+                self.recent.move_to_end(query)
+                docs = self.recent[query]
+            else:
+                base = self._narrowest(predicates)
+
+                if base is not None:
+                    # refine a previous result instead of querying the whole index
+                    docs = []
+
+                    for i, doc in enumerate(self.recent[base]):
+                        if cancelled is not None and i % 4096 == 0 and cancelled():
+                            return None
+
+                        if any(p in text for p in predicates for text in self.texts[doc]):
+                            docs.append(doc)
+                else:
+                    matches = set()
+
+                    for predicate in predicates:
+                        if cancelled is not None and cancelled():
+                            return None
+
+                        match = self._match(predicate, cancelled)
+
+                        if match is None:
+                            return None
+
+                        matches |= match
+
+                    docs = sorted(matches)
+
+                # remember this result, forgetting the least recently used one
+                self.recent[query] = docs
+
+                if len(self.recent) > self.max_recent:
+                    self.recent.popitem(last=False)
+
+            return self.docs.take(docs)
@@ -0,0 +1,96 @@
+"""
+    This file contains the definition for the Book Management Search Scheduler class
+"""
+import time
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+
+class BM_Search_Job(QRunnable):
+    # this class runs a single search on a worker thread
+    def __init__(self, scheduler, generation, predicate):
+        super().__init__()
+
+        self.scheduler = scheduler
+        self.generation = generation
+        self.predicate = predicate
+
+    def cancelled(self):
+        # a newer query supersedes this one
+        return self.generation != self.scheduler.generation
+
+    def run(self):
+        if self.cancelled():
+            return
+
+        mode = self.scheduler.model.mode
+        start = time.perf_counter()
+
+        # (an exception escaping a QRunnable aborts the application)
+        try:
+            items = self.scheduler.model.find_matches(self.predicate, self.cancelled)
+        except Exception as e:
+            print("Debug: search for \"%s\" failed (%s)" % (self.predicate, e))
+            return
+
+        # only report finished queries
+        if items is not None and not self.cancelled():
+            self.scheduler.matched.emit(self.generation, mode, self.predicate, items,
+                                        time.perf_counter() - start)
+
+
+class BM_Search_Scheduler(QObject):
+    # define search signals
+    matched = pyqtSignal(int, object, str, object, float)
+    finished = pyqtSignal(str, float)
+
+    def __init__(self, model, delay=150):
+        super().__init__()
+
+        # the model we search in
+        self.model = model
+
+        # the latest query, older queries abort as soon as they notice this has changed
+        self.generation = 0
+        self.predicate = ""
+
+        # debounce keystrokes
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self._start)
+
+        # run one query at a time off the GUI thread
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        # results are delivered back on the GUI thread
+        self.matched.connect(self._apply)
+
+    def schedule(self, predicate):
+        # supersede any pending or running query
+        self.generation += 1
+        self.predicate = predicate
+
+        if predicate == "":
+            # clearing the search is instant
+            self.timer.stop()
+            self.model.search("")
+            self.finished.emit(predicate, 0.0)
+        else:
+            self.timer.start()
+
+    def cancel(self):
+        # drop pending and running queries
+        self.generation += 1
+        self.timer.stop()
+
+    def _start(self):
+        self.pool.start(BM_Search_Job(self, self.generation, self.predicate))
+
+    def _apply(self, generation, mode, predicate, items, elapsed):
+        # ignore superseded results and results for another mode
+        if generation != self.generation or mode != self.model.mode:
+            return
+
+        self.model.apply_search(predicate, items)
+        self.finished.emit(predicate, elapsed)
@@ -0,0 +1,60 @@
+"""
+    This file contains the definition for the Book Management Startup Timer class
+"""
+import time
+from PyQt5.QtCore import QObject, QEvent, QTimer, pyqtSignal
+
+
+class BM_Startup_Timer(QObject):
+    # this class measures the time from "started" (a time.perf_counter() value taken before the heavy imports) to
+    # the main window's first paint, and until it is interactive: the first page of books is on display and every
+    # event queued by the startup has been handled
+    finished = pyqtSignal(float, float)
+
+    def __init__(self, started):
+        super().__init__()
+
+        self.started = started
+
+        # seconds from "started" (None until they happen)
+        self.painted = None
+        self.interactive = None
+
+    def watch(self, window):
+        # follow a main window's paints and its first page
+        self.window = window
+
+        window.installEventFilter(self)
+        window.table_view.contents_changed.connect(self._loaded)
+
+    def eventFilter(self, watched, event):
+        # the paint has finished once the event loop gets back to us
+        if event.type() == QEvent.Paint and self.painted is None:
+            self.painted = -1.0
+            QTimer.singleShot(0, self._painted)
+
+        return False
+
+    def _painted(self):
+        self.painted = time.perf_counter() - self.started
+
+        self._finish()
+
+    def _loaded(self, rows):
+        if self.interactive is None:
+            self.interactive = -1.0
+            QTimer.singleShot(0, self._interactive)
+
+    def _interactive(self):
+        self.interactive = time.perf_counter() - self.started
+
+        self._finish()
+
+    def _finish(self):
+        # report once both have happened
+        if self.painted is None or self.interactive is None or self.painted < 0 or self.interactive < 0:
+            return
+
+        # (the first page may arrive before the first paint)
+        self.window.removeEventFilter(self)
+        self.finished.emit(self.painted, max(self.painted, self.interactive))
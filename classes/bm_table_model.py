@@ -2,8 +2,18 @@
     This file contains the definition for the Book Management Table Model class
 """
 from enum import Enum
-from PyQt5.QtCore import Qt, QAbstractTableModel
-from cs50 import SQL
+from collections import OrderedDict, Counter
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from classes.bm_row_pager import BM_Row_Pager
+from classes.bm_search_index import BM_Search_Index
+from classes.bm_fts_search import BM_FTS_Search, STATS
+from classes.bm_column_store import BM_Column_Store
+from classes.bm_database import BM_Database
+from classes.bm_executor import BM_Executor
+from classes.bm_migrations import BM_Migrations
+from classes.bm_archiver import BM_Archiver, HISTORY
+from classes.bm_query_tracer import BM_Query_Tracer
+from classes.bm_profiler import BM_Profiler
 
 
 class Model_Mode(Enum):
@@ -11,167 +21,703 @@ class Model_Mode(Enum):
     Book = 0
     Client = 1
     Log = 2
+    Loan = 3
 
 
 class BM_Table_Model(QAbstractTableModel):
+    # define model signals
+    loading_changed = pyqtSignal(bool)
+    failed = pyqtSignal(str, str)
+    fts_changed = pyqtSignal(bool)
+
     def __init__(self):
         # initialise this as a subclass of QAbstractTableModel
         super().__init__()
 
-        # establish a connection to our database
-        self.database = SQL("sqlite:///library.db")
+        # establish a connection to our database (every statement is timed, slow ones are logged with their plans)
+        self.tracer = BM_Query_Tracer(path="slow_queries.log")
+        self.database = BM_Database("library.db", tracer=self.tracer)
 
-        # model mode
-        self.mode = Model_Mode.Book
+        # GUI action measurements (data() and headerData() calls are counted while it is enabled)
+        self.profiler = BM_Profiler()
+
+        # every query runs on the executor's thread, results are applied when they arrive
+        self.executor = BM_Executor(self.database)
+        self.executor.failed.connect(lambda message: self.failed.emit("Database error", message))
+
+        # bring the schema up to date before anything else is read
+        self.executor.submit(BM_Migrations(self.database).migrate)
+
+        # full-text search starts disabled (drop the FTS tables and triggers a previous session may have left behind)
+        self.executor.submit(BM_FTS_Search(self.database).uninstall)
 
         # keys per mode
         self._mbook = ["title", "stock"]
         self._mclient = ["fname", "lname"]
         self._mlog = ["title", "ltype", "fname", "lname", "ldate"]
+        self._mloan = ["title", "fname", "lname", "ldate"]
+
+        # optional circulation counter columns of the book and client modes
+        self._mstats = ["borrows", "returns", "lastdate"]
+        self.stats = False
 
         # header titles
         self._tbook = ["Title", "Stock"]
         self._tclient = ["First Name", "Last Name"]
         self._tlog = ["Title", "Type", "First Name", "Last Name", "Date"]
+        self._tloan = ["Title", "First Name", "Last Name", "Borrowed"]
+        self._tstats = ["Borrowed", "Returned", "Last Activity"]
+
+        # stored columns per mode
+        self._sbook = [("bid", "int"), ("title", "text"), ("stock", "int"),
+                       ("borrows", "int"), ("returns", "int"), ("lastdate", "text")]
+        self._sclient = [("cid", "int"), ("fname", "text"), ("lname", "text"),
+                         ("borrows", "int"), ("returns", "int"), ("lastdate", "text")]
+        self._slog = [("lid", "int"), ("bid", "int"), ("cid", "int"), ("ltype", "text"), ("ldate", "date"),
+                      ("title", "text"), ("stock", "int"), ("fname", "text"), ("lname", "text")]
+        self._sloan = [("lid", "int"), ("bid", "int"), ("cid", "int"), ("ldate", "date"),
+                       ("title", "text"), ("stock", "int"), ("fname", "text"), ("lname", "text")]
+
+        # keyset queries per mode (first page, following pages and the keyset columns)
+        # (books and clients carry their circulation counters, which are 0 until they appear in the logs)
+        self._pbook = ("SELECT books.*, %s FROM books LEFT JOIN book_stats ON book_stats.bid=books.bid "
+                       "ORDER BY books.bid LIMIT :limit" % STATS,
+                       "SELECT books.*, %s FROM books LEFT JOIN book_stats ON book_stats.bid=books.bid "
+                       "WHERE books.bid > :bid ORDER BY books.bid LIMIT :limit" % STATS,
+                       ["bid"])
+        self._pclient = ("SELECT clients.*, %s FROM clients LEFT JOIN client_stats ON client_stats.cid=clients.cid "
+                         "ORDER BY clients.cid LIMIT :limit" % STATS,
+                         "SELECT clients.*, %s FROM clients LEFT JOIN client_stats ON client_stats.cid=clients.cid "
+                         "WHERE clients.cid > :cid ORDER BY clients.cid LIMIT :limit" % STATS,
+                         ["cid"])
+        self._plog = ("SELECT * FROM logs JOIN books ON logs.bid=books.bid JOIN clients ON logs.cid=clients.cid "
+                      "ORDER BY ldate DESC, lid DESC LIMIT :limit",
+                      "SELECT * FROM logs JOIN books ON logs.bid=books.bid JOIN clients ON logs.cid=clients.cid "
+                      "WHERE ldate < :ldate OR (ldate = :ldate AND lid < :lid) "
+                      "ORDER BY ldate DESC, lid DESC LIMIT :limit",
+                      ["ldate", "lid"])
+        # the logs view may include archived entries (each partition reads at most one page from its index)
+        self._parchive = (HISTORY % {"where": ""},
+                          HISTORY % {"where": "WHERE ldate < :ldate OR (ldate = :ldate AND lid < :lid)"},
+                          ["ldate", "lid"])
+        self.archived = False
+
+        self._ploan = ("SELECT * FROM loans JOIN books ON loans.bid=books.bid JOIN clients ON loans.cid=clients.cid "
+                       "ORDER BY ldate DESC, lid DESC LIMIT :limit",
+                       "SELECT * FROM loans JOIN books ON loans.bid=books.bid JOIN clients ON loans.cid=clients.cid "
+                       "WHERE ldate < :ldate OR (ldate = :ldate AND lid < :lid) "
+                       "ORDER BY ldate DESC, lid DESC LIMIT :limit",
+                       ["ldate", "lid"])
+
+        # model mode (this also selects the column accessors below)
+        self.mode = Model_Mode.Book
 
         # pre-initialise our items list
-        self.items = []
+        self.items = BM_Column_Store(self._schema)
         self.original = []
         self.searching = False
 
+        # the row pager backing our items list (only set in paged mode)
+        self.pager = None
+
+        # primary key per mode
+        self._kmode = {Model_Mode.Book: "bid", Model_Mode.Client: "cid", Model_Mode.Log: "lid", Model_Mode.Loan: "lid"}
+
+        # search indexes per mode (built on first search, kept in sync by the CUD methods)
+        self.indexes = {}
+
+        # row pagers per mode (least recently used first) and the number of resident rows they may hold
+        self.pagers = OrderedDict()
+        self.cache_rows = 3 * 32 * 256
+
+        # table per mode and the optional full-text search engine
+        self._tmode = {Model_Mode.Book: "books", Model_Mode.Client: "clients", Model_Mode.Log: "logs",
+                       Model_Mode.Loan: "loans"}
+        self.fts = None
+
+        # pagers with a page read in flight (next page, or evicted pages being read again)
+        self.fetching = set()
+        self.refilling = set()
+
+        # this flag is set while the first page of the list on display is being read
+        self.loading = False
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, mode):
+        self._mode = mode
+
+        # precompute the keys, titles, stored columns and keyset queries of this mode
+        if mode == Model_Mode.Book:
+            self._keys, self._titles, self._schema, self._queries = self._mbook, self._tbook, self._sbook, self._pbook
+        elif mode == Model_Mode.Client:
+            self._keys, self._titles, self._schema, self._queries = \
+                self._mclient, self._tclient, self._sclient, self._pclient
+
+        # books and clients may show their circulation counters as well
+        if self.stats and mode in (Model_Mode.Book, Model_Mode.Client):
+            self._keys, self._titles = self._keys + self._mstats, self._titles + self._tstats
+        elif mode == Model_Mode.Log:
+            self._keys, self._titles, self._schema, self._queries = \
+                self._mlog, self._tlog, self._slog, self._parchive if self.archived else self._plog
+        elif mode == Model_Mode.Loan:
+            self._keys, self._titles, self._schema, self._queries = \
+                self._mloan, self._tloan, self._sloan, self._ploan
+
     def fetch(self, command):
-        # clear our items list
-        self.items = []
+        # arbitrary queries invalidate the cached rows and search index of this mode
+        mode = self.mode
+        self.invalidate(mode)
 
         # fetch new data from database
-        rows = self.database.execute(command)
+        self.executor.execute(command, callback=lambda rows: self._fetched_rows(mode, rows))
 
-        # iteratively insert new data into our list
-        for row in rows:
-            self.items.append(row)
+    def _fetched_rows(self, mode, rows):
+        # the user may have switched modes in the meantime
+        if mode != self.mode:
+            return
 
-    def search(self, predicate):
-        if predicate != "":
-            # only clear our original list if the search flag is off
-            if not self.searching:
-                # store the original items in a temporary list
-                self.original = []
+        self.beginResetModel()
 
-            search_list = []
+        # replace our items list
+        self.items = BM_Column_Store(self._schema).extend(rows)
+        self.pager = None
+        self.searching = False
 
-            # multiple predicates are disabled by default
-            multiple_predicates = False
+        self.endResetModel()
 
-            # make predicate lowercase
-            predicate = predicate.lower()
+    def paginate(self, mode=None, page_size=256, max_pages=32):
+        # this is a full reload (the mode may change our columns too)
+        self.beginResetModel()
 
-            # support for multiple predicates
-            if ';' in predicate:
-                multiple_predicates = True
-                predicates = predicate.split(';')
+        if mode is not None:
+            self.mode = mode
 
-            # modify the target list depending on the search flag
-            if self.searching:
-                target_list = self.original
+        # reuse the cached rows of this mode (they are kept in sync by the CUD methods)
+        if self.mode in self.pagers:
+            self.pager = self.pagers[self.mode]
+            self.pagers.move_to_end(self.mode)
+        else:
+            # load the rows of the current mode lazily, one keyset page at a time
+            self.pager = BM_Row_Pager(self.database, self._schema, *self._queries, page_size=page_size,
+                                      max_pages=max_pages)
+            self.pagers[self.mode] = self.pager
+
+        self.original = []
+        self.items = self.pager
+        self.searching = False
+
+        # drop the least recently used modes once we hold too many rows
+        while len(self.pagers) > 1 and sum(p.resident() for p in self.pagers.values()) > self.cache_rows:
+            self.pagers.popitem(last=False)
+
+        self.endResetModel()
+
+        # read the first page in the background
+        if len(self.pager) == 0 and not self.pager.exhausted:
+            self._fetch(self.pager)
+
+        self._update_loading(True)
+
+    def invalidate(self, *modes):
+        # forget the cached rows and search indexes of some modes (or of every mode)
+        if len(modes) == 0:
+            self.pagers.clear()
+            self.indexes.clear()
+
+        for mode in modes:
+            self.pagers.pop(mode, None)
+            self.indexes.pop(mode, None)
+
+    def show_stats(self, enabled=True):
+        # show (or hide) the circulation counter columns of books and clients (every row already carries them)
+        self.beginResetModel()
+
+        self.stats = enabled
+        self.mode = self.mode
+
+        self.endResetModel()
+
+    def show_archive(self, enabled=True):
+        # include (or leave out) archived entries in the logs view (the caller reloads the list on display)
+        self.archived = enabled
+        self.invalidate(Model_Mode.Log)
+
+    def archive_logs(self, days, progress=None, callback=None, chunk=5000):
+        # move log entries older than "days" days into the archive, one short transaction at a time so other
+        # requests run in between ("progress" receives the running total, "callback" the final one)
+        archiver = BM_Archiver(self.database, days, chunk)
+
+        def _archived(moved, total):
+            if moved > 0:
+                if progress is not None:
+                    progress(total + moved)
+
+                self.executor.submit(archiver.archive_batch,
+                                     callback=lambda count: _archived(count, total + moved))
             else:
-                target_list = self.items
+                # the hot logs have changed
+                self.invalidate(Model_Mode.Log)
+
+                if callback is not None:
+                    callback(total)
+
+        self.executor.submit(archiver.archive_batch, callback=lambda count: _archived(count, 0))
+
+    def rebuild_stats(self, callback=None):
+        # recompute every circulation counter from the logs, "callback" receives the number of stale counters
+        self.executor.submit(self._rebuild_stats, callback=lambda stale: self._stats_rebuilt(stale, callback))
+
+    def _rebuild_stats(self):
+        # this runs on the executor's thread (one pass over the history per table, in a single transaction)
+        stale = 0
+
+        self.database.execute("BEGIN IMMEDIATE")
+
+        for table, key in (("book_stats", "bid"), ("client_stats", "cid")):
+            self.database.execute("CREATE TEMP TABLE fresh_stats AS SELECT %s AS id, "
+                                  "SUM(ltype='Borrowing') AS borrows, SUM(ltype='Returning') AS returns, "
+                                  "MAX(ldate) AS lastdate FROM history GROUP BY %s" % (key, key))
+
+            # counters which differ from the logs (either way round)
+            stale += self.database.execute(
+                "SELECT COUNT(*) FROM (SELECT * FROM fresh_stats EXCEPT SELECT * FROM %s UNION ALL "
+                "SELECT * FROM %s EXCEPT SELECT * FROM fresh_stats)" % (table, table))[0][0]
+
+            self.database.execute("DELETE FROM %s" % table)
+            self.database.execute("INSERT INTO %s SELECT * FROM fresh_stats" % table)
+            self.database.execute("DROP TABLE temp.fresh_stats")
+
+        self.database.execute("COMMIT")
 
-            # update targets for multiple predicates
-            if multiple_predicates:
-                target_l = predicates
+        return stale
+
+    def _stats_rebuilt(self, stale, callback):
+        # the counters we hold may have been stale (the caller reloads the list on display)
+        if stale > 0:
+            self.invalidate(Model_Mode.Book, Model_Mode.Client)
+
+        if callback is not None:
+            callback(stale)
+
+    def enable_fts(self, enabled=True, rank=False):
+        # push searches down to SQLite FTS5 tables, "fts_changed" reports whether they could be installed
+        if enabled:
+            fts = BM_FTS_Search(self.database, rank)
+
+            self.executor.submit(fts.install,
+                                 callback=lambda installed: self._fts_installed(fts if installed else None),
+                                 errback=lambda message: self._fts_installed(None))
+        else:
+            self._fts_installed(None)
+
+            # stop keeping the FTS tables in sync
+            self.executor.submit(BM_FTS_Search(self.database).uninstall)
+
+    def _fts_installed(self, fts):
+        self.fts = fts
+        self.fts_changed.emit(fts is not None)
+
+    def _update_loading(self, announce=False):
+        # the list on display is loading until its first page arrives
+        loading = isinstance(self.items, BM_Row_Pager) and self.items in self.fetching and len(self.items) == 0
+
+        if loading != self.loading or announce:
+            self.loading = loading
+            self.loading_changed.emit(loading)
+
+    def _fetch(self, pager):
+        # read the page following a pager's loaded rows in the background (one read per pager at a time)
+        if pager in self.fetching:
+            return
+
+        self.fetching.add(pager)
+
+        page = len(pager) // pager.page_size
+        self.executor.submit(pager.load_page, page, callback=lambda rows: self._fetched(pager, page, rows),
+                             errback=lambda message: self._fetch_failed(pager))
+
+    def _fetched(self, pager, page, rows):
+        self.fetching.discard(pager)
+
+        # results arrive in the order they were requested, so the loaded rows match the database we read from
+        count = page * pager.page_size + rows - len(pager)
+
+        if count > 0:
+            if pager is self.items:
+                start = len(self.items)
+
+                self.beginInsertRows(QModelIndex(), start, start + count - 1)
+                pager.grow(count)
+                self.endInsertRows()
             else:
-                target_l = predicate
-
-            # selectively copy items to a temporary list
-            for item in target_list:
-                # item search scope
-                item_scope = [
-                    item.get("fname", "").lower(),
-                    item.get("lname", "").lower(),
-                    item.get("title", "").lower()
-                ]
-
-                # search the scope
-                for s in item_scope:
-                    # check if the item is not in the search list
-                    if not item in search_list:
-                        if type(target_l) is str:
-                            if target_l in s:
-                                search_list.append(item)
-                                break
-
-                        elif type(target_l) is list:
-                            # try to match each term
-                            for _target in target_l:
-                                if _target in s:
-                                    search_list.append(item)
-                                    break
-
-                if not self.searching:
-                    self.original.append(item)
-
-            # point to our new filtered list
-            self.items = search_list
+                pager.grow(count)
+
+        self._update_loading()
+
+    def _fetch_failed(self, pager):
+        # the next page can be asked for again (the error itself is reported through the "failed" signal)
+        self.fetching.discard(pager)
+        self._update_loading()
+
+    def _refill(self, pager, page):
+        # read an evicted (or invalidated) page again in the background
+        if (pager, page) in self.refilling:
+            return
+
+        self.refilling.add((pager, page))
+        self.executor.submit(pager.load_page, page, callback=lambda rows: self._refilled(pager, page),
+                             errback=lambda message: self.refilling.discard((pager, page)))
+
+    def _refilled(self, pager, page):
+        self.refilling.discard((pager, page))
+
+        # repaint the rows of this page
+        if pager is self.items and page * pager.page_size < len(pager):
+            last = min(len(pager), (page + 1) * pager.page_size) - 1
+
+            self.dataChanged.emit(self.index(page * pager.page_size, 0), self.index(last, len(self._keys) - 1))
+
+    def canFetchMore(self, parent):
+        # only paged lists can grow (one page at a time)
+        return not parent.isValid() and isinstance(self.items, BM_Row_Pager) and \
+            self.items not in self.fetching and not self.items.exhausted
+
+    def fetchMore(self, parent):
+        # read the next page, its rows are exposed to the view when it arrives
+        self._fetch(self.items)
+
+    def _sync(self, mode, action, value):
+        # keep the search index and cached rows of a mode in sync with a modification
+        # ("add" and "update" take a row, "remove" takes a primary key)
+        index = self.indexes.get(mode)
+
+        if index is not None:
+            getattr(index, action)(value)
+
+        pager = self.pagers.get(mode)
+
+        if pager is not None:
+            # patching is idempotent, but the list we have just added to or deleted from is already up to date
+            # (and a page being read already includes the new row)
+            if action == "update":
+                pager.patch(self._kmode[mode], value)
+            elif action == "add" and pager is not self.items and pager not in self.fetching:
+                pager.append(value)
+            elif action == "remove" and pager is not self.items:
+                pager.remove(self._kmode[mode], value)
+
+    def find_matches(self, predicate, cancelled=None):
+        # compute the rows matching a predicate without updating the model, returns None if cancelled
+        mode = self.mode
+        source = self.original if self.searching else self.items
+
+        if predicate == "":
+            return source
+
+        # support for multiple predicates
+        predicates = predicate.lower().split(';')
+
+        if self.fts is not None:
+            # let the database find (and page through) the matches
+            table = "history" if mode == Model_Mode.Log and self.archived else self._tmode[mode]
+            matches = self.fts.search(table, self._schema, predicates)
+
+            return matches if matches is not None else source
+
+        # build the search index of this mode on first use
+        index = self.indexes.get(mode)
+
+        if index is None:
+            index = BM_Search_Index(self._kmode[mode], self._schema).build(source, cancelled)
+
+            if index is None:
+                return None
+
+            self.indexes[mode] = index
+
+        # answer the query from our search index
+        return index.search(predicates, cancelled)
+
+    def apply_search(self, predicate, items):
+        self.beginResetModel()
+
+        if predicate != "":
+            # only store our original list if the search flag is off
+            if not self.searching:
+                self.original = self.items
+
+            self.items = items
 
             # update the search flag
             self.searching = True
         else:
             if self.searching:
-                # copy the original items back to the items list
-                self.items = []
-
-                for item in self.original:
-                    self.items.append(item)
+                # point back to the original items
+                self.items = self.original
 
                 # update search flag
                 self.searching = False
 
-        # update model
-        self.layoutChanged.emit()
+        self.endResetModel()
+
+        self._update_loading()
+
+    def search(self, predicate):
+        # search synchronously
+        self.apply_search(predicate, self.find_matches(predicate))
+
+    def _find(self, mode, value, sid=None):
+        # position of a row on display (checking the row it was picked from first), or -1
+        if mode != self.mode:
+            return -1
+
+        key = self._kmode[mode]
+        paged = isinstance(self.items, BM_Row_Pager)
+
+        if sid is not None and 0 <= sid < len(self.items) and (not paged or self.items.holds(sid)) and \
+                self.items.cell(sid, key) == value:
+            return sid
+
+        row = self.items.locate(key, value) if paged else self.items.find(key, value)
+
+        return row if 0 <= row < len(self.items) else -1
+
+    def _insert(self, row):
+        # paged lists show new rows once every page before them has been read (a page being read already has it)
+        if isinstance(self.items, BM_Row_Pager) and (not self.items.exhausted or self.items in self.fetching):
+            return
+
+        start = len(self.items)
+
+        self.beginInsertRows(QModelIndex(), start, start)
+        self.items.append(row)
+        self.endInsertRows()
+
+    def _changed(self, sid):
+        # tell the view a single row has changed
+        self.dataChanged.emit(self.index(sid, 0), self.index(sid, len(self._keys) - 1))
+
+    def _added(self, mode, row):
+        # show a new row if its mode is on display and keep our cached rows in sync
+        if mode == self.mode:
+            self._insert(row)
+
+        self._sync(mode, "add", row)
+
+    def _updated(self, mode, row, sid=None):
+        # patch a row (or some of its columns) wherever we hold it
+        self._sync(mode, "update", row)
+
+        sid = self._find(mode, row[self._kmode[mode]], sid)
+
+        if sid >= 0:
+            self.items[sid] = row
+            self._changed(sid)
+
+    @staticmethod
+    def _blocks(rows):
+        # split sorted row numbers into (first, last) ranges of adjacent rows
+        blocks = []
+
+        for row in rows:
+            if blocks and blocks[-1][1] == row - 1:
+                blocks[-1][1] = row
+            else:
+                blocks.append([row, row])
+
+        return blocks
+
+    def _updated_many(self, mode, values, changes):
+        # patch the same columns of many rows (one notification per block of adjacent rows on display)
+        key = self._kmode[mode]
+        rows = []
+
+        for value in values:
+            row = dict(changes, **{key: value})
+
+            self._sync(mode, "update", row)
+
+            sid = self._find(mode, value)
+
+            if sid >= 0:
+                self.items[sid] = row
+                rows.append(sid)
+
+        for first, last in self._blocks(sorted(rows)):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self._keys) - 1))
+
+    def _removed(self, mode, values, sids=None):
+        # drop deleted rows wherever we hold them (one notification per block of adjacent rows on display)
+        if mode == self.mode:
+            sids = sids or [None] * len(values)
+            rows = sorted(row for row in (self._find(mode, v, s) for v, s in zip(values, sids)) if row >= 0)
+
+            if len(rows) < len(values) and self.items is self.pagers.get(mode):
+                # we do not know where some of the rows were, read the list again
+                self.beginResetModel()
+                self.items.clear()
+                self.endResetModel()
+
+                self._fetch(self.items)
+            else:
+                # remove the bottom blocks first so the rows above them keep their positions
+                for first, last in reversed(self._blocks(rows)):
+                    self.beginRemoveRows(QModelIndex(), first, last)
+                    del self.items[first:last + 1]
+                    self.endRemoveRows()
+
+        for value in values:
+            self._sync(mode, "remove", value)
+
+    def _delete(self, table, key, values, chunk=500):
+        # delete rows with their log entries, loans and counters in a single transaction
+        # (this runs on the executor's thread)
+        # "IN" lists are split into chunks to stay below SQLite's variable limit
+        self.database.execute("BEGIN IMMEDIATE")
+
+        for i in range(0, len(values), chunk):
+            group = values[i:i + chunk]
+
+            # loans carry the keys of books, clients and log entries
+            self.database.execute("DELETE FROM loans WHERE %s IN (:group)" % key, group=group)
+
+            if table == "loans":
+                continue
+
+            self._delete_logs(key, group)
+
+            if table != "logs":
+                self.database.execute("DELETE FROM %s WHERE %s IN (:group)" % (table, key), group=group)
+
+        self.database.execute("COMMIT")
+
+    def _count(self, condition, **params):
+        # add the log entries matching a condition to the circulation counters of their books and clients
+        # (this runs inside the caller's transaction)
+        for table, key in (("book_stats", "bid"), ("client_stats", "cid")):
+            self.database.execute(
+                "INSERT INTO %s (%s, borrows, returns, lastdate) "
+                "SELECT %s, SUM(ltype='Borrowing'), SUM(ltype='Returning'), MAX(ldate) FROM logs "
+                "WHERE %s GROUP BY %s ON CONFLICT (%s) DO UPDATE SET "
+                "borrows=borrows + excluded.borrows, returns=returns + excluded.returns, "
+                "lastdate=MAX(IFNULL(lastdate, excluded.lastdate), excluded.lastdate)" %
+                (table, key, key, condition, key, key), **params)
+
+    def _delete_logs(self, key, group, chunk=500):
+        # delete the log entries of some books, clients or log entries (by "key") and take them out of the
+        # circulation counters (this runs inside the caller's transaction)
+        counts = {}
+
+        for table, column in (("book_stats", "bid"), ("client_stats", "cid")):
+            if column == key:
+                # deleted books and clients lose their own counters
+                self.database.execute("DELETE FROM %s WHERE %s IN (:group)" % (table, key), group=group)
+            else:
+                counts[table, column] = self.database.execute(
+                    "SELECT %s AS id, SUM(ltype='Borrowing') AS borrows, SUM(ltype='Returning') AS returns "
+                    "FROM history WHERE %s IN (:group) GROUP BY %s" % (column, key, column), group=group)
+
+        # archived entries go as well
+        self.database.execute("DELETE FROM logs WHERE %s IN (:group)" % key, group=group)
+        self.database.execute("DELETE FROM logs_archive WHERE %s IN (:group)" % key, group=group)
+
+        for (table, column), rows in counts.items():
+            self.database.execute_many(
+                "UPDATE %s SET borrows=borrows - :borrows, returns=returns - :returns WHERE %s=:id" % (table, column),
+                [dict(row) for row in rows])
+
+            # drop counters back at zero and read the latest activity of the others again
+            ids = [row["id"] for row in rows]
+
+            for i in range(0, len(ids), chunk):
+                self.database.execute("DELETE FROM %s WHERE %s IN (:ids) AND borrows=0 AND returns=0" %
+                                      (table, column), ids=ids[i:i + chunk])
+                self.database.execute("UPDATE %s SET lastdate=(SELECT MAX(ldate) FROM history "
+                                      "WHERE history.%s=%s.%s) WHERE %s IN (:ids)" %
+                                      (table, column, table, column, column),
+                                      ids=ids[i:i + chunk])
+
+    def _update(self, table, key, values, changes, chunk=500):
+        # set the same columns of many rows in a single transaction (runs on the executor's thread)
+        assignments = ", ".join("%s=:%s" % (column, column) for column in changes)
+
+        self.database.execute("BEGIN IMMEDIATE")
+
+        for i in range(0, len(values), chunk):
+            self.database.execute("UPDATE %s SET %s WHERE %s IN (:group)" % (table, assignments, key),
+                                  group=values[i:i + chunk], **changes)
+
+        self.database.execute("COMMIT")
+
+    def bulk_delete(self, mode, values):
+        # delete many books, clients or log entries (by primary key) at once
+        if len(values) == 0:
+            return
+
+        # deleting books or clients deletes their log entries and loans too (and changes the others' counters)
+        self.invalidate(*[other for other in Model_Mode if other != mode])
+
+        self.executor.submit(self._delete, self._tmode[mode], self._kmode[mode], list(values),
+                             callback=lambda _: self._removed(mode, values))
+
+    def bulk_update(self, mode, values, changes):
+        # set the same columns (a dict) of many books or clients at once
+        if len(values) == 0 or len(changes) == 0:
+            return
+
+        # log and loan rows carry book titles and client names
+        self.invalidate(Model_Mode.Log, Model_Mode.Loan)
+
+        self.executor.submit(self._update, self._tmode[mode], self._kmode[mode], list(values), changes,
+                             callback=lambda _: self._updated_many(mode, values, changes))
 
     # this method handles CUD operations for the "clients" table our database
     def client_mod(self, mod_type, first_name=None, last_name=None, target=None, sid=None):
         if mod_type == "add":
             # check if both arguments are not "None"
             if first_name and last_name:
-                self.database.execute('INSERT INTO clients (fname, lname) VALUES (:fname, :lname)',
-                                      fname=first_name, lname=last_name)
-
-                # fetch this client's ID
-                cid_r = self.database.execute("SELECT cid FROM clients WHERE fname=:fname AND lname=:lname LIMIT 1",
-                                              fname=first_name, lname=last_name)
-
-                # add the new client to the model
-                self.items.append({
-                    "cid": cid_r[0]["cid"],
-                    "fname": first_name,
-                    "lname": last_name
-                })
+                # add the new client to the model once it has been inserted
+                def _inserted(cid):
+                    self._added(Model_Mode.Client, {
+                        "cid": cid,
+                        "fname": first_name,
+                        "lname": last_name,
+                        "borrows": 0,
+                        "returns": 0,
+                        "lastdate": None
+                    })
+
+                # insert the client (this returns the new client's ID)
+                self.executor.execute('INSERT INTO clients (fname, lname) VALUES (:fname, :lname)',
+                                      callback=_inserted, fname=first_name, lname=last_name)
 
         elif mod_type == "edit":
             if first_name and last_name and target != None and sid != None:
-                self.database.execute('UPDATE clients SET fname=:fname, lname=:lname WHERE cid=:target',
-                                      target=target, fname=first_name, lname=last_name)
-
-                self.items[sid] = ({
-                    "cid": self.items[sid]["cid"],
+                client = {
+                    "cid": target,
                     "fname": first_name,
                     "lname": last_name
-                })
+                }
+
+                # log and loan rows carry client names (anything read from now on sees the new names)
+                self.invalidate(Model_Mode.Log, Model_Mode.Loan)
+
+                self.executor.execute('UPDATE clients SET fname=:fname, lname=:lname WHERE cid=:target',
+                                      callback=lambda _: self._updated(Model_Mode.Client, client, sid),
+                                      target=target, fname=first_name, lname=last_name)
 
         elif mod_type == "delete":
             if target != None and sid != None:
-                # delete the client in the database
-                self.database.execute("DELETE FROM clients WHERE cid=:origin",
-                                      origin=target)
-                self.database.execute("DELETE FROM logs WHERE cid=:origin",
-                                      origin=target)
+                # this deletes the client's log entries and loans too (and changes the counters of their books)
+                self.invalidate(Model_Mode.Book, Model_Mode.Log, Model_Mode.Loan)
 
-                # delete the client from the model
-                del self.items[sid]
-
-        # update model
-        self.layoutChanged.emit()
+                # delete the client in the database, then from the model
+                self.executor.submit(self._delete, "clients", "cid", [target],
+                                     callback=lambda _: self._removed(Model_Mode.Client, [target], [sid]))
 
     # this method handles CUD operations for the "books" table in our database
     def book_mod(self, mod_type, title=None, stock=None, target=None, sid=None):
@@ -186,102 +732,241 @@ class BM_Table_Model(QAbstractTableModel):
         # insert the new book to our database
         if mod_type == "add":
             if title and stock:
-                self.database.execute('INSERT INTO books (title, stock) VALUES (:title, :stock)',
-                                      title=title, stock=stock)
-
-                # fetch this book's ID
-                bid_r = self.database.execute("SELECT bid FROM books WHERE title=:title AND stock=:stock LIMIT 1",
-                                              title=title, stock=stock)
-
-                # add the new book to the model
-                self.items.append({
-                    "bid": bid_r[0]["bid"],
-                    "title": title,
-                    "stock": stock
-                })
+                # add the new book to the model once it has been inserted
+                def _inserted(bid):
+                    self._added(Model_Mode.Book, {
+                        "bid": bid,
+                        "title": title,
+                        "stock": stock,
+                        "borrows": 0,
+                        "returns": 0,
+                        "lastdate": None
+                    })
+
+                # insert the book (this returns the new book's ID)
+                self.executor.execute('INSERT INTO books (title, stock) VALUES (:title, :stock)',
+                                      callback=_inserted, title=title, stock=stock)
 
         elif mod_type == "edit":
             if title and stock and target != None and sid != None:
-                # update the database
-                self.database.execute('UPDATE books SET title=:title, stock=:stock WHERE bid=:origin',
-                                      title=title, stock=stock, origin=target)
-
-                # update our book in the model
-                self.items[sid] = {
-                    "bid": self.items[sid]["bid"],
+                book = {
+                    "bid": target,
                     "title": title,
                     "stock": stock
                 }
 
+                # log and loan rows carry book titles (anything read from now on sees the new title)
+                self.invalidate(Model_Mode.Log, Model_Mode.Loan)
+
+                # update the database, then our book in the model
+                self.executor.execute('UPDATE books SET title=:title, stock=:stock WHERE bid=:origin',
+                                      callback=lambda _: self._updated(Model_Mode.Book, book, sid),
+                                      title=title, stock=stock, origin=target)
+
         elif mod_type == "delete":
             if target != None and sid != None:
-                # delete the book in the database
-                self.database.execute("DELETE FROM books WHERE bid=:origin",
-                                      origin=target)
-                self.database.execute("DELETE FROM logs WHERE bid=:origin",
-                                      origin=target)
+                # this deletes the book's log entries and loans too (and changes the counters of their clients)
+                self.invalidate(Model_Mode.Client, Model_Mode.Log, Model_Mode.Loan)
+
+                # delete the book in the database, then from the model
+                self.executor.submit(self._delete, "books", "bid", [target],
+                                     callback=lambda _: self._removed(Model_Mode.Book, [target], [sid]))
+
+    def circulate(self, bid, cid, ttype):
+        # record a transaction and adjust the book's stock atomically, returns the new stock (None if the book is
+        # out of stock, database errors are raised)
+        try:
+            # take the write lock up front so concurrent desks queue instead of deadlocking
+            self.database.execute("BEGIN IMMEDIATE")
+
+            # check and update the stock in a single statement (borrowing never takes the stock below zero)
+            if ttype == "Borrowing":
+                updated = self.database.execute("UPDATE books SET stock = stock - 1 WHERE bid=:bid AND stock > 0",
+                                                bid=bid)
+            else:
+                updated = self.database.execute("UPDATE books SET stock = stock + 1 WHERE bid=:bid", bid=bid)
+
+            if updated != 1:
+                self.database.rollback()
+                print("Debug: out of stock!")
+                return None
+
+            # insert this transaction to the database
+            lid = self.database.execute(
+                "INSERT INTO logs (bid, cid, ltype, ldate) VALUES (:bid, :cid, :ltype, DATETIME('now'))",
+                bid=bid, cid=cid, ltype=ttype)
+
+            # open a loan, or settle the oldest loan of this book by this client
+            if ttype == "Borrowing":
+                self.database.execute("INSERT INTO loans (lid, bid, cid, ldate) "
+                                      "SELECT lid, bid, cid, ldate FROM logs WHERE lid=:lid", lid=lid)
+            else:
+                self.database.execute("DELETE FROM loans WHERE lid IN "
+                                      "(SELECT lid FROM loans WHERE bid=:bid AND cid=:cid ORDER BY lid LIMIT 1)",
+                                      bid=bid, cid=cid)
+
+            self._count("lid=:lid", lid=lid)
+
+            stock = self.database.execute("SELECT stock FROM books WHERE bid=:bid", bid=bid)[0]["stock"]
+
+            self.database.execute("COMMIT")
+        except Exception as e:
+            # only the stock check reports "out of stock", the executor reports database errors as they are
+            print("Debug: transaction failed (%s)" % e)
+            self.database.rollback()
+            raise
+
+        return stock
+
+    def circulate_batch(self, bids, cid, ttype):
+        # record one transaction per book (a book may appear more than once) in a single database transaction
+        # returns the new stock per book, or None if any book is out of stock (database errors are raised)
+        copies = Counter(bids)
+        sign = "-" if ttype == "Borrowing" else "+"
+
+        try:
+            self.database.execute("BEGIN IMMEDIATE")
+
+            # update books borrowed or returned the same number of times together, borrowing checks the stock
+            updated = 0
+
+            for count in set(copies.values()):
+                group = [bid for bid, c in copies.items() if c == count]
+                condition = " AND stock >= :count" if ttype == "Borrowing" else ""
+
+                updated += self.database.execute("UPDATE books SET stock = stock %s :count WHERE bid IN (:group)%s" %
+                                                 (sign, condition), count=count, group=group)
 
-                # delete the book from the model
-                del self.items[sid]
+            # every book must have been updated
+            if updated != len(copies):
+                self.database.rollback()
+                print("Debug: out of stock!")
+                return None
 
-        # update the model
-        self.layoutChanged.emit()
+            # insert all log entries at once (ids only grow, so the new entries follow the current last one)
+            last = self.database.execute("SELECT COALESCE(MAX(lid), 0) AS lid FROM logs")[0]["lid"]
+
+            self.database.execute_many(
+                "INSERT INTO logs (bid, cid, ltype, ldate) VALUES (:bid, :cid, :ltype, DATETIME('now'))",
+                [{"bid": bid, "cid": cid, "ltype": ttype} for bid in bids])
+
+            # open a loan per borrowed copy, or settle the oldest loans of the returned copies
+            if ttype == "Borrowing":
+                self.database.execute("INSERT INTO loans (lid, bid, cid, ldate) "
+                                      "SELECT lid, bid, cid, ldate FROM logs WHERE lid > :last", last=last)
+            else:
+                self.database.execute_many(
+                    "DELETE FROM loans WHERE lid IN "
+                    "(SELECT lid FROM loans WHERE bid=:bid AND cid=:cid ORDER BY lid LIMIT :count)",
+                    [{"bid": bid, "cid": cid, "count": count} for bid, count in copies.items()])
+
+            self._count("lid > :last", last=last)
+
+            rows = self.database.execute("SELECT bid, stock FROM books WHERE bid IN (:group)", group=list(copies))
+
+            self.database.execute("COMMIT")
+        except Exception as e:
+            # only the stock check reports "out of stock", the executor reports database errors as they are
+            print("Debug: transaction failed (%s)" % e)
+            self.database.rollback()
+            raise
+
+        return {row["bid"]: row["stock"] for row in rows}
+
+    def _circulated(self, stocks, cid, message):
+        # patch the stock of every book we have recorded a transaction for
+        if stocks is None:
+            self.failed.emit("Invalid Transaction", message)
+            return
+
+        for bid, stock in stocks.items():
+            self._updated(Model_Mode.Book, {"bid": bid, "stock": stock})
+
+        # then their circulation counters and the client's
+        self.executor.submit(self._read_stats, list(stocks), cid, callback=self._stats_read)
+
+    def _read_stats(self, bids, cid):
+        # this runs on the executor's thread
+        return (self.database.execute("SELECT bid, %s FROM book_stats WHERE bid IN (:bids)" % STATS, bids=bids),
+                self.database.execute("SELECT cid, %s FROM client_stats WHERE cid=:cid" % STATS, cid=cid))
+
+    def _stats_read(self, stats):
+        books, clients = stats
+
+        for row in books:
+            self._updated(Model_Mode.Book, dict(row))
+
+        for row in clients:
+            self._updated(Model_Mode.Client, dict(row))
+
+    def transaction_batch(self, bids, cid, ttype):
+        # record a transaction for many books at once, returns False if there is nothing to record
+        if len(bids) == 0 or not cid or not ttype:
+            return False
+
+        # let the logs pick up the new entries on their next load
+        self.invalidate(Model_Mode.Log, Model_Mode.Loan)
+
+        self.executor.submit(self.circulate_batch, bids, cid, ttype, callback=lambda stocks: self._circulated(
+            stocks, cid, "At least one of these books is out of stock!"))
+
+        return True
 
     def transaction_mod(self, mod_type, bid, cid, ttype, lid=None, sid=None):
+        # transactions which cannot be recorded are reported through the "failed" signal
         if mod_type == "add":
             if bid and cid and ttype:
-                # fetch book data
-                book_data = self.database.execute("SELECT * FROM books WHERE bid=:bid", bid=bid)[0]
-
-                if book_data["stock"] == 0 and ttype == "Borrowing":
-                    print("Debug: out of stock!")
-                else:
-                    # insert this transaction to the database
-                    self.database.execute(
-                        "INSERT INTO logs (bid, cid, ltype, ldate) VALUES (:bid, :cid, :ltype, DATETIME('now'))",
-                        bid=bid, cid=cid, ltype=ttype)
-
-                    # update book stock
-                    delta = -1 if ttype == "Borrowing" else 1
-                    self.database.execute("UPDATE books SET stock=:stock WHERE bid=:bid",
-                                          stock=book_data["stock"] + delta, bid=bid)
+                # let the logs pick up the new entry on their next load
+                self.invalidate(Model_Mode.Log, Model_Mode.Loan)
+
+                self.executor.submit(self.circulate, bid, cid, ttype, callback=lambda stock: self._circulated(
+                    None if stock is None else {bid: stock}, cid, "This book is out of stock!"))
 
         elif mod_type == "delete":
             if lid and sid is not None:
-                # delete this transaction from the database
-                self.database.execute("DELETE FROM logs WHERE lid=:lid", lid=lid)
+                # this drops its loan (if it is a borrowing) and changes the counters of its book and client
+                self.invalidate(Model_Mode.Book, Model_Mode.Client, Model_Mode.Loan)
+
+                # delete this transaction from the database, then from the model
+                self.executor.submit(self._delete, "logs", "lid", [lid],
+                                     callback=lambda _: self._removed(Model_Mode.Log, [lid], [sid]))
 
-                # delete this transaction from the model
-                del self.items[sid]
+    def holders(self, bid, callback):
+        # pass the clients currently holding a book (one row per borrowed copy) to "callback"
+        self.executor.execute("SELECT clients.*, loans.lid, loans.ldate FROM loans "
+                              "JOIN clients ON loans.cid=clients.cid WHERE loans.bid=:bid ORDER BY loans.lid",
+                              callback=callback, bid=bid)
 
-        # update the model
-        self.layoutChanged.emit()
+    def loans_of(self, cid, callback):
+        # pass the books a client still has to return (one row per borrowed copy) to "callback"
+        self.executor.execute("SELECT books.*, loans.lid, loans.ldate FROM loans "
+                              "JOIN books ON loans.bid=books.bid WHERE loans.cid=:cid ORDER BY loans.lid",
+                              callback=callback, cid=cid)
 
     def rowCount(self, parent):
-        return len(self.items)
+        # table rows have no children
+        return 0 if parent.isValid() else len(self.items)
 
     def columnCount(self, parent):
-        if self.mode == Model_Mode.Book:
-            return len(self._mbook)
-        elif self.mode == Model_Mode.Client:
-            return len(self._mclient)
-        elif self.mode == Model_Mode.Log:
-            return len(self._mlog)
+        return 0 if parent.isValid() else len(self._keys)
 
     def data(self, index, role):
         if role == Qt.DisplayRole:
-            if self.mode == Model_Mode.Book:
-                return self.items[index.row()][self._mbook[index.column()]]
-            elif self.mode == Model_Mode.Client:
-                return self.items[index.row()][self._mclient[index.column()]]
-            elif self.mode == Model_Mode.Log:
-                return self.items[index.row()][self._mlog[index.column()]]
+            row = index.row()
+
+            if self.profiler.enabled:
+                self.profiler.touch(row)
+
+            # rows of evicted pages are read again in the background
+            if isinstance(self.items, BM_Row_Pager) and not self.items.holds(row):
+                self._refill(self.items, row // self.items.page_size)
+                return None
+
+            return self.items.cell(row, self._keys[index.column()])
 
     def headerData(self, section, orientation, role):
+        if self.profiler.enabled:
+            self.profiler.header()
+
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            if self.mode == Model_Mode.Book:
-                return self._tbook[section]
-            elif self.mode == Model_Mode.Client:
-                return self._tclient[section]
-            elif self.mode == Model_Mode.Log:
-                return self._tlog[section]
+            return self._titles[section]
@@ -15,41 +15,61 @@ class BM_Table_View(QTableView):
 
         # initialise our model
         self.model = BM_Table_Model()
+        self.model.loading_changed.connect(self._loading_changed)
         self.setModel(self.model)
 
-        # keep track of the selected row
-        self.selected_row = None
-        self.activated.connect(self._update_selection)
+        # measure the relayout after every model reset (our slots run after the view's own) and the first page load
+        self.profiler = self.model.profiler
+        self.model.modelAboutToBeReset.connect(self._reset_started)
+        self.model.modelReset.connect(self._reset_finished)
+        self._relayout = None
+        self._load = None
 
         # set table view attributes
         self.setSelectionBehavior(QTableView.SelectRows)
-        self.setSelectionMode(QTableView.SingleSelection)
+        self.setSelectionMode(QTableView.ExtendedSelection)
         self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
     def switch_mode(self, mode: Model_Mode):
-        # nothing will be selected at this point
-        self.selected_row = None
+        with self.profiler.measure("switch_mode"):
+            # update our model (rows are read in the background as the view scrolls)
+            self.model.paginate(mode)
 
-        # update mode
-        self.model.mode = mode
+    def paintEvent(self, event):
+        # count the data() calls of every paint
+        with self.profiler.measure("paint", False):
+            super().paintEvent(event)
 
-        # update our model
-        if mode == Model_Mode.Book:
-            self.model.fetch("SELECT * FROM books")
-        elif mode == Model_Mode.Client:
-            self.model.fetch("SELECT * FROM clients")
-        elif mode == Model_Mode.Log:
-            self.model.fetch(
-                "SELECT * FROM logs JOIN books ON logs.bid=books.bid JOIN clients ON logs.cid=clients.cid ORDER BY ldate DESC")
+    def _reset_started(self):
+        self._relayout = self.profiler.start("relayout", False)
 
-        self.model.layoutChanged.emit()
+    def _reset_finished(self):
+        self.profiler.stop(self._relayout)
+        self._relayout = None
 
-        # emit the "contents_changed" signal
-        self.contents_changed.emit(len(self.model.items))
+    def _loading_changed(self, loading):
+        # the first page load of a list (measured until its rows are shown)
+        if loading:
+            self._load = self.profiler.start("load first page")
+        else:
+            self.profiler.stop(self._load)
+            self._load = None
+
+        # emit the "contents_changed" signal once the first rows are available
+        if not loading:
+            self.contents_changed.emit(len(self.model.items))
 
     def selected_item(self):
-        # return the selected item
-        return self.model.items[self.selected_row]
+        # return the first selected item, or None if nothing is selected (rather than the last activated one, the
+        # selection follows clicks and deletions)
+        rows = self.selected_rows()
+
+        return self.model.items[rows[0]] if rows else None
+
+    def selected_rows(self):
+        # return the rows of every selected item (in order)
+        return sorted(index.row() for index in self.selectionModel().selectedRows())
 
-    def _update_selection(self, index):
-        self.selected_row = index.row()
+    def selected_keys(self, key):
+        # return a column (e.g. the primary key) of every selected item
+        return [self.model.items.cell(row, key) for row in self.selected_rows()]
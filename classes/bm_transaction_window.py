@@ -4,23 +4,21 @@
 """
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QMessageBox
+from classes.bm_picker import BM_Picker
 
 
 class BM_Transaction_Dialog(QWidget):
     # define transaction signal
     transaction_finished = pyqtSignal(dict)
 
-    def __init__(self, db):
+    def __init__(self, executor):
         super().__init__()
 
-        # initialise UI and layout
-        self.book = QComboBox()
-        self.client = QComboBox()
+        # initialise UI and layout (books and clients are looked up as the user types)
+        self.book = BM_Picker(executor, "books")
+        self.client = BM_Picker(executor, "clients")
         self.ttype = QComboBox()
 
-        # initialise database connection
-        self.database = db
-
         # transaction types
         self.ttypes = ["Borrowing", "Returning"]
 
@@ -75,45 +73,35 @@ class BM_Transaction_Dialog(QWidget):
         self.hide()
 
     def _done(self):
+        book = self.book.current
+        client = self.client.current
+
+        if book is None or client is None:
+            QMessageBox.warning(self, "No data!", "Pick a book and a client to record a transaction.")
+            return
+
+        # offer them first next time
+        self.book.remember()
+        self.client.remember()
+
         # send the "transaction_finished" signal
         self.transaction_finished.emit({
-            "bid": self.books[self.book.currentIndex()]["bid"],
-            "stock": self.books[self.book.currentIndex()]["stock"],
-            "cid": self.clients[self.client.currentIndex()]["cid"],
+            "bid": book["bid"],
+            "cid": client["cid"],
             "type": self.ttypes[self.ttype.currentIndex()]
         })
 
         # close the window
         self.hide()
 
-    def activate(self, psb=None, psc=None):
-        # show this window
-        self.show()
-
-        # fetch books and clients
-        self.books = self.database.execute("SELECT * FROM books")
-        self.clients = self.database.execute("SELECT * FROM clients")
+    def activate(self, psb=None, psc=None, ttype=None):
+        # use the pre-selected book and client rows (if they are available), nothing is read until the user types
+        self.book.reset(psb)
+        self.client.reset(psc)
 
-        # cancel activation if we have no data on either columns
-        if len(self.books) == 0 or len(self.clients) == 0:
-            QMessageBox.warning(self, "No data!",
-                                "To record a transaction you must have at least one book and one client in the database.")
-            self.hide()
+        # pre-select the transaction type (if any)
+        if ttype is not None:
+            self.ttype.setCurrentIndex(self.ttypes.index(ttype))
 
-        # clear our combo box inputs
-        self.book.clear()
-        self.client.clear()
-
-        # populate our combo box inputs
-        for book in self.books:
-            self.book.addItem(book["title"])
-
-        for client in self.clients:
-            self.client.addItem("%s %s" % (client["fname"], client["lname"]))
-
-        # use the pre-selected values (if they are available)
-        if psb:
-            self.book.setCurrentText(psb)
-
-        if psc:
-            self.client.setCurrentText(psc)
+        # show this window
+        self.show()
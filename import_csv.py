@@ -0,0 +1,25 @@
+#!/usr/bin/python3
+import sys
+import argparse
+from classes.bm_importer import BM_Importer
+
+
+if __name__ == "__main__":
+    # parse command line arguments
+    parser = argparse.ArgumentParser(description="Import books or clients from a CSV file.")
+    parser.add_argument("table", choices=["books", "clients"])
+    parser.add_argument("file", help="CSV file shaped like mock-data/books.csv or mock-data/clients.csv")
+    parser.add_argument("--upsert", action="store_true", help="update rows whose ids already exist")
+    parser.add_argument("--database", default="library.db")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    # report progress on stderr
+    def progress(rows, position, total):
+        sys.stderr.write("\r%i row(s) read (%.0f%%)" % (rows, 100.0 * position / max(total, 1)))
+
+    importer = BM_Importer(args.database, args.batch_size)
+    imported, skipped = importer.import_csv(args.table, args.file, args.upsert, progress)
+
+    sys.stderr.write("\n")
+    print("Imported %i row(s), skipped %i row(s)." % (imported, skipped))
@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+import json
+import argparse
+from classes.bm_database import BM_Database
+from classes.bm_migrations import BM_Migrations
+from classes.bm_reports import BM_Reports
+
+
+if __name__ == "__main__":
+    # parse command line arguments
+    parser = argparse.ArgumentParser(description="Print circulation reports.")
+    parser.add_argument("section", nargs="?", choices=["top_titles", "per_day", "per_week", "stock_outs",
+                                                       "client_activity"], help="a single report (all by default)")
+    parser.add_argument("--database", default="library.db")
+    parser.add_argument("--top", type=int, default=10, help="number of rows in the top-N reports")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args()
+
+    database = BM_Database(args.database)
+
+    # the reports read the circulation counters of the latest schema
+    BM_Migrations(database).migrate()
+
+    reports = BM_Reports(database, args.top)
+    results = reports.report()
+
+    if args.section is not None:
+        results = {args.section: results[args.section]}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for section, rows in results.items():
+            title, headers = reports.sections[section]
+
+            print("%s\n%s" % (title, "=" * len(title)))
+            print("%-40s %s" % tuple(headers))
+
+            for row in rows:
+                print("%-40s %s" % row)
+
+            print()
+
+    database.close()
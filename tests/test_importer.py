@@ -0,0 +1,72 @@
+"""
+    This file contains the tests for the Book Management Importer class
+"""
+import os
+import shutil
+import pytest
+from classes.bm_database import BM_Database
+from classes.bm_importer import BM_Importer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def path(tmp_path):
+    shutil.copy(os.path.join(ROOT, "library.db"), tmp_path / "library.db")
+
+    database = BM_Database(str(tmp_path / "library.db"))
+    database.execute("DELETE FROM books")
+    database.execute("INSERT INTO books (bid, title, stock) VALUES (1, 'Dune', 3)")
+    database.close()
+
+    return str(tmp_path / "library.db")
+
+
+def books(path):
+    database = BM_Database(path)
+
+    try:
+        return [tuple(row) for row in database.execute("SELECT bid, title, stock FROM books ORDER BY bid")]
+    finally:
+        database.close()
+
+
+def write_csv(tmp_path, lines):
+    filename = str(tmp_path / "books.csv")
+
+    with open(filename, "w", newline="") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return filename
+
+
+def test_skipped_rows_add_up(path, tmp_path):
+    # a header, an existing id, a malformed stock, a missing column and three new books (one without an id)
+    filename = write_csv(tmp_path, ["bid,title,stock", "1,Dune Messiah,2", "2,Emma,one", "3,Ulysses", "4,Beloved,1",
+                                    "5,Walden,2", ",Persuasion,4"])
+
+    imported, skipped = BM_Importer(path).import_csv("books", filename)
+
+    assert (imported, skipped) == (3, 4)
+    assert books(path) == [(1, "Dune", 3), (4, "Beloved", 1), (5, "Walden", 2), (6, "Persuasion", 4)]
+
+
+def test_upsert_replaces_existing_rows(path, tmp_path):
+    filename = write_csv(tmp_path, ["bid,title,stock", "1,Dune Messiah,2", "4,Beloved,1"])
+
+    assert BM_Importer(path).import_csv("books", filename, upsert=True) == (2, 1)
+    assert books(path) == [(1, "Dune Messiah", 2), (4, "Beloved", 1)]
+
+
+def test_cancelling_keeps_written_batches(path, tmp_path):
+    filename = write_csv(tmp_path, ["%i,Title %i,1" % (i, i) for i in range(10, 35)])
+    calls = []
+
+    def progress(rows, position, total):
+        calls.append(rows)
+        return len(calls) < 2
+
+    # batches are committed as they are written, the import stops after the second one
+    assert BM_Importer(path, batch_size=10).import_csv("books", filename, progress=progress) == (20, 0)
+    assert calls == [10, 20]
+    assert len(books(path)) == 21
@@ -0,0 +1,93 @@
+"""
+    This file contains the tests for the Book Management Migrations class
+"""
+import os
+import shutil
+import pytest
+from classes.bm_database import BM_Database
+from classes.bm_migrations import BM_Migrations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def database(tmp_path):
+    # our library.db has the original schema (version 0)
+    shutil.copy(os.path.join(ROOT, "library.db"), tmp_path / "library.db")
+    database = BM_Database(str(tmp_path / "library.db"))
+
+    database.execute("DELETE FROM books")
+    database.execute("DELETE FROM clients")
+    database.execute("DELETE FROM logs")
+    database.execute_many("INSERT INTO books (bid, title, stock) VALUES (?, ?, ?)", [(1, "Dune", 3), (2, "Emma", 1)])
+    database.execute_many("INSERT INTO clients (cid, fname, lname) VALUES (?, ?, ?)", [(1, "Ann", "Lee"),
+                                                                                      (2, "Bob", "Ray")])
+
+    # Ann borrowed Dune three times and returned it once, Bob borrowed and returned Emma, then borrowed Dune
+    database.execute_many("INSERT INTO logs (lid, bid, cid, ltype, ldate) VALUES (?, ?, ?, ?, ?)", [
+        (1, 1, 1, "Borrowing", "2018-01-01 10:00:00"),
+        (2, 2, 2, "Borrowing", "2018-01-02 10:00:00"),
+        (3, 1, 1, "Borrowing", "2018-01-03 10:00:00"),
+        (4, 1, 1, "Returning", "2018-01-04 10:00:00"),
+        (5, 2, 2, "Returning", "2018-01-05 10:00:00"),
+        (6, 1, 1, "Borrowing", "2018-01-06 10:00:00"),
+        (7, 1, 2, "Borrowing", "2018-01-07 10:00:00")])
+
+    yield database
+
+    database.close()
+
+
+def test_migrations_apply_in_order(database):
+    migrations = BM_Migrations(database)
+    versions = []
+
+    # every migration bumps the version by one, in its own transaction
+    execute = database.execute
+
+    def traced(statement, **params):
+        if statement.startswith("PRAGMA user_version="):
+            versions.append(int(statement.split("=")[1]))
+
+        return execute(statement, **params)
+
+    database.execute = traced
+
+    assert migrations.version() == 0
+    assert migrations.pending() == len(migrations.migrations)
+    assert migrations.migrate() == len(migrations.migrations)
+    assert versions == list(range(1, len(migrations.migrations) + 1))
+    assert migrations.pending() == 0
+
+
+def test_migrations_are_idempotent(database):
+    migrations = BM_Migrations(database)
+    migrations.migrate()
+
+    assert migrations.migrate() == 0
+    assert migrations.version() == len(migrations.migrations)
+
+    # a database left half way continues from its own version
+    database.execute("PRAGMA user_version=2")
+
+    assert migrations.migrate() == len(migrations.migrations) - 2
+    assert database.execute("SELECT COUNT(*) FROM loans")[0][0] == 3
+
+
+def test_loans_replay_the_history(database):
+    BM_Migrations(database).migrate()
+
+    # returns settle the oldest copies, so Ann still has the copies she borrowed last
+    loans = [tuple(row) for row in database.execute("SELECT lid, bid, cid FROM loans ORDER BY lid")]
+
+    assert loans == [(3, 1, 1), (6, 1, 1), (7, 1, 2)]
+
+
+def test_counters_replay_the_history(database):
+    BM_Migrations(database).migrate()
+
+    books = [tuple(row) for row in database.execute("SELECT * FROM book_stats ORDER BY bid")]
+    clients = [tuple(row) for row in database.execute("SELECT * FROM client_stats ORDER BY cid")]
+
+    assert books == [(1, 4, 1, "2018-01-07 10:00:00"), (2, 1, 1, "2018-01-05 10:00:00")]
+    assert clients == [(1, 3, 1, "2018-01-06 10:00:00"), (2, 2, 1, "2018-01-07 10:00:00")]
@@ -0,0 +1,118 @@
+"""
+    This file contains the tests for the Book Management Row Pager class
+"""
+import pytest
+from classes.bm_database import BM_Database
+from classes.bm_row_pager import BM_Row_Pager
+
+SCHEMA = [("bid", "int"), ("title", "text")]
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = BM_Database(str(tmp_path / "pager.db"))
+    database.execute("CREATE TABLE books (bid integer not null primary key, title text not null)")
+    database.execute_many("INSERT INTO books (bid, title) VALUES (?, ?)", [(i, "Title %i" % i) for i in range(1, 96)])
+
+    yield database
+
+    database.close()
+
+
+def make_pager(database, page_size=10, max_pages=32):
+    pager = BM_Row_Pager(database, SCHEMA, "SELECT * FROM books ORDER BY bid LIMIT :limit",
+                         "SELECT * FROM books WHERE bid > :bid ORDER BY bid LIMIT :limit", ["bid"],
+                         page_size=page_size, max_pages=max_pages)
+
+    # count the queries the pager runs
+    pager.queries = 0
+    query = pager._query
+
+    def counted(bound, limit):
+        pager.queries += 1
+        return query(bound, limit)
+
+    pager._query = counted
+
+    return pager
+
+
+def load_all(pager):
+    # expose every row, like a view scrolling to the end
+    while not pager.exhausted:
+        pager.grow(pager.next_page())
+
+
+def bids(database):
+    return [row["bid"] for row in database.execute("SELECT bid FROM books ORDER BY bid")]
+
+
+def test_pages_follow_the_keyset(database):
+    pager = make_pager(database)
+    load_all(pager)
+
+    # one query per page (the last one is short)
+    assert len(pager) == 95
+    assert pager.queries == 10
+    assert [pager.cell(i, "bid") for i in range(len(pager))] == bids(database)
+    assert pager[42] == {"bid": 43, "title": "Title 43"}
+
+    # a bound per page we have read
+    assert [position for _, position in pager.bounds] == [9, 19, 29, 39, 49, 59, 69, 79, 89, 94]
+
+
+def test_eviction_keeps_the_nearest_pages(database):
+    pager = make_pager(database, max_pages=3)
+    load_all(pager)
+
+    # reading forwards leaves the last pages behind
+    assert sorted(pager.pages) == [7, 8, 9]
+    assert pager.resident() == 25
+    assert pager.holds(94) and not pager.holds(0)
+
+    # an evicted page is read again with a single keyset query, the pages furthest from it make room
+    queries = pager.queries
+    assert pager.cell(35, "bid") == 36
+    assert pager.queries == queries + 1
+    assert sorted(pager.pages) == [3, 7, 8]
+
+
+def test_deleting_rows_keeps_later_pages_readable(database):
+    pager = make_pager(database)
+    load_all(pager)
+
+    # delete rows 10 to 14 (the whole of page 1's head) and the bound row of page 2
+    database.execute("DELETE FROM books WHERE bid IN (:bids)", bids=[11, 12, 13, 14, 15, 30])
+    del pager[10:15]
+    del pager[24]
+
+    assert len(pager) == 89
+
+    # a later page is read straight from its bound, without walking the pages before it
+    queries = pager.queries
+    assert pager.cell(80, "bid") == 87
+    assert pager.queries == queries + 1
+
+    assert [pager.cell(i, "bid") for i in range(len(pager))] == bids(database)
+
+
+def test_removing_an_unknown_row_starts_over(database):
+    pager = make_pager(database, max_pages=2)
+    load_all(pager)
+
+    # row 0 has been evicted, so we cannot tell where it was
+    database.execute("DELETE FROM books WHERE bid=1")
+    pager.remove("bid", 1)
+
+    assert len(pager) == 0
+    assert pager.bounds == [] and pager.pages == {}
+
+    load_all(pager)
+    assert [pager.cell(i, "bid") for i in range(len(pager))] == bids(database)
+
+
+def test_iteration_streams_every_row(database):
+    pager = make_pager(database, max_pages=1)
+
+    assert [row["bid"] for row in pager] == bids(database)
+    assert pager.pages == {}
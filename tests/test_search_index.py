@@ -0,0 +1,79 @@
+"""
+    This file contains the tests for the Book Management Search Index class
+"""
+import pytest
+from classes.bm_search_index import BM_Search_Index
+
+TITLES = ["Harry Potter", "The Hobbit", "Charlotte's Web", "Dune", "Harriet the Spy", "abc bcd", "Sharp Objects"]
+
+
+@pytest.fixture
+def index():
+    rows = [{"bid": i + 1, "title": title} for i, title in enumerate(TITLES)]
+
+    return BM_Search_Index("bid", [("bid", "int"), ("title", "text")], fields=("title",)).build(rows)
+
+
+def titles(store):
+    return [row["title"] for row in store]
+
+
+def scan(*predicates):
+    # what a search has to find (in index order)
+    return [title for title in TITLES if any(p in title.lower() for p in predicates)]
+
+
+def test_postings_hold_trigrams(index):
+    assert set(index.postings) >= {"har", "arr", "rry", "hob", "dun"}
+    assert all(len(gram) == 3 for gram in index.postings)
+    assert list(index.postings["har"]) == [0, 2, 4, 6]
+
+
+@pytest.mark.parametrize("predicates", [["harr"], ["har"], ["obb", "dune"], ["xyz"], ["the "]])
+def test_search_matches_substrings(index, predicates):
+    assert titles(index.search(predicates)) == scan(*predicates)
+
+
+def test_trigrams_alone_do_not_match(index):
+    # "abc bcd" holds both trigrams of "abcd" but not the word itself
+    assert titles(index.search(["abcd"])) == []
+
+
+@pytest.mark.parametrize("predicate", ["h", "ar", "e"])
+def test_short_predicates_scan_the_texts(index, predicate):
+    assert titles(index.search([predicate])) == scan(predicate)
+
+
+def test_longer_queries_narrow_a_recent_result(index, monkeypatch):
+    assert titles(index.search(["har"])) == scan("har")
+
+    # "harr" and "harri" contain "har", their matches are picked out of its result without the postings
+    def fail(*args):
+        raise AssertionError("the index was queried again")
+
+    monkeypatch.setattr(index, "_match", fail)
+
+    assert titles(index.search(["harr"])) == scan("harr")
+    assert titles(index.search(["harri"])) == scan("harri")
+
+    # the narrowest recent result is used
+    assert index._narrowest(["harrie"]) == ("harri",)
+
+    # repeated queries are answered from the cache
+    assert titles(index.search(["har"])) == scan("har")
+    assert list(index.recent)[-1] == ("har",)
+
+
+def test_modifications_forget_recent_results(index):
+    index.search(["hob"])
+    index.add({"bid": 8, "title": "Hobbit Lore"})
+
+    assert len(index.recent) == 0
+    assert titles(index.search(["hob"])) == ["The Hobbit", "Hobbit Lore"]
+
+    index.remove(2)
+    assert titles(index.search(["hob"])) == ["Hobbit Lore"]
+
+    index.update({"bid": 4, "title": "Dune Messiah"})
+    assert titles(index.search(["messiah"])) == ["Dune Messiah"]
+    assert index.get(4) == {"bid": 4, "title": "Dune Messiah"}
@@ -0,0 +1,122 @@
+"""
+    This file contains the tests for the Book Management Table Model class
+"""
+import os
+import shutil
+import sqlite3
+
+# the model never needs a screen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt5.QtCore import QEventLoop
+from PyQt5.QtWidgets import QApplication
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    # the model opens "library.db" in the working directory, give it a copy of ours
+    shutil.copy(os.path.join(ROOT, "library.db"), tmp_path / "library.db")
+    monkeypatch.chdir(tmp_path)
+
+    with sqlite3.connect("library.db") as connection:
+        connection.execute("DELETE FROM books")
+        connection.executemany("INSERT INTO books (title, stock) VALUES (?, ?)",
+                               [("Title %i" % i, i % 7) for i in range(300)])
+
+    from classes.bm_table_model import BM_Table_Model
+
+    app = QApplication.instance() or QApplication([])
+    model = BM_Table_Model()
+
+    def wait():
+        # deliver every result the executor owes us
+        while model.executor.pending():
+            app.processEvents(QEventLoop.WaitForMoreEvents)
+
+        app.processEvents()
+
+    model.wait = wait
+    wait()
+
+    yield model
+
+    model.executor.stop()
+
+
+def test_fetch_plain_select(model):
+    # a plain "SELECT *" does not read the circulation counters of the books mode
+    model.fetch("SELECT * FROM books")
+    model.wait()
+
+    with sqlite3.connect("library.db") as connection:
+        rows = connection.execute("SELECT bid, title, stock FROM books ORDER BY bid").fetchall()
+
+    assert len(rows) == 300
+    assert len(model.items) == len(rows)
+
+    for i, (bid, title, stock) in enumerate(rows):
+        assert model.items[i]["bid"] == bid
+        assert model.items[i]["title"] == title
+        assert model.items[i]["stock"] == stock
+        assert model.items[i]["borrows"] == 0
+        assert model.items[i]["returns"] == 0
+
+
+def stats(table, key):
+    # the circulation counters as stored and as recounted from the history
+    with sqlite3.connect("library.db") as connection:
+        stored = connection.execute("SELECT %s, borrows, returns, lastdate FROM %s ORDER BY %s" %
+                                    (key, table, key)).fetchall()
+        counted = connection.execute("SELECT %s, SUM(ltype='Borrowing'), SUM(ltype='Returning'), MAX(ldate) "
+                                     "FROM history GROUP BY %s ORDER BY %s" % (key, key, key)).fetchall()
+
+    return stored, counted
+
+
+def test_deleting_logs_maintains_the_counters(model):
+    from classes.bm_table_model import Model_Mode
+
+    with sqlite3.connect("library.db") as connection:
+        connection.executemany("INSERT INTO clients (cid, fname, lname) VALUES (?, ?, ?)",
+                               [(1, "Ann", "Lee"), (2, "Bob", "Ray")])
+
+    # (the executor is idle, the transactions are recorded on this thread)
+    lids = []
+
+    for bid, cid, ttype in [(4, 1, "Borrowing"), (4, 1, "Borrowing"), (4, 1, "Returning"), (5, 2, "Borrowing"),
+                            (4, 2, "Borrowing")]:
+        assert model.circulate(bid, cid, ttype) is not None
+        lids.append(model.database.execute("SELECT MAX(lid) FROM logs")[0][0])
+
+    # the first borrowing has been archived
+    with sqlite3.connect("library.db") as connection:
+        connection.execute("INSERT INTO logs_archive SELECT * FROM logs WHERE lid=?", (lids[0],))
+        connection.execute("DELETE FROM logs WHERE lid=?", (lids[0],))
+
+    for table, key in (("book_stats", "bid"), ("client_stats", "cid")):
+        stored, counted = stats(table, key)
+        assert stored == counted
+
+    # deleting log entries (archived or not) takes them out of the counters of their books and clients
+    model.bulk_delete(Model_Mode.Log, [lids[0], lids[2]])
+    model.wait()
+
+    for table, key in (("book_stats", "bid"), ("client_stats", "cid")):
+        stored, counted = stats(table, key)
+        assert stored == counted
+
+    assert stats("book_stats", "bid")[0][0][:3] == (4, 2, 0)
+
+    # deleting a client drops its counters, and those of books left without any activity
+    model.bulk_delete(Model_Mode.Client, [2])
+    model.wait()
+
+    for table, key in (("book_stats", "bid"), ("client_stats", "cid")):
+        stored, counted = stats(table, key)
+        assert stored == counted
+
+    assert [row[:3] for row in stats("book_stats", "bid")[0]] == [(4, 1, 0)]
+    assert [row[:3] for row in stats("client_stats", "cid")[0]] == [(1, 1, 0)]